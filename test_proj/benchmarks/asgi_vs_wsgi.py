@@ -0,0 +1,131 @@
+"""
+Нагрузочное сравнение синхронного API (WSGI, /api/...) и асинхронного
+(ASGI, /api/async/...) на одном наборе данных: запросы/с и задержки
+при заданном числе одновременных клиентов.
+
+WSGI-клиенты — потоки с django.test.Client (у каждого своё соединение
+с базой), ASGI-клиенты — корутины с django.test.AsyncClient в одном
+цикле событий. Кэш ответов отключается, чтобы сравнивать работу с базой.
+
+    python -m benchmarks.asgi_vs_wsgi --services 5 --width 4 --concurrency 16
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .common import setup_django, summarize
+
+
+def populate(services, width, members):
+    from divisions.synthetic import generate_org_tree
+
+    generate_org_tree(services, width, width, width, members)
+
+
+def request_paths(prefix):
+    from divisions.models import Department, Division, Service, Team
+
+    paths = [f"{prefix}statistics/"]
+    for kind, model in [
+        ("services", Service),
+        ("departments", Department),
+        ("divisions", Division),
+        ("teams", Team),
+    ]:
+        for pk in model.objects.values_list("pk", flat=True)[:20]:
+            paths += [
+                f"{prefix}{kind}/{pk}/",
+                f"{prefix}{kind}/{pk}/employees/",
+                f"{prefix}{kind}/{pk}/statistics/",
+            ]
+    return paths
+
+
+def run_wsgi(paths, concurrency):
+    from django.db import connections
+    from django.test import Client
+
+    def worker(chunk):
+        client = Client(HTTP_ACCEPT="application/json")
+        durations = []
+        for path in chunk:
+            started = time.perf_counter()
+            assert client.get(path).status_code == 200, path
+            durations.append((time.perf_counter() - started) * 1000)
+        connections.close_all()
+        return durations
+
+    chunks = [paths[i::concurrency] for i in range(concurrency)]
+    started = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        durations = [d for result in pool.map(worker, chunks) for d in result]
+    return time.perf_counter() - started, durations
+
+
+def run_asgi(paths, concurrency):
+    from django.test import AsyncClient
+
+    async def worker(chunk):
+        client = AsyncClient()
+        durations = []
+        for path in chunk:
+            started = time.perf_counter()
+            response = await client.get(path)
+            assert response.status_code == 200, path
+            durations.append((time.perf_counter() - started) * 1000)
+        return durations
+
+    async def main():
+        chunks = [paths[i::concurrency] for i in range(concurrency)]
+        return await asyncio.gather(*(worker(chunk) for chunk in chunks))
+
+    started = time.perf_counter()
+    results = asyncio.run(main())
+    return time.perf_counter() - started, [d for result in results for d in result]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--services", type=int, default=5)
+    parser.add_argument("--width", type=int, default=4)
+    parser.add_argument("--members", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--db", help="Готовая база (иначе создаётся временная)")
+    args = parser.parse_args()
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "test_proj.settings")
+    from django.conf import settings
+
+    settings.CACHES = {
+        "default": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"}
+    }
+    setup_django(args.db)
+
+    from divisions.models import Service
+
+    if not Service.objects.exists():
+        populate(args.services, args.width, args.members)
+
+    results = {"concurrency": args.concurrency}
+    for name, prefix, run in [
+        ("wsgi", "/api/", run_wsgi),
+        ("asgi", "/api/async/", run_asgi),
+    ]:
+        paths = request_paths(prefix) * args.rounds
+        elapsed, durations = run(paths, args.concurrency)
+        results[name] = {
+            "requests": len(paths),
+            "requests_per_sec": round(len(paths) / elapsed, 1),
+            **summarize(durations),
+        }
+
+    print(json.dumps(results, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
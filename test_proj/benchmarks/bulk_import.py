@@ -0,0 +1,107 @@
+"""
+Бенчмарк пропускной способности пакетного импорта/экспорта сотрудников
+(строк в секунду) в сравнении с созданием по одному через EmployeeSerializer
+и team.members.add(), как при последовательных POST/PATCH.
+
+    python -m benchmarks.bulk_import --rows 100000
+"""
+
+import argparse
+import json
+import random
+import time
+
+from .common import employee_rows, setup_django
+
+
+def make_teams(count):
+    from divisions.models import Department, Division, Service, Team
+
+    service = Service.objects.create(name="Бенчмарк")
+    department = Department.objects.create(service=service, name="Управление")
+    division = Division.objects.create(department=department, name="Отдел")
+    return [
+        Team.objects.create(division=division, name=f"Группа {i}").pk
+        for i in range(count)
+    ]
+
+
+def ndjson_lines(count, team_ids, seed):
+    rng = random.Random(seed)
+    for full_name, position, born, started in employee_rows(count, rng):
+        yield json.dumps(
+            {
+                "full_name": full_name,
+                "position": position,
+                "date_of_birth": born.isoformat(),
+                "start_date": started.isoformat(),
+                "teams": rng.sample(team_ids, 2),
+            },
+            ensure_ascii=False,
+        ).encode() + b"\n"
+
+
+def rate(rows, seconds):
+    return round(rows / seconds) if seconds else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--baseline-rows", type=int, default=2_000)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--db", help="База для замеров (иначе создаётся временная)")
+    args = parser.parse_args()
+
+    setup_django(args.db)
+
+    from divisions import bulk
+    from divisions.models import Employee, Team
+    from divisions.serializers import EmployeeSerializer
+
+    team_ids = make_teams(50)
+    results = {"rows": args.rows, "batch_size": args.batch_size}
+
+    lines = list(ndjson_lines(args.rows, team_ids, seed=1))
+    started = time.perf_counter()
+    report = bulk.import_employees(bulk.parse_ndjson(lines), batch_size=args.batch_size)
+    elapsed = time.perf_counter() - started
+    results["bulk_import"] = {
+        "created": report["created"],
+        "errors": len(report["errors"]),
+        "seconds": round(elapsed, 2),
+        "rows_per_sec": rate(report["created"], elapsed),
+    }
+
+    teams = Team.objects.in_bulk(team_ids)
+    baseline = [json.loads(line) for line in ndjson_lines(args.baseline_rows, team_ids, 2)]
+    started = time.perf_counter()
+    for data in baseline:
+        serializer = EmployeeSerializer(data=data)
+        serializer.is_valid(raise_exception=True)
+        employee = serializer.save()
+        for team_id in data["teams"]:
+            teams[team_id].members.add(employee)
+    elapsed = time.perf_counter() - started
+    results["one_by_one"] = {
+        "created": len(baseline),
+        "seconds": round(elapsed, 2),
+        "rows_per_sec": rate(len(baseline), elapsed),
+    }
+
+    for fmt in bulk.FORMATS:
+        started = time.perf_counter()
+        size = sum(len(chunk) for chunk in bulk.export_employees(Employee.objects.all(), fmt))
+        elapsed = time.perf_counter() - started
+        results[f"export_{fmt}"] = {
+            "rows": Employee.objects.count(),
+            "bytes": size,
+            "seconds": round(elapsed, 2),
+            "rows_per_sec": rate(Employee.objects.count(), elapsed),
+        }
+
+    print(json.dumps(results, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
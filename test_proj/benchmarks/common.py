@@ -0,0 +1,69 @@
+"""
+Общие утилиты бенчмарков: настройка Django на отдельной базе SQLite,
+синтетические данные и замеры времени.
+
+Бенчмарки запускаются из каталога test_proj: python -m benchmarks.<имя> --help
+"""
+
+import math
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+
+def setup_django(db_path=None):
+    """
+    Настраивает Django на базе db_path (по умолчанию — временный файл)
+    и применяет миграции. Возвращает путь к базе.
+    """
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "test_proj.settings")
+    if db_path is None:
+        db_path = os.path.join(tempfile.mkdtemp(prefix="divisions-bench-"), "db.sqlite3")
+
+    from django.conf import settings
+
+    settings.DATABASES["default"]["NAME"] = db_path
+    settings.ALLOWED_HOSTS = ["*"]
+
+    import django
+    from django.core.management import call_command
+
+    django.setup()
+    call_command("migrate", verbosity=0)
+    return db_path
+
+
+def employee_rows(count, rng=None):
+    """
+    Генерирует кортежи (full_name, position, date_of_birth, start_date)
+    (см. divisions/synthetic.py). Вызывается после setup_django().
+    """
+    from divisions.synthetic import employee_rows
+
+    return employee_rows(count, rng)
+
+
+def timed(func, repeat):
+    """
+    Выполняет func repeat раз, возвращает список длительностей в миллисекундах.
+    """
+    durations = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        durations.append((time.perf_counter() - started) * 1000)
+    return durations
+
+
+def summarize(durations):
+    # p95 — по ближайшему рангу, как в /api/metrics/ (divisions/instrumentation.py)
+    ordered = sorted(durations)
+    return {
+        "p50_ms": round(statistics.median(ordered), 3),
+        "p95_ms": round(ordered[math.ceil(len(ordered) * 0.95) - 1], 3),
+        "max_ms": round(ordered[-1], 3),
+    }
@@ -0,0 +1,129 @@
+"""
+Бенчмарк быстрого пути списков сотрудников (divisions/rows.py):
+EmployeeSerializer(many=True) против EmployeeRowBuilder на одних и тех же
+строках, а также JSONRenderer против FastJSONRenderer
+(divisions/renderers.py). Выводит строк в секунду для построения строк,
+рендеринга и всего ответа (запрос + строки + JSON).
+
+    python -m benchmarks.employee_rows --rows 20000 --photos 0.3
+"""
+
+import argparse
+import json
+import random
+import time
+
+from .common import employee_rows, setup_django, summarize, timed
+
+
+def populate(rows, photos, batch_size=5000):
+    from django.db import transaction
+
+    from divisions.models import Employee
+
+    rng = random.Random(0)
+    batch = []
+    with transaction.atomic():
+        for i, (full_name, position, born, started) in enumerate(employee_rows(rows)):
+            photo = rng.random() < photos
+            batch.append(
+                Employee(
+                    full_name=full_name,
+                    position=position,
+                    date_of_birth=born,
+                    start_date=started,
+                    photo=f"employee_photos/{i}.png" if photo else None,
+                    photo_hash=f"{i:032x}" if photo else None,
+                    team_name=f"Группа {i % 50}",
+                )
+            )
+            if len(batch) == batch_size:
+                Employee.objects.bulk_create(batch)
+                batch = []
+        Employee.objects.bulk_create(batch)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--photos", type=float, default=0.3)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--db", help="Готовая база (иначе создаётся временная)")
+    args = parser.parse_args()
+
+    setup_django(args.db)
+
+    from rest_framework.renderers import JSONRenderer
+    from rest_framework.request import Request
+    from rest_framework.test import APIRequestFactory
+
+    from divisions.models import Employee
+    from divisions.renderers import FastJSONRenderer, orjson
+    from divisions.rows import EmployeeRowBuilder
+    from divisions.serializers import EmployeeSerializer
+
+    existing = Employee.objects.count()
+    if existing < args.rows:
+        started = time.perf_counter()
+        populate(args.rows - existing, args.photos)
+        print(f"Сгенерировано {args.rows - existing} сотрудников "
+              f"за {time.perf_counter() - started:.1f} с")
+
+    request = Request(APIRequestFactory().get("/api/employees/"))
+    queryset = Employee.objects.order_by("pk")[: args.rows]
+    builder = EmployeeRowBuilder(request)
+    objects = list(queryset)
+    rows = list(builder.queryset(queryset))
+
+    context = {"request": request}
+    serialized = EmployeeSerializer(objects, many=True, context=context).data
+    built = builder.build_many(rows)
+    assert JSONRenderer().render(serialized) == JSONRenderer().render(built)
+
+    def full(fast):
+        if fast:
+            data = builder.build_many(builder.queryset(queryset))
+            return FastJSONRenderer().render(data)
+        data = EmployeeSerializer(queryset, many=True, context=context).data
+        return JSONRenderer().render(data)
+
+    cases = {
+        "serializer": lambda: EmployeeSerializer(
+            objects, many=True, context=context
+        ).data,
+        "row_builder": lambda: builder.build_many(rows),
+        "json_renderer": lambda: JSONRenderer().render(built),
+        "fast_json_renderer": lambda: FastJSONRenderer().render(built),
+        "response_before": lambda: full(False),
+        "response_after": lambda: full(True),
+    }
+    results = {}
+    for name, func in cases.items():
+        durations = timed(func, args.repeat)
+        summary = summarize(durations)
+        results[name] = {
+            **summary,
+            "rows_per_sec": round(len(rows) / (summary["p50_ms"] / 1000)),
+        }
+
+    for before, after in [
+        ("serializer", "row_builder"),
+        ("json_renderer", "fast_json_renderer"),
+        ("response_before", "response_after"),
+    ]:
+        results[f"{after}_speedup"] = round(
+            results[before]["p50_ms"] / results[after]["p50_ms"], 1
+        )
+    print(
+        json.dumps(
+            {"rows": len(rows), "orjson": orjson is not None, "results": results},
+            ensure_ascii=False,
+            indent=2,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
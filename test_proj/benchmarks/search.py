@@ -0,0 +1,84 @@
+"""
+Бенчмарк поиска сотрудников по ФИО: icontains (прежний SearchFilter)
+против индексного поиска EmployeeSearchFilter (FTS5 на SQLite).
+
+    python -m benchmarks.search --rows 1000000
+"""
+
+import argparse
+import json
+import time
+
+from .common import employee_rows, setup_django, summarize, timed
+
+TERMS = ["иван", "Семёнов", "петр серг", "Соловь", "орлов олег", "макаров ром"]
+
+
+def populate(rows, batch_size=10000):
+    from django.db import connection, transaction
+
+    sql = (
+        "INSERT INTO divisions_employee "
+        "(full_name, position, date_of_birth, start_date, updated_at) "
+        "VALUES (%s, %s, %s, %s, CURRENT_TIMESTAMP)"
+    )
+    batch = []
+    with transaction.atomic(), connection.cursor() as cursor:
+        for row in employee_rows(rows):
+            batch.append(row)
+            if len(batch) == batch_size:
+                cursor.executemany(sql, batch)
+                batch = []
+        if batch:
+            cursor.executemany(sql, batch)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--db", help="Готовая база (иначе создаётся временная)")
+    args = parser.parse_args()
+
+    setup_django(args.db)
+
+    from rest_framework.request import Request
+    from rest_framework.test import APIRequestFactory
+    from rest_framework import filters
+
+    from divisions.models import Employee
+    from divisions.search import EmployeeSearchFilter
+
+    existing = Employee.objects.count()
+    if existing < args.rows:
+        started = time.perf_counter()
+        populate(args.rows - existing)
+        print(f"Сгенерировано {args.rows - existing} сотрудников "
+              f"за {time.perf_counter() - started:.1f} с")
+
+    factory = APIRequestFactory()
+    view = type("View", (), {"search_fields": ["full_name"]})()
+    results = {"rows": Employee.objects.count(), "terms": {}}
+
+    for term in TERMS:
+        request = Request(factory.get("/", {"search": term}))
+
+        def run(backend):
+            queryset = backend.filter_queryset(request, Employee.objects.all(), view)
+            return list(queryset.values_list("id", flat=True))
+
+        baseline = summarize(timed(lambda: run(filters.SearchFilter()), args.repeat))
+        indexed = summarize(timed(lambda: run(EmployeeSearchFilter()), args.repeat))
+        results["terms"][term] = {
+            "matches_icontains": len(run(filters.SearchFilter())),
+            "matches_indexed": len(run(EmployeeSearchFilter())),
+            "icontains": baseline,
+            "indexed": indexed,
+            "speedup_p50": round(baseline["p50_ms"] / max(indexed["p50_ms"], 1e-6), 1),
+        }
+
+    print(json.dumps(results, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
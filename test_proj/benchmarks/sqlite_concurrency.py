@@ -0,0 +1,174 @@
+"""
+Бенчмарк конкурентного доступа к SQLite: профиль по умолчанию против
+SQLITE_PROFILE=production (WAL, BEGIN IMMEDIATE, busy_timeout, прагмы кэша).
+
+Писатели в транзакциях меняют состав групп (как add_member), читатели
+считают статистику и читают состав групп. Для каждого профиля выводятся
+операции/с, задержки и число ошибок «database is locked».
+
+    python -m benchmarks.sqlite_concurrency --writers 4 --readers 8 --seconds 10
+"""
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from .common import employee_rows, setup_django, summarize
+
+PROFILES = ["default", "production"]
+
+# Заполняются в run_child после подготовки базы
+TEAM_IDS = []
+EMPLOYEE_IDS = []
+
+
+def populate(employees):
+    from divisions.models import Department, Division, Employee, Service, Team
+
+    service = Service.objects.create(name="Служба")
+    department = Department.objects.create(service=service, name="Управление")
+    division = Division.objects.create(department=department, name="Отдел")
+    teams = [
+        Team.objects.create(division=division, name=f"Группа {i}") for i in range(10)
+    ]
+    Employee.objects.bulk_create(
+        Employee(
+            full_name=name, position=position, date_of_birth=born, start_date=started
+        )
+        for name, position, born, started in employee_rows(employees)
+    )
+    employee_ids = list(Employee.objects.values_list("pk", flat=True))
+    for team in teams:
+        team.members.add(*random.Random(team.pk).sample(employee_ids, 20))
+
+
+def worker(operation, deadline, results):
+    from django.db import OperationalError, connections
+
+    durations, errors = [], 0
+    rng = random.Random(threading.get_ident())
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        try:
+            operation(rng)
+        except OperationalError as exc:
+            if "locked" not in str(exc):
+                raise
+            errors += 1
+            continue
+        durations.append((time.perf_counter() - started) * 1000)
+    connections.close_all()
+    results.append((durations, errors))
+
+
+def write(rng):
+    from django.db import transaction
+
+    from divisions.models import Employee, Team
+
+    with transaction.atomic():
+        team = Team.objects.get(pk=rng.choice(TEAM_IDS))
+        employee = Employee.objects.get(pk=rng.choice(EMPLOYEE_IDS))
+        if team.members.filter(pk=employee.pk).exists():
+            team.members.remove(employee)
+        else:
+            team.members.add(employee)
+
+
+def read(rng):
+    from divisions.models import Service, Team
+    from divisions.statistics import get_statistics
+
+    get_statistics(Service.objects.first().get_employees_queryset())
+    list(Team.objects.get(pk=rng.choice(TEAM_IDS)).members.all())
+
+
+def run_child(args):
+    global TEAM_IDS, EMPLOYEE_IDS
+
+    setup_django(args.db)
+
+    from django.db import connection
+
+    from divisions.models import Employee, Team
+
+    if not Team.objects.exists():
+        populate(args.employees)
+    TEAM_IDS = list(Team.objects.values_list("pk", flat=True))
+    EMPLOYEE_IDS = list(Employee.objects.values_list("pk", flat=True))
+    journal_mode = connection.cursor().execute("PRAGMA journal_mode").fetchone()[0]
+    connection.close()
+
+    deadline = time.perf_counter() + args.seconds
+    writes, reads = [], []
+    threads = [
+        threading.Thread(target=worker, args=(write, deadline, writes))
+        for _ in range(args.writers)
+    ] + [
+        threading.Thread(target=worker, args=(read, deadline, reads))
+        for _ in range(args.readers)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    result = {"journal_mode": journal_mode}
+    for name, outcomes in (("writes", writes), ("reads", reads)):
+        durations = [d for done, _ in outcomes for d in done]
+        result[name] = {
+            "ops_per_sec": round(len(durations) / args.seconds, 1),
+            "locked_errors": sum(errors for _, errors in outcomes),
+            **(summarize(durations) if durations else {}),
+        }
+    print(json.dumps(result))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--employees", type=int, default=2000)
+    parser.add_argument("--profile", choices=PROFILES, help=argparse.SUPPRESS)
+    parser.add_argument("--db", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.profile:
+        run_child(args)
+        return
+
+    # Каждый профиль — в отдельном процессе: настройки базы читаются
+    # при запуске Django
+    results = {}
+    for profile in PROFILES:
+        db = os.path.join(tempfile.mkdtemp(prefix="divisions-bench-"), "db.sqlite3")
+        output = subprocess.run(
+            [
+                sys.executable,
+                "-m",
+                "benchmarks.sqlite_concurrency",
+                *sys.argv[1:],
+                "--profile",
+                profile,
+                "--db",
+                db,
+            ],
+            env={**os.environ, "SQLITE_PROFILE": profile},
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+        results[profile] = json.loads(output.splitlines()[-1])
+
+    print(json.dumps(results, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
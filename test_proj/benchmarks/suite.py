@@ -0,0 +1,226 @@
+"""
+Набор замеров по всем эндпоинтам чтения API на синтетической оргструктуре
+(divisions/synthetic.py): list, retrieve, employees, statistics и
+statistics по списку для каждого уровня, список сотрудников, поиск,
+статистика по всей организации и полное дерево (/api/org-tree/).
+
+Для каждого эндпоинта выводится число запросов к базе, p50/p95/max
+длительности, размер ответа и пиковый объём памяти (tracemalloc,
+отдельным прогоном, чтобы трассировка не искажала время). Кэш ответов
+отключается. Результаты сохраняются в JSON (--output) и сравниваются
+с прежним прогоном (--compare): рост числа запросов или p50/памяти больше
+порога считается регрессией, и команда завершается с кодом 1.
+
+    python -m benchmarks.suite --output before.json
+    python -m benchmarks.suite --output after.json --compare before.json
+    python -m benchmarks.suite --fast-rows --compare before.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+from .common import setup_django, summarize, timed
+
+KINDS = ["services", "departments", "divisions", "teams"]
+
+
+def endpoints():
+    """
+    Возвращает пары (имя, путь) для замера.
+    """
+    from divisions.models import Department, Division, Employee, Service, Team
+
+    cases = []
+    for kind, model in zip(KINDS, [Service, Department, Division, Team]):
+        pk = model.objects.order_by("pk").values_list("pk", flat=True).first()
+        cases += [
+            (f"{kind}.list", f"/api/{kind}/"),
+            (f"{kind}.retrieve", f"/api/{kind}/{pk}/"),
+            (f"{kind}.employees", f"/api/{kind}/{pk}/employees/"),
+            (f"{kind}.statistics", f"/api/{kind}/{pk}/statistics/"),
+            (f"{kind}.bulk_statistics", f"/api/{kind}/statistics/"),
+        ]
+    pk = Employee.objects.order_by("pk").values_list("pk", flat=True).first()
+    cases += [
+        ("employees.list", "/api/employees/?page_size=100"),
+        ("employees.retrieve", f"/api/employees/{pk}/"),
+        ("employees.search", "/api/employees/?search=иван&page_size=100"),
+        ("statistics", "/api/statistics/"),
+        ("org_tree", "/api/org-tree/"),
+    ]
+    return cases
+
+
+def measure(client, path, repeat):
+    from django.db import connection, reset_queries
+    from django.test.utils import CaptureQueriesContext
+
+    def get():
+        response = client.get(path)
+        assert response.status_code == 200, (path, response.status_code)
+        return response
+
+    # Прогрев и подсчёт запросов. Журнал запросов очищается по сигналу
+    # request_started, поэтому перед замером он сбрасывается вручную
+    reset_queries()
+    with CaptureQueriesContext(connection) as queries:
+        size = len(get().content)
+
+    tracemalloc.start()
+    get()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {
+        "queries": len(queries),
+        "size": size,
+        "peak_memory_kb": round(peak / 1024, 1),
+        **summarize(timed(get, repeat)),
+    }
+
+
+def metadata(args, counts):
+    import django
+    from django.db import connection
+
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "django": django.get_version(),
+        "database": f"{connection.vendor} {connection.Database.sqlite_version}"
+        if connection.vendor == "sqlite"
+        else connection.vendor,
+        "machine": platform.machine(),
+        "repeat": args.repeat,
+        "tree": counts,
+    }
+
+
+def compare(results, baseline, threshold):
+    """
+    Возвращает список регрессий относительно baseline.
+    """
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        if current["queries"] > previous["queries"]:
+            regressions.append(
+                f"{name}: запросов {previous['queries']} → {current['queries']}"
+            )
+        for metric in ("p50_ms", "peak_memory_kb"):
+            if current[metric] > previous[metric] * (1 + threshold):
+                regressions.append(
+                    f"{name}: {metric} {previous[metric]} → {current[metric]}"
+                )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--services", type=int, default=2)
+    parser.add_argument("--departments", type=int, default=5)
+    parser.add_argument("--divisions", type=int, default=5)
+    parser.add_argument("--teams", type=int, default=5)
+    parser.add_argument("--members", type=int, default=5)
+    parser.add_argument("--overlap", type=float, default=0.1)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--only", help="Замерять только эндпоинты с этой подстрокой")
+    parser.add_argument("--db", help="Готовая база (иначе создаётся временная)")
+    parser.add_argument("--output", help="Файл для результатов в JSON")
+    parser.add_argument("--compare", help="JSON прежнего прогона для сравнения")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.5,
+        help="Допустимый относительный рост p50 и памяти (по умолчанию 0.5).",
+    )
+    parser.add_argument(
+        "--fast-rows",
+        action="store_true",
+        help="Строить списки сотрудников без полей DRF (DIVISIONS_FAST_ROWS).",
+    )
+    args = parser.parse_args()
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "test_proj.settings")
+    from django.conf import settings
+
+    settings.CACHES = {
+        "default": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"}
+    }
+    settings.DIVISIONS_FAST_ROWS = args.fast_rows
+    setup_django(args.db)
+
+    from django.test import Client
+
+    from divisions.models import Department, Division, Employee, Service, Team
+    from divisions.synthetic import generate_org_tree
+
+    if not Service.objects.exists():
+        started = time.perf_counter()
+        generate_org_tree(
+            args.services,
+            args.departments,
+            args.divisions,
+            args.teams,
+            args.members,
+            overlap=args.overlap,
+        )
+        print(
+            f"Оргструктура сгенерирована за {time.perf_counter() - started:.1f} с",
+            file=sys.stderr,
+        )
+    counts = {
+        "services": Service.objects.count(),
+        "departments": Department.objects.count(),
+        "divisions": Division.objects.count(),
+        "teams": Team.objects.count(),
+        "employees": Employee.objects.count(),
+        "memberships": Team.members.through.objects.count(),
+    }
+
+    client = Client(HTTP_ACCEPT="application/json")
+    results = {}
+    for name, path in endpoints():
+        if args.only and args.only not in name:
+            continue
+        results[name] = {"path": path, **measure(client, path, args.repeat)}
+        print(
+            f"{name:32} {results[name]['queries']:4} запр. "
+            f"p50 {results[name]['p50_ms']:9.2f} мс "
+            f"p95 {results[name]['p95_ms']:9.2f} мс "
+            f"память {results[name]['peak_memory_kb']:10.1f} КБ",
+            file=sys.stderr,
+        )
+
+    report = {"meta": metadata(args, counts), "results": results}
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output:
+            json.dump(report, output, ensure_ascii=False, indent=2)
+    else:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as baseline_file:
+            baseline = json.load(baseline_file)
+        if baseline["meta"]["tree"] != counts:
+            print("Внимание: прогоны на оргструктурах разной формы", file=sys.stderr)
+        regressions = compare(results, baseline["results"], args.threshold)
+        for regression in regressions:
+            print(f"РЕГРЕССИЯ {regression}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+        print("Регрессий нет", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""
+Поддержка индекса предков групп (TeamAncestry).
+
+Каждой группе соответствует одна строка с идентификаторами её отдела,
+управления и службы, поэтому выборка сотрудников любого узла сводится
+к одному соединению: Employee → Team.members → TeamAncestry.
+"""
+
+from collections import defaultdict
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Department, Division, Employee, Service, Team, TeamAncestry
+
+
+def _expected_rows(teams=None):
+    """
+    Возвращает актуальные пути групп, вычисленные по внешним ключам:
+    {team_id: (division_id, department_id, service_id)}.
+    """
+    teams = Team.objects.all() if teams is None else teams
+    return {
+        team_id: (division_id, department_id, service_id)
+        for team_id, division_id, department_id, service_id in teams.values_list(
+            "id",
+            "division_id",
+            "division__department_id",
+            "division__department__service_id",
+        )
+    }
+
+
+def sync_teams(teams):
+    """
+    Создаёт или обновляет строки индекса для переданного QuerySet групп.
+    """
+    for team_id, (division_id, department_id, service_id) in _expected_rows(
+        teams
+    ).items():
+        TeamAncestry.objects.update_or_create(
+            team_id=team_id,
+            defaults={
+                "division_id": division_id,
+                "department_id": department_id,
+                "service_id": service_id,
+            },
+        )
+
+
+def sync_division(division):
+    """
+    Переносит пути групп отдела после смены управления.
+    """
+    TeamAncestry.objects.filter(division_id=division.pk).exclude(
+        department_id=division.department_id
+    ).update(
+        department_id=division.department_id,
+        service_id=division.department.service_id,
+    )
+
+
+def sync_department(department):
+    """
+    Переносит пути групп управления после смены службы.
+    """
+    TeamAncestry.objects.filter(department_id=department.pk).exclude(
+        service_id=department.service_id
+    ).update(service_id=department.service_id)
+
+
+@transaction.atomic
+def rebuild(batch_size=1000):
+    """
+    Полностью перестраивает индекс. Возвращает количество строк.
+    """
+    TeamAncestry.objects.all().delete()
+    rows = [
+        TeamAncestry(
+            team_id=team_id,
+            division_id=division_id,
+            department_id=department_id,
+            service_id=service_id,
+        )
+        for team_id, (division_id, department_id, service_id) in _expected_rows().items()
+    ]
+    TeamAncestry.objects.bulk_create(rows, batch_size=batch_size)
+    return len(rows)
+
+
+def check():
+    """
+    Сверяет индекс с внешними ключами.
+    Возвращает словарь со списками missing, stale и orphaned (id групп).
+    """
+    expected = _expected_rows()
+    actual = {
+        team_id: (division_id, department_id, service_id)
+        for team_id, division_id, department_id, service_id in (
+            TeamAncestry.objects.values_list(
+                "team_id", "division_id", "department_id", "service_id"
+            )
+        )
+    }
+    return {
+        "missing": sorted(expected.keys() - actual.keys()),
+        "stale": sorted(
+            team_id
+            for team_id in expected.keys() & actual.keys()
+            if expected[team_id] != actual[team_id]
+        ),
+        "orphaned": sorted(actual.keys() - expected.keys()),
+    }
+
+
+def team_nodes(teams):
+    """
+    Возвращает узлы (имя модели, id) групп из QuerySet teams и всех их предков.
+    """
+    nodes = set()
+    for team_id, division_id, department_id, service_id in (
+        TeamAncestry.objects.filter(team__in=teams).values_list(
+            "team_id", "division_id", "department_id", "service_id"
+        )
+    ):
+        nodes.update(
+            {
+                ("team", team_id),
+                ("division", division_id),
+                ("department", department_id),
+                ("service", service_id),
+            }
+        )
+    return nodes
+
+
+def _division_chain(division_id):
+    nodes = {("division", division_id)}
+    chain = (
+        Division.objects.filter(pk=division_id)
+        .values_list("department_id", "department__service_id")
+        .first()
+    )
+    if chain:
+        nodes.update({("department", chain[0]), ("service", chain[1])})
+    return nodes
+
+
+def affected_nodes(instance):
+    """
+    Возвращает узлы (имя модели, id), содержимое которых зависит от instance:
+    сам узел и его предков, а для сотрудника — все его группы и их предков.
+    Цепочка узлов строится по внешним ключам, а не по индексу, так как индекс
+    при сохранении может быть ещё не синхронизирован.
+    """
+    if isinstance(instance, Service):
+        return {("service", instance.pk)}
+    if isinstance(instance, Department):
+        return {("department", instance.pk), ("service", instance.service_id)}
+    if isinstance(instance, Division):
+        return _division_chain(instance.pk)
+    if isinstance(instance, Team):
+        return {("team", instance.pk)} | _division_chain(instance.division_id)
+    if isinstance(instance, Employee):
+        return team_nodes(Team.objects.filter(members=instance))
+    return set()
+
+
+NODE_MODELS = {
+    model._meta.model_name: model for model in (Service, Department, Division, Team)
+}
+
+
+def touch(nodes, employees=None):
+    """
+    Обновляет метку updated_at у узлов (имя модели, id) и, если переданы,
+    у сотрудников из QuerySet employees — по одному UPDATE на модель.
+    """
+    now = timezone.now()
+    ids = defaultdict(set)
+    for model_name, pk in nodes:
+        if pk is not None:
+            ids[model_name].add(pk)
+    for model_name, pks in ids.items():
+        NODE_MODELS[model_name].objects.filter(pk__in=pks).update(updated_at=now)
+    if employees is not None:
+        employees.update(updated_at=now)
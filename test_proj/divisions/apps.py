@@ -1,6 +1,12 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class DivisionsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'divisions'
+
+    def ready(self):
+        from . import search, signals, tasks  # noqa: F401
+
+        post_migrate.connect(search.check_triggers, sender=self)
@@ -0,0 +1,232 @@
+"""
+Асинхронные (ASGI) представления для чтения оргструктуры: /api/async/...
+
+Повторяют ответы list, retrieve, employees и statistics синхронного API,
+но обращаются к базе через асинхронный ORM (aget, aiterator, aaggregate),
+не блокируя воркер на время запросов. Поддерево узла загружается
+независимыми запросами по уровням (по индексу предков), которые
+выполняются параллельно через asyncio.gather, вместо цепочки
+prefetch_related, где каждый уровень ждёт предыдущий.
+"""
+
+import asyncio
+from collections import defaultdict
+from datetime import date
+
+from django.http import HttpResponse
+from django.views.decorators.http import require_GET
+from rest_framework.exceptions import ValidationError
+from rest_framework.settings import api_settings
+
+from .models import TOTALS_FIELDS, Department, Division, Service, Team
+from .rows import get_row_builder
+from .serializers import (
+    DepartmentSerializer,
+    DivisionSerializer,
+    EmployeeSerializer,
+    EmployeeTeamsSerializer,
+    ServiceSerializer,
+    TeamSerializer,
+    get_tree_relations,
+    with_teams_requested,
+)
+from .statistics import (
+    aget_org_statistics,
+    later_anniversaries,
+    later_counts,
+    totals_statistics,
+)
+
+NODES = {
+    "services": (Service, ServiceSerializer),
+    "departments": (Department, DepartmentSerializer),
+    "divisions": (Division, DivisionSerializer),
+    "teams": (Team, TeamSerializer),
+}
+
+# Уровни дерева сверху вниз, связи с дочерним уровнем, поле родителя
+# и пути от модели уровня к каждому из предков
+CHAIN = [Service, Department, Division, Team]
+CHILDREN = {Service: "departments", Department: "divisions", Division: "teams"}
+PARENT_FIELDS = {
+    Department: "service_id",
+    Division: "department_id",
+    Team: "division_id",
+}
+ANCESTOR_LOOKUPS = {
+    Department: {Service: "service"},
+    Division: {Service: "department__service", Department: "department"},
+    Team: {
+        Service: "ancestry__service",
+        Department: "ancestry__department",
+        Division: "division",
+    },
+}
+
+NOT_FOUND = {"detail": "Not found."}
+
+
+def get_renderer():
+    """
+    JSON-рендерер из DEFAULT_RENDERER_CLASSES, как у синхронных представлений.
+    """
+    return next(
+        renderer()
+        for renderer in api_settings.DEFAULT_RENDERER_CLASSES
+        if renderer.format == "json"
+    )
+
+
+def render(data, status=200):
+    return HttpResponse(
+        get_renderer().render(data), status=status, content_type="application/json"
+    )
+
+
+async def _fetch(queryset):
+    return [obj async for obj in queryset]
+
+
+def _set_related(instance, name, objects):
+    """
+    Кладёт объекты в кэш prefetch_related связи name, чтобы
+    сериализаторы читали instance.<name>.all() без запросов.
+    """
+    queryset = getattr(instance, name).all()
+    queryset._result_cache = objects
+    queryset._prefetch_done = True
+    instance.__dict__.setdefault("_prefetched_objects_cache", {})[name] = queryset
+
+
+def _get_depth(model, request):
+    """
+    Возвращает число уровней поддерева model, которые нужно загрузить
+    с учётом ?fields= и ?depth= (сотрудники групп — последний уровень).
+    """
+    relations = [CHILDREN[level] for level in CHAIN[CHAIN.index(model) : -1]]
+    return len(get_tree_relations(relations + ["members"], request))
+
+
+async def _attach_subtree(roots, model, depth=None):
+    """
+    Загружает поддеревья узлов roots (объекты модели model) на depth уровней
+    вниз (по умолчанию — все уровни и сотрудников групп): по одному запросу
+    на уровень, все запросы выполняются параллельно.
+    """
+    ids = [root.pk for root in roots]
+    levels = CHAIN[CHAIN.index(model) + 1 :]
+    with_members = depth is None or depth > len(levels)
+    levels = levels[:depth]
+    fetches = [
+        _fetch(
+            level.objects.filter(
+                **{f"{ANCESTOR_LOOKUPS[level][model]}__in": ids}
+            ).order_by("pk")
+        )
+        for level in levels
+    ]
+    if with_members:
+        memberships = Team.members.through.objects.filter(
+            **{f"team__{model.team_lookup}__in": ids}
+        ).select_related("employee")
+        fetches.append(_fetch(memberships.order_by("employee_id")))
+    children = await asyncio.gather(*fetches)
+
+    parents, parent_model = roots, model
+    for level, objects in zip(levels, children):
+        grouped = defaultdict(list)
+        for obj in objects:
+            grouped[getattr(obj, PARENT_FIELDS[level])].append(obj)
+        for parent in parents:
+            _set_related(parent, CHILDREN[parent_model], grouped[parent.pk])
+        parents, parent_model = objects, level
+
+    if not with_members:
+        return
+    members = defaultdict(list)
+    for membership in children[-1]:
+        members[membership.team_id].append(membership.employee)
+    for team in parents:
+        _set_related(team, "members", members[team.pk])
+
+
+def _get_node_model(kind):
+    return NODES.get(kind, (None, None))
+
+
+@require_GET
+async def node_list(request, kind):
+    model, serializer_class = _get_node_model(kind)
+    if model is None:
+        return render(NOT_FOUND, status=404)
+    try:
+        depth = _get_depth(model, request)
+    except ValidationError as exc:
+        return render(exc.detail, status=400)
+    nodes = await _fetch(model.objects.order_by("pk"))
+    await _attach_subtree(nodes, model, depth)
+    context = {"request": request}
+    return render(serializer_class(nodes, many=True, context=context).data)
+
+
+@require_GET
+async def node_detail(request, kind, pk):
+    model, serializer_class = _get_node_model(kind)
+    if model is None:
+        return render(NOT_FOUND, status=404)
+    try:
+        depth = _get_depth(model, request)
+    except ValidationError as exc:
+        return render(exc.detail, status=400)
+    try:
+        node = await model.objects.aget(pk=pk)
+    except model.DoesNotExist:
+        return render(NOT_FOUND, status=404)
+    await _attach_subtree([node], model, depth)
+    return render(serializer_class(node, context={"request": request}).data)
+
+
+@require_GET
+async def node_employees(request, kind, pk):
+    model, _ = _get_node_model(kind)
+    if model is None or not await model.objects.filter(pk=pk).aexists():
+        return render(NOT_FOUND, status=404)
+    with_teams = with_teams_requested(request)
+    queryset = model(pk=pk).get_employees_queryset(with_teams=with_teams)
+    serializer_class = EmployeeTeamsSerializer if with_teams else EmployeeSerializer
+    context = {"request": request}
+    builder = get_row_builder(serializer_class, context)
+    if builder is not None:
+        queryset = builder.queryset(queryset)
+    employees = [employee async for employee in queryset.aiterator(chunk_size=2000)]
+    if builder is not None:
+        return render(builder.build_many(employees))
+    return render(serializer_class(employees, many=True, context=context).data)
+
+
+@require_GET
+async def node_statistics(request, kind, pk):
+    model, _ = _get_node_model(kind)
+    totals = None
+    if model is not None:
+        totals = (
+            await model.objects.filter(pk=pk).values_list(*TOTALS_FIELDS).afirst()
+        )
+    if totals is None:
+        return render(NOT_FOUND, status=404)
+    today = date.today()
+    node_type = model._meta.model_name
+    later = later_counts(
+        [
+            row
+            async for row in later_anniversaries(
+                today, node_type=node_type, node_id=pk
+            )
+        ]
+    )
+    return render(totals_statistics(*totals, later[node_type, pk], today))
+
+
+@require_GET
+async def org_statistics(request):
+    return render(await aget_org_statistics())
@@ -0,0 +1,184 @@
+"""
+Пакетный импорт и экспорт сотрудников в форматах CSV и NDJSON.
+
+Входные данные разбираются потоково, построчно; запись идёт порциями:
+bulk_create сотрудников и одна вставка в таблицу членства на порцию,
+каждая порция — в своей транзакции. Строки с ошибками пропускаются
+и попадают в отчёт, остальные строки порции сохраняются.
+"""
+
+import csv
+import io
+import json
+from itertools import islice
+
+from django.db import transaction
+from rest_framework import serializers
+from rest_framework.utils.encoders import JSONEncoder
+
+from .models import Employee, Team
+from .signals import memberships_changed
+
+FIELDS = ["full_name", "position", "date_of_birth", "start_date", "teams"]
+EXPORT_FIELDS = ["id"] + FIELDS
+FORMATS = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+
+
+class EmployeeImportSerializer(serializers.ModelSerializer):
+    teams = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), required=False, default=list
+    )
+
+    class Meta:
+        model = Employee
+        fields = FIELDS
+
+
+def _decode(lines):
+    for line in lines:
+        yield line.decode("utf-8-sig") if isinstance(line, bytes) else line
+
+
+def parse_csv(lines):
+    """
+    Разбирает CSV с заголовком. Группы перечисляются в колонке teams через «;».
+    Возвращает пары (номер строки, словарь).
+    """
+    reader = csv.DictReader(_decode(lines))
+    for row in reader:
+        row = {key: value for key, value in row.items() if key is not None}
+        teams = (row.get("teams") or "").strip()
+        row["teams"] = [team for team in teams.split(";") if team] if teams else []
+        yield reader.line_num, row
+
+
+def parse_ndjson(lines):
+    """
+    Разбирает NDJSON: один JSON-объект на строку, пустые строки пропускаются.
+    Возвращает пары (номер строки, словарь или сообщение об ошибке).
+    """
+    for line_num, line in enumerate(_decode(lines), start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as exc:
+            row = f"Некорректный JSON: {exc}"
+        if not isinstance(row, (dict, str)):
+            row = "Ожидается JSON-объект."
+        yield line_num, row
+
+
+PARSERS = {
+    "csv": parse_csv,
+    "ndjson": parse_ndjson,
+}
+
+
+def format_for_content_type(content_type):
+    """
+    Возвращает формат ("csv" или "ndjson") по Content-Type либо None.
+    """
+    for fmt, expected in FORMATS.items():
+        if content_type.startswith(expected):
+            return fmt
+    return None
+
+
+def import_employees(rows, batch_size=1000):
+    """
+    Импортирует сотрудников из пар (номер строки, данные).
+    Возвращает отчёт: количество созданных и список ошибок по строкам.
+    """
+    report = {"created": 0, "errors": []}
+    rows = iter(rows)
+    while batch := list(islice(rows, batch_size)):
+        _import_batch(batch, report)
+    return report
+
+
+def _import_batch(batch, report):
+    valid = []
+    for line_num, data in batch:
+        if isinstance(data, str):
+            errors = {"non_field_errors": [data]}
+            report["errors"].append({"row": line_num, "errors": errors})
+            continue
+        serializer = EmployeeImportSerializer(data=data)
+        if serializer.is_valid():
+            valid.append((line_num, serializer.validated_data))
+        else:
+            report["errors"].append({"row": line_num, "errors": serializer.errors})
+
+    # Несуществующие группы проверяются одним запросом на порцию
+    requested = {team_id for _, data in valid for team_id in data["teams"]}
+    existing = set(Team.objects.filter(pk__in=requested).values_list("pk", flat=True))
+    rows = []
+    for line_num, data in valid:
+        missing = sorted(set(data["teams"]) - existing)
+        if missing:
+            errors = {"teams": [f"Группы не найдены: {missing}"]}
+            report["errors"].append({"row": line_num, "errors": errors})
+        else:
+            rows.append(data)
+
+    if not rows:
+        return
+
+    Membership = Team.members.through
+    with transaction.atomic():
+        employees = Employee.objects.bulk_create(
+            Employee(**{key: value for key, value in data.items() if key != "teams"})
+            for data in rows
+        )
+        memberships = [
+            Membership(team_id=team_id, employee_id=employee.pk)
+            for employee, data in zip(employees, rows)
+            for team_id in dict.fromkeys(data["teams"])
+        ]
+        Membership.objects.bulk_create(memberships)
+        if memberships:
+            memberships_changed(
+                {m.team_id for m in memberships}, {m.employee_id for m in memberships}
+            )
+    report["created"] += len(employees)
+
+
+def export_employees(queryset, fmt, chunk_size=1000):
+    """
+    Потоково выгружает сотрудников в CSV или NDJSON порциями по chunk_size.
+    Возвращает генератор байтовых строк.
+    """
+    queryset = queryset.prefetch_related("team_members").order_by("pk")
+    rows = (
+        {
+            "id": employee.pk,
+            "full_name": employee.full_name,
+            "position": employee.position,
+            "date_of_birth": employee.date_of_birth,
+            "start_date": employee.start_date,
+            "teams": sorted(team.pk for team in employee.team_members.all()),
+        }
+        for employee in queryset.iterator(chunk_size=chunk_size)
+    )
+
+    if fmt == "ndjson":
+        for row in rows:
+            yield (json.dumps(row, cls=JSONEncoder, ensure_ascii=False) + "\n").encode()
+        return
+
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS)
+    writer.writeheader()
+    yield buffer.getvalue().encode()
+    buffer.seek(0)
+    buffer.truncate()
+    for row in rows:
+        row["teams"] = ";".join(map(str, row["teams"]))
+        writer.writerow(row)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
@@ -0,0 +1,158 @@
+"""
+Кэш ответов API оргструктуры с версионированием по поддеревьям.
+
+У каждого узла (служба, управление, отдел, группа) есть счётчик версии,
+а у дерева в целом — корневой счётчик. Ключ закэшированного ответа включает
+версию узла, поэтому при изменении поддерева достаточно увеличить версии
+затронутых узлов и их предков: устаревшие ответы просто перестают читаться
+и вытесняются бэкендом кэша по таймауту.
+
+Ключ включает и поколение кэша — отметку файла снимка для чтения
+(SQLITE_REPLICA_PATH): пока снимок отстаёт от основной базы, ответ,
+построенный по нему после записи, может попасть в кэш под новой версией
+узла, и после обновления снимка такие ответы не должны читаться.
+Команда refresh_read_replica подменяет файл целиком, поэтому поколение
+меняется во всех воркерах без общего кэша и без отдельного счётчика.
+"""
+
+import functools
+import hashlib
+import os
+import time
+from datetime import date
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from rest_framework.response import Response
+
+ROOT = ("tree", 0)
+HITS_KEY = "divisions:cache:hits"
+MISSES_KEY = "divisions:cache:misses"
+
+
+def get_cache():
+    return caches[getattr(settings, "DIVISIONS_CACHE_ALIAS", "default")]
+
+
+def _version_key(node):
+    return "divisions:version:{}:{}".format(*node)
+
+
+def _incr(key):
+    cache = get_cache()
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 1, timeout=None)
+
+
+def get_version(node):
+    """
+    Возвращает текущую версию узла (имя модели, id).
+    Отсутствующая версия инициализируется текущим временем, чтобы после
+    вытеснения счётчика не совпасть со старыми ключами ответов.
+    """
+    cache = get_cache()
+    key = _version_key(node)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def bump_versions(nodes):
+    """
+    Увеличивает версии узлов и корня дерева.
+    """
+    cache = get_cache()
+    for key in [_version_key(node) for node in nodes | {ROOT}]:
+        try:
+            cache.incr(key)
+        except ValueError:
+            # Версии ещё нет — её инициализирует первое чтение
+            pass
+
+
+def get_generation():
+    """
+    Возвращает поколение кэша: устройство, inode и время изменения файла
+    снимка для чтения, или пустую строку, если снимок не используется.
+    """
+    path = getattr(settings, "SQLITE_REPLICA_PATH", None)
+    if not path:
+        return ""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return ""
+    return f"{stat.st_dev}:{stat.st_ino}:{stat.st_mtime_ns}"
+
+
+def invalidate(nodes):
+    """
+    Инвалидирует ответы узлов сразу и повторно после фиксации транзакции,
+    чтобы параллельный запрос не закэшировал данные до коммита.
+    """
+    nodes = set(nodes)
+    bump_versions(nodes)
+    transaction.on_commit(lambda: bump_versions(nodes))
+
+
+def get_stats():
+    """
+    Возвращает счётчики попаданий и промахов кэша ответов.
+    """
+    cache = get_cache()
+    return {
+        "hits": cache.get(HITS_KEY, 0),
+        "misses": cache.get(MISSES_KEY, 0),
+    }
+
+
+def cached_response(view=None, *, daily=False):
+    """
+    Декоратор действий ViewSet: кэширует данные успешного ответа.
+    Детальные действия привязываются к версии своего узла, списочные —
+    к версии всего дерева. При daily=True в ключ входит текущая дата
+    (для статистики, зависящей от сегодняшнего дня).
+    """
+    if view is None:
+        return functools.partial(cached_response, daily=daily)
+
+    @functools.wraps(view)
+    def wrapper(self, request, *args, **kwargs):
+        pk = kwargs.get(self.lookup_url_kwarg or self.lookup_field)
+        node = (self.queryset.model._meta.model_name, pk) if pk else ROOT
+        # Поколение читается до запросов к снимку: ответ по более новому
+        # снимку может попасть только под прежнее поколение, но не наоборот
+        parts = [
+            self.basename,
+            self.action,
+            get_version(node),
+            get_generation(),
+            date.today().isoformat() if daily else "",
+            request.get_full_path(),
+            request.accepted_renderer.format,
+        ]
+        key = "divisions:response:" + hashlib.sha1(
+            "|".join(map(str, parts)).encode()
+        ).hexdigest()
+
+        cache = get_cache()
+        data = cache.get(key)
+        if data is not None:
+            _incr(HITS_KEY)
+            return Response(data, headers={"X-Cache": "HIT"})
+
+        _incr(MISSES_KEY)
+        response = view(self, request, *args, **kwargs)
+        if isinstance(response, Response) and response.status_code == 200:
+            cache.set(
+                key, response.data, getattr(settings, "DIVISIONS_CACHE_TIMEOUT", 300)
+            )
+            response["X-Cache"] = "MISS"
+        return response
+
+    return wrapper
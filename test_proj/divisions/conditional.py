@@ -0,0 +1,80 @@
+"""
+Условные GET-запросы (ETag / Last-Modified) для API оргструктуры.
+
+Метка изменения берётся из поля updated_at: у узла оно обновляется при любом
+изменении поддерева, поэтому для детального ответа достаточно прочитать одно
+поле, а для списка — максимум и количество строк. Если клиент прислал
+совпадающий If-None-Match, ответ 304 отдаётся без сериализации.
+"""
+
+import functools
+import hashlib
+from calendar import timegm
+from datetime import date, datetime, time
+
+from django.db.models import Count, Max
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+
+def _get_marker(model, pk):
+    """
+    Возвращает (updated_at, количество) для объекта pk или для всей таблицы.
+    """
+    if pk is not None:
+        updated_at = (
+            model.objects.filter(pk=pk).values_list("updated_at", flat=True).first()
+        )
+        return updated_at, int(updated_at is not None)
+    marker = model.objects.aggregate(updated_at=Max("updated_at"), count=Count("pk"))
+    return marker["updated_at"], marker["count"]
+
+
+def conditional_response(view=None, *, daily=False):
+    """
+    Декоратор действий представления: проставляет ETag и Last-Modified
+    и отвечает 304, если представление клиента актуально.
+    При daily=True ответ дополнительно зависит от текущей даты.
+    """
+    if view is None:
+        return functools.partial(conditional_response, daily=daily)
+
+    @functools.wraps(view)
+    def wrapper(self, request, *args, **kwargs):
+        lookup = getattr(self, "lookup_url_kwarg", None) or getattr(
+            self, "lookup_field", "pk"
+        )
+        pk = kwargs.get(lookup)
+        updated_at, count = _get_marker(self.queryset.model, pk)
+        if pk is not None and updated_at is None:
+            # Объекта нет — пусть представление вернёт 404
+            return view(self, request, *args, **kwargs)
+
+        parts = [
+            request.get_full_path(),
+            request.accepted_renderer.format,
+            updated_at.isoformat() if updated_at else "",
+            count,
+        ]
+        if daily:
+            today = date.today()
+            parts.append(today.isoformat())
+            midnight = timezone.make_aware(datetime.combine(today, time.min))
+            updated_at = max(updated_at, midnight) if updated_at else midnight
+        etag = quote_etag(hashlib.sha1("|".join(map(str, parts)).encode()).hexdigest())
+        last_modified = timegm(updated_at.utctimetuple()) if updated_at else None
+
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is None:
+            response = view(self, request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+        response["ETag"] = etag
+        if last_modified is not None:
+            response["Last-Modified"] = http_date(last_modified)
+        return response
+
+    return wrapper
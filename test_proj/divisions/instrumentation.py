@@ -0,0 +1,277 @@
+"""
+Инструментирование запросов API: число и время SQL-запросов, время
+обработчика (сериализации) и рендеринга, размер ответа.
+
+InstrumentationMiddleware собирает метрики каждого запроса, добавляет
+заголовок Server-Timing и складывает значения в скользящее окно по метке
+представления. Метку вида ServiceViewSet.statistics проставляет
+InstrumentedViewMixin; для прочих представлений используется имя маршрута.
+Окно доступно по /api/metrics/.
+
+Если задан DIVISIONS_QUERY_LOG_THRESHOLD и запрос выполнил больше запросов
+к базе, в лог пишутся повторяющиеся «отпечатки» SQL (текст запроса без
+параметров) — признак N+1. Тексты запросов копятся только при заданном
+пороге, а отпечатки вычисляются в конце запроса по различным текстам.
+"""
+
+import logging
+import math
+import re
+import threading
+import time
+from collections import Counter, defaultdict, deque
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+logger = logging.getLogger(__name__)
+
+# Границы корзин гистограммы длительности запроса, мс
+BUCKETS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+METRICS = ("total_ms", "db_ms", "queries", "serialize_ms", "render_ms", "size")
+
+IN_LIST_RE = re.compile(r"\bIN \((?:%s|\?)(?:, (?:%s|\?))*\)")
+NUMBER_RE = re.compile(r"\b\d+\b")
+
+current = ContextVar("divisions_request_metrics", default=None)
+
+
+class RequestMetrics:
+    def __init__(self, collect_sql=False):
+        self.tag = None
+        self.queries = 0
+        self.db_time = 0.0
+        self.serialize_time = 0.0
+        self.render_time = 0.0
+        # Число выполнений каждого текста SQL (только для лога повторов)
+        self.statements = Counter() if collect_sql else None
+
+    def fingerprints(self):
+        fingerprints = Counter()
+        for sql, count in (self.statements or {}).items():
+            fingerprints[fingerprint(sql)] += count
+        return fingerprints
+
+
+def fingerprint(sql):
+    """
+    Приводит SQL к отпечатку: списки параметров IN (...) разной длины
+    и числовые литералы схлопываются.
+    """
+    return NUMBER_RE.sub("N", IN_LIST_RE.sub("IN (...)", sql))
+
+
+def _execute_wrapper(execute, sql, params, many, context):
+    metrics = current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.db_time += time.perf_counter() - started
+        metrics.queries += 1
+        if metrics.statements is not None:
+            metrics.statements[sql] += 1
+
+
+@receiver(connection_created)
+def install_execute_wrapper(sender, connection, **kwargs):
+    # Обёртка ставится на соединение один раз и считает запросы только
+    # внутри инструментируемого запроса (в том числе из потоков sync_to_async,
+    # куда контекст передаётся вместе с ContextVar)
+    if _execute_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_execute_wrapper)
+
+
+class MetricsStore:
+    """
+    Скользящее окно последних DIVISIONS_METRICS_WINDOW измерений
+    по каждой метке представления.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = defaultdict(self._new_window)
+
+    def _new_window(self):
+        return deque(maxlen=getattr(settings, "DIVISIONS_METRICS_WINDOW", 1000))
+
+    def add(self, tag, sample):
+        with self.lock:
+            self.samples[tag].append(sample)
+
+    def clear(self):
+        with self.lock:
+            self.samples.clear()
+
+    def snapshot(self):
+        with self.lock:
+            samples = {tag: list(window) for tag, window in self.samples.items()}
+        return {tag: _summarize(window) for tag, window in sorted(samples.items())}
+
+
+def _percentile(ordered, fraction):
+    # Ближайший ранг; так же считает p95 benchmarks/common.py
+    return ordered[max(0, math.ceil(len(ordered) * fraction) - 1)]
+
+
+def _summarize(window):
+    summary = {"count": len(window)}
+    for metric in METRICS:
+        ordered = sorted(sample[metric] for sample in window if metric in sample)
+        if ordered:
+            summary[metric] = {
+                "p50": round(_percentile(ordered, 0.5), 3),
+                "p95": round(_percentile(ordered, 0.95), 3),
+                "max": round(ordered[-1], 3),
+            }
+    labels = [f"le_{bound}" for bound in BUCKETS] + ["inf"]
+    histogram = Counter(
+        next(
+            (
+                label
+                for label, bound in zip(labels, BUCKETS)
+                if sample["total_ms"] <= bound
+            ),
+            "inf",
+        )
+        for sample in window
+    )
+    summary["histogram"] = {label: histogram[label] for label in labels}
+    return summary
+
+
+store = MetricsStore()
+
+
+class InstrumentationMiddleware:
+    """
+    Собирает метрики запроса и добавляет заголовок Server-Timing.
+    Работает и с синхронными, и с асинхронными представлениями.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        for connection in connections.all(initialized_only=True):
+            install_execute_wrapper(None, connection)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        metrics = _new_metrics()
+        token = current.set(metrics)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            current.reset(token)
+        return self.finish(request, response, metrics, started)
+
+    async def __acall__(self, request):
+        metrics = _new_metrics()
+        token = current.set(metrics)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            current.reset(token)
+        return self.finish(request, response, metrics, started)
+
+    def finish(self, request, response, metrics, started):
+        total = (time.perf_counter() - started) * 1000
+        db_ms = metrics.db_time * 1000
+        tag = metrics.tag or _route_tag(request)
+        sample = {
+            "total_ms": total,
+            "db_ms": db_ms,
+            "queries": metrics.queries,
+            "serialize_ms": metrics.serialize_time * 1000,
+            "render_ms": metrics.render_time * 1000,
+        }
+        if not response.streaming:
+            sample["size"] = len(response.content)
+        store.add(tag, sample)
+
+        response["Server-Timing"] = ", ".join(
+            [
+                f'db;dur={db_ms:.1f};desc="{metrics.queries} queries"',
+                f"serialize;dur={sample['serialize_ms']:.1f}",
+                f"render;dur={sample['render_ms']:.1f}",
+                f"total;dur={total:.1f}",
+            ]
+        )
+
+        threshold = getattr(settings, "DIVISIONS_QUERY_LOG_THRESHOLD", None)
+        if threshold is not None and metrics.queries > threshold:
+            duplicates = [
+                (count, sql)
+                for sql, count in metrics.fingerprints().most_common()
+                if count > 1
+            ]
+            logger.warning(
+                "%s %s: %d запросов к базе (порог %d), повторы:\n%s",
+                tag,
+                request.get_full_path(),
+                metrics.queries,
+                threshold,
+                "\n".join(f"{count} × {sql}" for count, sql in duplicates) or "нет",
+            )
+        return response
+
+
+def _new_metrics():
+    threshold = getattr(settings, "DIVISIONS_QUERY_LOG_THRESHOLD", None)
+    return RequestMetrics(collect_sql=threshold is not None)
+
+
+def _route_tag(request):
+    match = getattr(request, "resolver_match", None)
+    return match.view_name if match and match.view_name else "unresolved"
+
+
+class InstrumentedViewMixin:
+    """
+    Миксин для представлений DRF: метка «Класс.действие» и время
+    обработчика (без учёта запросов к базе) и рендеринга ответа.
+    """
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        metrics = current.get()
+        if metrics is not None:
+            action = getattr(self, "action", None) or request.method.lower()
+            metrics.tag = f"{type(self).__name__}.{action}"
+            self._handler_started = (time.perf_counter(), metrics.db_time)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        metrics = current.get()
+        if metrics is None or not hasattr(self, "_handler_started"):
+            return response
+        started, db_time = self._handler_started
+        metrics.serialize_time += (time.perf_counter() - started) - (
+            metrics.db_time - db_time
+        )
+
+        render = getattr(response, "render", None)
+        if render is not None:
+
+            def timed_render():
+                render_started = time.perf_counter()
+                try:
+                    return render()
+                finally:
+                    metrics.render_time += time.perf_counter() - render_started
+
+            response.render = timed_render
+        return response
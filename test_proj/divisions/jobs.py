@@ -0,0 +1,252 @@
+"""
+Фоновые задачи на таблице Job.
+
+Тяжёлые операции (каскадное удаление узла, сверка сумм, перестроение
+индексов) регистрируются декоратором @register под именем и ставятся
+в очередь через enqueue(): представление сразу отвечает 202 с id задачи,
+а выполняет её команда run_jobs в пуле потоков. Ход и результат задачи
+отдаются по /api/jobs/<id>/.
+
+- Дедупликация: пока задача с теми же именем и параметрами ожидает
+  выполнения, enqueue() возвращает её же (частичный уникальный индекс
+  по key для статуса pending).
+- Захват: задача переводится в running условным UPDATE, поэтому
+  несколько воркеров не выполнят её дважды.
+- Повторы: при исключении задача возвращается в очередь с экспоненциальной
+  задержкой RETRY_DELAY * 2^(попытка - 1), после max_attempts — failed.
+  Задачи, зависшие в running дольше stale_after (воркер остановлен
+  посреди работы), возвращаются в очередь requeue_stale().
+"""
+
+import hashlib
+import json
+import logging
+import threading
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import timedelta
+
+from django.db import IntegrityError, connections, transaction
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+RETRY_DELAY = 5  # секунд перед первой повторной попыткой
+
+_registry = {}
+_current = threading.local()
+
+
+class UnknownJob(LookupError):
+    pass
+
+
+def register(name, max_attempts=3):
+    """
+    Декоратор: регистрирует функцию как задачу name. Функция получает
+    параметры задачи именованными аргументами и возвращает результат,
+    сериализуемый в JSON.
+    """
+
+    def decorator(func):
+        _registry[name] = (func, max_attempts)
+        return func
+
+    return decorator
+
+
+def get_registry():
+    return dict(_registry)
+
+
+def job_key(name, params):
+    payload = json.dumps([name, params], sort_keys=True, separators=(",", ":"))
+    return hashlib.sha1(payload.encode()).hexdigest()
+
+
+def enqueue(name, **params):
+    """
+    Ставит задачу в очередь и возвращает её. Если такая же задача уже
+    ожидает выполнения, новая не создаётся.
+    """
+    if name not in _registry:
+        raise UnknownJob(name)
+    key = job_key(name, params)
+    pending = Job.objects.filter(key=key, status=Job.PENDING)
+    existing = pending.first()
+    if existing is not None:
+        return existing
+    try:
+        with transaction.atomic():
+            return Job.objects.create(
+                name=name,
+                params=params,
+                key=key,
+                max_attempts=_registry[name][1],
+                run_after=timezone.now(),
+            )
+    except IntegrityError:
+        # Такую же задачу одновременно поставил другой запрос; воркер
+        # мог уже захватить её, поэтому статус не проверяется
+        return Job.objects.filter(key=key).order_by("-pk").first()
+
+
+def set_progress(**progress):
+    """
+    Сохраняет ход выполнения текущей задачи (вызывается из функции задачи;
+    вне воркера ничего не делает).
+    """
+    job = getattr(_current, "job", None)
+    if job is not None:
+        job.progress = progress
+        Job.objects.filter(pk=job.pk).update(progress=progress)
+
+
+def claim():
+    """
+    Захватывает следующую готовую к выполнению задачу. Возвращает её
+    или None, если очередь пуста.
+    """
+    while True:
+        job = (
+            Job.objects.filter(status=Job.PENDING, run_after__lte=timezone.now())
+            .order_by("run_after", "pk")
+            .first()
+        )
+        if job is None:
+            return None
+        claimed = Job.objects.filter(pk=job.pk, status=Job.PENDING).update(
+            status=Job.RUNNING,
+            attempts=job.attempts + 1,
+            started_at=timezone.now(),
+        )
+        if claimed:
+            job.refresh_from_db()
+            return job
+
+
+def _call(job):
+    """
+    Вызывает функцию задачи. Возвращает (результат, текст ошибки или None).
+    """
+    func, _ = _registry.get(job.name, (None, None))
+    _current.job = job
+    try:
+        if func is None:
+            raise UnknownJob(job.name)
+        return func(**job.params), None
+    except Exception:
+        logger.warning("Задача %s #%s завершилась ошибкой", job.name, job.pk)
+        return None, traceback.format_exc()
+    finally:
+        _current.job = None
+
+
+def _call_in_thread(job):
+    try:
+        return _call(job)
+    finally:
+        # У каждого потока пула своё соединение с базой
+        connections.close_all()
+
+
+def _record(job, result, error):
+    """
+    Сохраняет результат задачи либо возвращает её в очередь для повтора.
+    """
+    if error is None:
+        _finish(
+            job,
+            status=Job.SUCCEEDED,
+            result=result,
+            error="",
+            finished_at=timezone.now(),
+        )
+    elif job.attempts < job.max_attempts:
+        delay = RETRY_DELAY * 2 ** (job.attempts - 1)
+        _finish(
+            job,
+            status=Job.PENDING,
+            error=error,
+            run_after=timezone.now() + timedelta(seconds=delay),
+        )
+    else:
+        _finish(job, status=Job.FAILED, error=error, finished_at=timezone.now())
+    return job
+
+
+def execute(job):
+    """
+    Выполняет захваченную задачу в текущем потоке и сохраняет результат.
+    """
+    return _record(job, *_call(job))
+
+
+def _finish(job, **fields):
+    for name, value in fields.items():
+        setattr(job, name, value)
+    try:
+        with transaction.atomic():
+            job.save(update_fields=list(fields))
+    except IntegrityError:
+        # Пока задача выполнялась, такую же поставили в очередь снова:
+        # повтор не нужен, ожидающая задача выполнит ту же работу
+        job.status = Job.FAILED
+        job.finished_at = timezone.now()
+        job.save(update_fields=["status", "error", "finished_at"])
+
+
+def requeue_stale(stale_after):
+    """
+    Возвращает в очередь задачи, выполняющиеся дольше stale_after секунд.
+    Возвращает их количество.
+    """
+    started_before = timezone.now() - timedelta(seconds=stale_after)
+    requeued = 0
+    for job in Job.objects.filter(status=Job.RUNNING, started_at__lt=started_before):
+        try:
+            with transaction.atomic():
+                requeued += Job.objects.filter(pk=job.pk, status=Job.RUNNING).update(
+                    status=Job.PENDING, run_after=timezone.now()
+                )
+        except IntegrityError:
+            Job.objects.filter(pk=job.pk).update(
+                status=Job.FAILED, finished_at=timezone.now()
+            )
+    return requeued
+
+
+def run_pending(workers=1, limit=None):
+    """
+    Выполняет готовые задачи, пока очередь не опустеет (или пока не будет
+    выполнено limit задач). При workers > 1 функции задач выполняются
+    в пуле потоков, а захват задач и запись результатов — в вызывающем
+    потоке, поэтому очередь меняет только он.
+    Возвращает выполненные задачи.
+    """
+    done = []
+    if workers <= 1:
+        while limit is None or len(done) < limit:
+            job = claim()
+            if job is None:
+                break
+            done.append(execute(job))
+        return done
+
+    running = {}
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="jobs") as pool:
+        while True:
+            while len(running) < workers and (
+                limit is None or len(done) + len(running) < limit
+            ):
+                job = claim()
+                if job is None:
+                    break
+                running[pool.submit(_call_in_thread, job)] = job
+            if not running:
+                return done
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                done.append(_record(running.pop(future), *future.result()))
@@ -0,0 +1,24 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from divisions import bulk
+from divisions.models import Employee
+
+
+class Command(BaseCommand):
+    help = "Потоково выгружает сотрудников в CSV или NDJSON."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--format", choices=sorted(bulk.FORMATS), default="ndjson"
+        )
+        parser.add_argument("--output", help="Путь к файлу (по умолчанию stdout).")
+
+    def handle(self, *args, **options):
+        stream = open(options["output"], "wb") if options["output"] else None
+        out = stream or sys.stdout.buffer
+        for chunk in bulk.export_employees(Employee.objects.all(), options["format"]):
+            out.write(chunk)
+        if stream:
+            stream.close()
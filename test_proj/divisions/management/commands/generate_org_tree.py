@@ -0,0 +1,48 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from divisions.synthetic import generate_org_tree
+
+
+class Command(BaseCommand):
+    help = (
+        "Генерирует синтетическую оргструктуру заданной формы "
+        "(bulk-вставками) для нагрузочных замеров."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--services", type=int, default=50)
+        parser.add_argument("--departments", type=int, default=20)
+        parser.add_argument("--divisions", type=int, default=10)
+        parser.add_argument("--teams", type=int, default=10)
+        parser.add_argument(
+            "--members", type=int, default=5, help="Сотрудников в каждой группе."
+        )
+        parser.add_argument(
+            "--overlap",
+            type=float,
+            default=0.0,
+            help="Доля сотрудников, состоящих ещё в одной группе службы (0..1).",
+        )
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--batch-size", type=int, default=5000)
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        counts = generate_org_tree(
+            options["services"],
+            options["departments"],
+            options["divisions"],
+            options["teams"],
+            options["members"],
+            overlap=options["overlap"],
+            seed=options["seed"],
+            batch_size=options["batch_size"],
+        )
+        summary = ", ".join(f"{name}: {count}" for name, count in counts.items())
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Создано за {time.perf_counter() - started:.1f} с — {summary}."
+            )
+        )
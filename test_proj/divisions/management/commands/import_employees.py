@@ -0,0 +1,41 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from divisions import bulk
+
+
+class Command(BaseCommand):
+    help = "Пакетно импортирует сотрудников из CSV или NDJSON."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Путь к файлу или «-» для stdin.")
+        parser.add_argument(
+            "--format",
+            choices=sorted(bulk.FORMATS),
+            help="Формат файла (по умолчанию — по расширению).",
+        )
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        fmt = options["format"]
+        if fmt is None:
+            if path == "-":
+                raise CommandError("Для stdin укажите --format.")
+            fmt = "csv" if path.lower().endswith(".csv") else "ndjson"
+
+        stream = sys.stdin.buffer if path == "-" else open(path, "rb")
+        with stream:
+            report = bulk.import_employees(
+                bulk.PARSERS[fmt](stream), batch_size=options["batch_size"]
+            )
+
+        for error in report["errors"]:
+            self.stderr.write(f"Строка {error['row']}: {error['errors']}")
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Создано сотрудников: {report['created']}, "
+                f"строк с ошибками: {len(report['errors'])}."
+            )
+        )
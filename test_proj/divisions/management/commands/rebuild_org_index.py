@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from divisions import ancestry, search
+
+
+class Command(BaseCommand):
+    help = (
+        "Перестраивает индекс предков групп и индекс поиска сотрудников "
+        "или проверяет их согласованность."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Только проверить индексы, ничего не изменяя.",
+        )
+
+    def handle(self, *args, **options):
+        if options["check"]:
+            problems = ancestry.check()
+            search_problems = search.check()
+            for kind, team_ids in problems.items():
+                if team_ids:
+                    self.stderr.write(f"{kind}: {', '.join(map(str, team_ids))}")
+            if search_problems["missing_triggers"]:
+                triggers = ", ".join(search_problems["missing_triggers"])
+                self.stderr.write(f"missing triggers: {triggers}")
+            if search_problems["stale"]:
+                self.stderr.write(f"stale search rows: {search_problems['stale']}")
+            if any(problems.values()) or any(search_problems.values()):
+                raise CommandError("Индексы оргструктуры рассогласованы.")
+            self.stdout.write(self.style.SUCCESS("Индексы оргструктуры согласованы."))
+            return
+
+        count = ancestry.rebuild()
+        rows = search.rebuild()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Индексы перестроены: {count} групп, {rows} сотрудников в поиске."
+            )
+        )
@@ -0,0 +1,44 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from divisions import totals
+
+
+class Command(BaseCommand):
+    help = (
+        "Сверяет нарастающие суммы узлов оргструктуры (число сотрудников, "
+        "суммы дат) с составом групп и исправляет расхождения."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Только проверить суммы, ничего не изменяя.",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            help="Повторять сверку каждые N секунд, пока команда не остановлена.",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            self.reconcile(options["check"])
+            if not options["interval"]:
+                return
+            time.sleep(options["interval"])
+
+    def reconcile(self, check_only):
+        if check_only:
+            drift = totals.check()
+            if drift:
+                nodes = ", ".join(f"{name}:{pk}" for name, pk in drift)
+                self.stderr.write(f"drift: {nodes}")
+                raise CommandError("Нарастающие суммы узлов рассогласованы.")
+            self.stdout.write(self.style.SUCCESS("Нарастающие суммы согласованы."))
+            return
+
+        count = totals.repair()
+        self.stdout.write(self.style.SUCCESS(f"Исправлено узлов: {count}."))
@@ -0,0 +1,55 @@
+import os
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+class Command(BaseCommand):
+    help = (
+        "Обновляет снимок основной базы SQLite для чтения "
+        "(SQLITE_REPLICA_PATH) через online backup API."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--interval",
+            type=float,
+            help="Обновлять снимок каждые N секунд, пока команда не остановлена.",
+        )
+
+    def handle(self, *args, **options):
+        path = getattr(settings, "SQLITE_REPLICA_PATH", None)
+        if not path:
+            raise CommandError("Не задан SQLITE_REPLICA_PATH.")
+
+        while True:
+            started = time.perf_counter()
+            self.refresh(path)
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"Снимок обновлён за {time.perf_counter() - started:.2f} с."
+                )
+            )
+            if not options["interval"]:
+                return
+            time.sleep(options["interval"])
+
+    def refresh(self, path):
+        # Снимок пишется во временный файл и подменяет старый атомарно:
+        # открытые соединения дочитывают прежний файл без блокировок,
+        # а новый файл меняет поколение кэша ответов (cache.get_generation)
+        tmp_path = f"{path}.tmp"
+        connection = connections[DEFAULT_DB_ALIAS]
+        connection.ensure_connection()
+        target = sqlite3.connect(tmp_path)
+        try:
+            connection.connection.backup(target)
+            # Неизменяемый снимок открывается только на чтение,
+            # поэтому ему не нужен журнал WAL
+            target.execute("PRAGMA journal_mode=DELETE")
+        finally:
+            target.close()
+        os.replace(tmp_path, path)
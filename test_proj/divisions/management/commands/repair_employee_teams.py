@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from divisions import primary_team
+
+
+class Command(BaseCommand):
+    help = (
+        "Пересчитывает денормализованную основную группу сотрудников "
+        "или проверяет её согласованность."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Только проверить поля, ничего не изменяя.",
+        )
+
+    def handle(self, *args, **options):
+        if options["check"]:
+            stale = primary_team.check()
+            if stale:
+                self.stderr.write(f"stale: {', '.join(map(str, stale))}")
+                raise CommandError("Основные группы сотрудников рассогласованы.")
+            self.stdout.write(
+                self.style.SUCCESS("Основные группы сотрудников согласованы.")
+            )
+            return
+
+        count = primary_team.repair()
+        self.stdout.write(self.style.SUCCESS(f"Исправлено сотрудников: {count}."))
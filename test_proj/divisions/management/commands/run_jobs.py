@@ -0,0 +1,45 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from divisions import jobs
+
+
+class Command(BaseCommand):
+    help = (
+        "Выполняет фоновые задачи из таблицы Job (см. divisions/jobs.py) "
+        "в пуле потоков."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers", type=int, default=2, help="Число потоков (по умолчанию 2)."
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Выполнить готовые задачи и завершиться.",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=1.0,
+            help="Пауза между опросами пустой очереди, секунд.",
+        )
+        parser.add_argument(
+            "--stale-after",
+            type=float,
+            default=600,
+            help="Вернуть в очередь задачи, выполняющиеся дольше N секунд.",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            requeued = jobs.requeue_stale(options["stale_after"])
+            if requeued:
+                self.stderr.write(f"Возвращено в очередь зависших задач: {requeued}")
+            for job in jobs.run_pending(workers=options["workers"]):
+                self.stdout.write(f"{job.name} #{job.pk}: {job.status}")
+            if options["once"]:
+                return
+            time.sleep(options["interval"])
@@ -0,0 +1,44 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from divisions import snapshots
+
+
+class Command(BaseCommand):
+    help = (
+        "Снимает текущую оргструктуру в хранилище снимков "
+        "(DIVISIONS_SNAPSHOT_ROOT). Неизменившиеся блоки не дублируются."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--interval",
+            type=float,
+            help="Снимать каждые N секунд, пока команда не остановлена.",
+        )
+        parser.add_argument(
+            "--keep",
+            type=int,
+            help="Оставить только N последних снимков.",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            self.take(options["keep"])
+            if not options["interval"]:
+                return
+            time.sleep(options["interval"])
+
+    def take(self, keep):
+        manifest = snapshots.take_snapshot()
+        objects = manifest["objects"]
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Снимок {manifest['id']}: записано блоков {objects['written']} "
+                f"({objects['bytes']} Б), повторно использовано {objects['reused']}."
+            )
+        )
+        if keep is not None:
+            removed, orphans = snapshots.prune(keep)
+            self.stdout.write(f"Удалено снимков: {removed}, блоков: {orphans}.")
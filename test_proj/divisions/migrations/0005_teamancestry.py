@@ -0,0 +1,40 @@
+# Generated by Django 5.1.7 on 2026-10-18 10:35
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def populate_team_ancestry(apps, schema_editor):
+    Team = apps.get_model('divisions', 'Team')
+    TeamAncestry = apps.get_model('divisions', 'TeamAncestry')
+    TeamAncestry.objects.bulk_create(
+        TeamAncestry(
+            team_id=team_id,
+            division_id=division_id,
+            department_id=department_id,
+            service_id=service_id,
+        )
+        for team_id, division_id, department_id, service_id in Team.objects.values_list(
+            'id', 'division_id', 'division__department_id', 'division__department__service_id'
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('divisions', '0004_remove_employee_team_team_members'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TeamAncestry',
+            fields=[
+                ('team', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='ancestry', serialize=False, to='divisions.team')),
+                ('department', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='divisions.department')),
+                ('division', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='divisions.division')),
+                ('service', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='divisions.service')),
+            ],
+        ),
+        migrations.RunPython(populate_team_ancestry, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.1.7 on 2026-10-18 10:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('divisions', '0006_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='employee',
+            index=models.Index(fields=['date_of_birth', 'start_date', 'id'], name='employee_keyset_idx'),
+        ),
+    ]
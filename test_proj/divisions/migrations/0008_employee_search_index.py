@@ -0,0 +1,70 @@
+# Generated by Django 5.1.7 on 2026-10-18 10:43
+
+import divisions.models
+import django.db.models.deletion
+from django.db import migrations, models
+
+from divisions.search import FTS_TABLE, NORMALIZED_NAME, TRIGGERS
+
+SQLITE_FORWARD = [
+    f"""
+    CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(
+        full_name, tokenize = 'unicode61 remove_diacritics 2'
+    )
+    """,
+    # Тот же текст триггеров проверяет и восстанавливает divisions.search
+    *TRIGGERS.values(),
+    f"""
+    INSERT INTO {FTS_TABLE} (rowid, full_name)
+    SELECT id, {NORMALIZED_NAME.format("")} FROM divisions_employee
+    """,
+]
+
+SQLITE_BACKWARD = [
+    *(f"DROP TRIGGER IF EXISTS {name}" for name in TRIGGERS),
+    f"DROP TABLE IF EXISTS {FTS_TABLE}",
+]
+
+POSTGRESQL_FORWARD = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    """
+    CREATE INDEX IF NOT EXISTS divisions_employee_full_name_trgm
+    ON divisions_employee USING gin (full_name gin_trgm_ops)
+    """,
+]
+
+POSTGRESQL_BACKWARD = ["DROP INDEX IF EXISTS divisions_employee_full_name_trgm"]
+
+
+def run_for_vendor(statements):
+    def run(apps, schema_editor):
+        for sql in statements.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(sql)
+
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('divisions', '0007_employee_keyset_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EmployeeSearchIndex',
+            fields=[
+                ('employee', models.OneToOneField(db_column='rowid', on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_index', serialize=False, to='divisions.employee')),
+                ('full_name', divisions.models.SearchTextField()),
+                ('rank', models.FloatField()),
+            ],
+            options={
+                'db_table': 'divisions_employee_fts',
+                'managed': False,
+            },
+        ),
+        migrations.RunPython(
+            run_for_vendor({'sqlite': SQLITE_FORWARD, 'postgresql': POSTGRESQL_FORWARD}),
+            run_for_vendor({'sqlite': SQLITE_BACKWARD, 'postgresql': POSTGRESQL_BACKWARD}),
+        ),
+    ]
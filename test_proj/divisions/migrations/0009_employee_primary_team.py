@@ -0,0 +1,75 @@
+# Generated by Django 5.1.7 on 2026-10-18 10:52
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Min
+
+
+def populate_primary_team(apps, schema_editor):
+    Employee = apps.get_model('divisions', 'Employee')
+    Team = apps.get_model('divisions', 'Team')
+    primary = dict(
+        Team.members.through.objects.values('employee_id')
+        .annotate(team_id=Min('team_id'))
+        .values_list('employee_id', 'team_id')
+    )
+    teams = {
+        team_id: rest
+        for team_id, *rest in Team.objects.values_list(
+            'id', 'name', 'division_id', 'division__department_id', 'division__department__service_id'
+        )
+    }
+    employees = []
+    for employee_id, team_id in primary.items():
+        name, division_id, department_id, service_id = teams[team_id]
+        employees.append(
+            Employee(
+                pk=employee_id,
+                primary_team_id=team_id,
+                team_name=name,
+                primary_division_id=division_id,
+                primary_department_id=department_id,
+                primary_service_id=service_id,
+            )
+        )
+    Employee.objects.bulk_update(
+        employees,
+        ['primary_team', 'team_name', 'primary_division', 'primary_department', 'primary_service'],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('divisions', '0008_employee_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='employee',
+            name='primary_department',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='divisions.department'),
+        ),
+        migrations.AddField(
+            model_name='employee',
+            name='primary_division',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='divisions.division'),
+        ),
+        migrations.AddField(
+            model_name='employee',
+            name='primary_service',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='divisions.service'),
+        ),
+        migrations.AddField(
+            model_name='employee',
+            name='primary_team',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='divisions.team', verbose_name='Основная группа'),
+        ),
+        migrations.AddField(
+            model_name='employee',
+            name='team_name',
+            field=models.CharField(blank=True, editable=False, max_length=255, null=True, verbose_name='Название группы'),
+        ),
+        migrations.RunPython(populate_primary_team, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.1.7 on 2026-10-18 10:55
+
+import hashlib
+
+from django.core.files.storage import default_storage
+from django.db import migrations, models
+
+
+def populate_photo_hash(apps, schema_editor):
+    Employee = apps.get_model('divisions', 'Employee')
+    employees = []
+    for employee in Employee.objects.exclude(photo='').exclude(photo=None).only('photo'):
+        digest = hashlib.sha256()
+        try:
+            with default_storage.open(employee.photo.name) as photo:
+                for chunk in photo.chunks():
+                    digest.update(chunk)
+        except OSError:
+            continue
+        employee.photo_hash = digest.hexdigest()[:32]
+        employees.append(employee)
+    Employee.objects.bulk_update(employees, ['photo_hash'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('divisions', '0009_employee_primary_team'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='employee',
+            name='photo_hash',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=32, null=True),
+        ),
+        migrations.RunPython(populate_photo_hash, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,137 @@
+# Generated by Django 5.1.7 on 2026-10-18 11:12
+
+from collections import defaultdict
+
+from django.db import migrations, models
+
+
+def populate_running_totals(apps, schema_editor):
+    # Сотрудник из нескольких групп узла учитывается в нём один раз
+    Team = apps.get_model('divisions', 'Team')
+    nodes = defaultdict(set)
+    dates = {}
+    for employee_id, team_id, division_id, department_id, service_id, born, started in (
+        Team.members.through.objects.values_list(
+            'employee_id',
+            'team_id',
+            'team__division_id',
+            'team__division__department_id',
+            'team__division__department__service_id',
+            'employee__date_of_birth',
+            'employee__start_date',
+        )
+    ):
+        nodes[employee_id].update(
+            {('team', team_id), ('division', division_id), ('department', department_id), ('service', service_id)}
+        )
+        dates[employee_id] = (born, started)
+
+    totals = defaultdict(lambda: [0, 0, 0])
+    anniversaries = defaultdict(int)
+    for employee_id, employee_nodes in nodes.items():
+        born, started = dates[employee_id]
+        for node in employee_nodes:
+            totals[node][0] += 1
+            totals[node][1] += born.year
+            totals[node][2] += started.year
+            anniversaries[(*node, 'birth', born.month * 100 + born.day)] += 1
+            anniversaries[(*node, 'start', started.month * 100 + started.day)] += 1
+    for (model_name, pk), (count, birth_sum, start_sum) in totals.items():
+        apps.get_model('divisions', model_name).objects.filter(pk=pk).update(
+            member_count=count, birth_year_sum=birth_sum, start_year_sum=start_sum
+        )
+    AnniversaryCount = apps.get_model('divisions', 'AnniversaryCount')
+    AnniversaryCount.objects.bulk_create(
+        (
+            AnniversaryCount(
+                node_type=node_type, node_id=pk, field=field, month_day=day, count=count
+            )
+            for (node_type, pk, field, day), count in anniversaries.items()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('divisions', '0010_employee_photo_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='department',
+            name='birth_year_sum',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='department',
+            name='member_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='department',
+            name='start_year_sum',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='division',
+            name='birth_year_sum',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='division',
+            name='member_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='division',
+            name='start_year_sum',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='service',
+            name='birth_year_sum',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='service',
+            name='member_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='service',
+            name='start_year_sum',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='team',
+            name='birth_year_sum',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='team',
+            name='member_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='team',
+            name='start_year_sum',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.CreateModel(
+            name='AnniversaryCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('node_type', models.CharField(max_length=16)),
+                ('node_id', models.BigIntegerField()),
+                ('field', models.CharField(max_length=5)),
+                ('month_day', models.PositiveSmallIntegerField()),
+                ('count', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('node_type', 'node_id', 'field', 'month_day'), name='anniversary_count_unique')],
+            },
+        ),
+        migrations.RunPython(populate_running_totals, migrations.RunPython.noop),
+    ]
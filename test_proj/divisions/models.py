@@ -1,56 +1,130 @@
 from django.db import models
 
 
+class GroupConcat(models.Aggregate):
+    """
+    Значения группы через запятую: GROUP_CONCAT (SQLite, MySQL)
+    или STRING_AGG (PostgreSQL).
+    """
+
+    function = "GROUP_CONCAT"
+    output_field = models.TextField()
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        return super().as_sql(
+            compiler,
+            connection,
+            function="STRING_AGG",
+            template="%(function)s(%(expressions)s::text, ',')",
+            **extra_context,
+        )
+
+
 class EmployeeContainerMixin:
     """
     Миксин для моделей, которые содержат сотрудников и дочерние подразделения.
     Предоставляет метод get_all_employees для получения всех сотрудников.
+
+    Путь от группы до узла задаётся атрибутом team_lookup: сотрудники
+    узла выбираются одним запросом через индекс предков групп (TeamAncestry),
+    без рекурсивного обхода дерева.
+
+    Поле updated_at у наследников служит меткой изменения всего поддерева:
+    сигналы из divisions/signals.py обновляют его у узла и всех предков
+    при изменении потомков, состава групп и данных сотрудников.
     """
 
+    team_lookup = None
+
+    def get_employees_queryset(self, with_teams=False):
+        """
+        Возвращает QuerySet различных сотрудников всех групп, входящих в узел:
+        сотрудник из нескольких групп узла попадает в него один раз.
+        При with_teams=True у каждого сотрудника есть аннотация node_team_ids —
+        id его групп в узле через запятую (в том же запросе, GROUP BY).
+        """
+        lookup = f"team_members__{self.team_lookup}"
+        if with_teams:
+            return Employee.objects.filter(**{lookup: self.pk}).annotate(
+                node_team_ids=GroupConcat("team_members__id")
+            )
+        memberships = Team.members.through.objects.filter(
+            **{f"team__{self.team_lookup}": self.pk}
+        )
+        return Employee.objects.filter(pk__in=memberships.values("employee_id"))
+
     def get_all_employees(self):
         """
         Возвращает всех сотрудников, включая дочерние подразделения.
         """
-        employees = []
-        # Определяем связь с дочерними подразделениями
-        child_relation = None
-        if hasattr(self, "departments"):  # Для Service
-            child_relation = self.departments.all()
-        elif hasattr(self, "divisions"):  # Для Department
-            child_relation = self.divisions.all()
-        elif hasattr(self, "teams"):  # Для Division
-            child_relation = self.teams.all()
+        return list(self.get_employees_queryset())
+
+
+TOTALS_FIELDS = ["member_count", "birth_year_sum", "start_year_sum"]
+
+
+class RunningTotalsModel(models.Model):
+    """
+    Нарастающие суммы по сотрудникам групп поддерева: число сотрудников
+    и суммы годов рождения и начала работы. Вместе с распределением
+    годовщин (AnniversaryCount) по ним статистика узла в полных годах
+    считается без обращения к сотрудникам. Поддерживаются сигналами
+    (см. divisions/totals.py), сверяются командой reconcile_org_totals.
+    """
+
+    member_count = models.PositiveIntegerField(default=0, editable=False)
+    birth_year_sum = models.BigIntegerField(default=0, editable=False)
+    start_year_sum = models.BigIntegerField(default=0, editable=False)
+
+    class Meta:
+        abstract = True
 
-        # Рекурсивно добавляем сотрудников из дочерних подразделений
-        if child_relation:
-            for child in child_relation:
-                employees += child.get_all_employees()
+    def save(self, *args, **kwargs):
+        # Суммы меняются только запросами UPDATE из divisions/totals.py:
+        # сохранение узла не перезаписывает их значениями, прочитанными раньше
+        if not self._state.adding and kwargs.get("update_fields") is None:
+            deferred = self.get_deferred_fields()
+            kwargs["update_fields"] = [
+                field.name
+                for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in TOTALS_FIELDS
+                and field.attname not in deferred
+            ]
+        super().save(*args, **kwargs)
 
-        return employees
 
+class Service(RunningTotalsModel, EmployeeContainerMixin):
+    team_lookup = "ancestry__service"
 
-class Service(models.Model, EmployeeContainerMixin):
     name = models.CharField(max_length=255)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.name
 
 
-class Department(models.Model, EmployeeContainerMixin):
+class Department(RunningTotalsModel, EmployeeContainerMixin):
+    team_lookup = "ancestry__department"
+
     service = models.ForeignKey(
         Service, on_delete=models.CASCADE, related_name="departments"
     )
     name = models.CharField(max_length=255)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.name
 
 
-class Division(models.Model, EmployeeContainerMixin):
+class Division(RunningTotalsModel, EmployeeContainerMixin):
+    team_lookup = "ancestry__division"
+
     department = models.ForeignKey(
         Department, on_delete=models.CASCADE, related_name="divisions"
     )
     name = models.CharField(max_length=255)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.name
@@ -63,29 +137,226 @@ class Employee(models.Model):
     photo = models.ImageField(
         upload_to="employee_photos/", blank=True, null=True, verbose_name="Фотография"
     )
+    # Хэш содержимого фотографии: входит в имена миниатюр
+    # (см. divisions/thumbnails.py)
+    photo_hash = models.CharField(
+        max_length=32, null=True, blank=True, editable=False, db_index=True
+    )
     start_date = models.DateField(verbose_name="Дата начала работы")
-    
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Изменено")
+
+    # Основная группа (с наименьшим id) и её предки, денормализованные
+    # для выдачи списков без обращения к таблице членства.
+    # Поддерживаются сигналами (см. divisions/primary_team.py),
+    # восстанавливаются командой repair_employee_teams.
+    # Поля допускают NULL: на SQLite добавление NOT NULL столбца пересоздаёт
+    # таблицу и удаляет триггеры полнотекстового индекса (миграция 0008).
+    primary_team = models.ForeignKey(
+        "Team",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        editable=False,
+        related_name="+",
+        verbose_name="Основная группа",
+    )
+    team_name = models.CharField(
+        max_length=255,
+        null=True,
+        blank=True,
+        editable=False,
+        verbose_name="Название группы",
+    )
+    primary_division = models.ForeignKey(
+        "Division",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        editable=False,
+        related_name="+",
+    )
+    primary_department = models.ForeignKey(
+        "Department",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        editable=False,
+        related_name="+",
+    )
+    primary_service = models.ForeignKey(
+        "Service",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        editable=False,
+        related_name="+",
+    )
+
+    class Meta:
+        indexes = [
+            # Ключ курсорной пагинации (см. divisions/pagination.py)
+            models.Index(
+                fields=["date_of_birth", "start_date", "id"],
+                name="employee_keyset_idx",
+            ),
+        ]
+
     @property
     def team(self):
-        return self.team_members.first().name
-    
+        return self.team_name
+
     def __str__(self):
         return self.full_name
 
-class Team(models.Model):
+class Team(RunningTotalsModel, EmployeeContainerMixin):
+    team_lookup = "id"
+
     division = models.ForeignKey(
         Division, on_delete=models.CASCADE, related_name="teams"
     )
     name = models.CharField(max_length=255)
     members = models.ManyToManyField(Employee, related_name="team_members", blank=True)
-
-    def get_all_employees(self):
-        """
-        Возвращает всех сотрудников группы.
-        """
-        return list(self.members.all())
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.name
 
 
+class SearchTextField(models.TextField):
+    """
+    Текстовое поле полнотекстового индекса с поиском через lookup match.
+    """
+
+
+@SearchTextField.register_lookup
+class Match(models.Lookup):
+    lookup_name = "match"
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f"{lhs} MATCH {rhs}", lhs_params + rhs_params
+
+
+class EmployeeSearchIndex(models.Model):
+    """
+    Полнотекстовый индекс ФИО сотрудников: виртуальная таблица FTS5 на SQLite.
+    Таблица и триггеры синхронизации создаются миграцией 0008, поэтому индекс
+    обновляется и при bulk_create/update в обход сигналов.
+    """
+
+    employee = models.OneToOneField(
+        Employee,
+        on_delete=models.DO_NOTHING,
+        primary_key=True,
+        db_column="rowid",
+        related_name="search_index",
+    )
+    full_name = SearchTextField()
+    rank = models.FloatField()
+
+    class Meta:
+        managed = False
+        db_table = "divisions_employee_fts"
+
+
+class TeamAncestry(models.Model):
+    """
+    Индекс предков группы (материализованный путь Service→Department→Division).
+    Поддерживается сигналами из divisions/signals.py, перестраивается
+    командой rebuild_org_index.
+    """
+
+    team = models.OneToOneField(
+        Team, on_delete=models.CASCADE, primary_key=True, related_name="ancestry"
+    )
+    division = models.ForeignKey(
+        Division, on_delete=models.CASCADE, related_name="+"
+    )
+    department = models.ForeignKey(
+        Department, on_delete=models.CASCADE, related_name="+"
+    )
+    service = models.ForeignKey(Service, on_delete=models.CASCADE, related_name="+")
+
+    def __str__(self):
+        return f"{self.service_id}/{self.department_id}/{self.division_id}/{self.team_id}"
+
+
+class AnniversaryCount(models.Model):
+    """
+    Число сотрудников поддерева узла с годовщиной даты рождения или начала
+    работы в день month_day (месяц * 100 + день). Нужно, чтобы не
+    засчитывать год тем, у кого годовщина в текущем году ещё не наступила.
+    Поддерживается вместе с нарастающими суммами (см. divisions/totals.py);
+    строки с нулевым числом удаляются.
+    """
+
+    BIRTH = "birth"
+    START = "start"
+
+    node_type = models.CharField(max_length=16)  # имя модели узла
+    node_id = models.BigIntegerField()
+    field = models.CharField(max_length=5)
+    month_day = models.PositiveSmallIntegerField()
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["node_type", "node_id", "field", "month_day"],
+                name="anniversary_count_unique",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.node_type}:{self.node_id} {self.field} {self.month_day}"
+
+
+class Job(models.Model):
+    """
+    Фоновая задача (см. divisions/jobs.py): тяжёлая операция, которую
+    выполняет команда run_jobs вне потока запроса.
+    """
+
+    PENDING = "pending"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    STATUS_CHOICES = [
+        (PENDING, "Ожидает"),
+        (RUNNING, "Выполняется"),
+        (SUCCEEDED, "Выполнена"),
+        (FAILED, "Ошибка"),
+    ]
+
+    name = models.CharField(max_length=100, verbose_name="Задача")
+    params = models.JSONField(default=dict, verbose_name="Параметры")
+    # Хэш имени и параметров: одинаковые ожидающие задачи не дублируются
+    key = models.CharField(max_length=40, editable=False)
+    status = models.CharField(
+        max_length=10, choices=STATUS_CHOICES, default=PENDING, verbose_name="Статус"
+    )
+    attempts = models.PositiveIntegerField(default=0, verbose_name="Попыток")
+    max_attempts = models.PositiveIntegerField(default=3)
+    run_after = models.DateTimeField(verbose_name="Не раньше")
+    progress = models.JSONField(null=True, blank=True, verbose_name="Ход выполнения")
+    result = models.JSONField(null=True, blank=True, verbose_name="Результат")
+    error = models.TextField(blank=True, verbose_name="Ошибка")
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "run_after"], name="job_queue_idx"),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["key"],
+                condition=models.Q(status="pending"),
+                name="job_pending_key_unique",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.name} #{self.pk} ({self.status})"
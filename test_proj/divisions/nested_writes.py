@@ -0,0 +1,99 @@
+"""
+Пакетная запись вложенного состава группы (поле members TeamSerializer).
+
+drf-writable-nested сохраняет каждого сотрудника из members вложенным
+сериализатором, а затем меняет состав группы через add()/remove(), —
+по несколько запросов с сигналами на сотрудника. write_members сравнивает
+присланный состав с текущим и пишет разницу пакетно:
+
+- новые сотрудники (без id или с несуществующим id) — bulk_create;
+- изменённые поля существующих — один bulk_update, только для строк,
+  где значения действительно отличаются;
+- состав группы — одна вставка и один DELETE в таблице членства.
+
+bulk_create и bulk_update не вызывают сигналы сохранения, поэтому
+производные данные обновляются так же, как в divisions/bulk.py: снимок
+нарастающих сумм до записи и memberships_changed после. Полнотекстовый
+индекс обновляют триггеры базы. Сотрудники, у которых меняется фотография,
+сохраняются по одному через save(): хэш и миниатюры считают сигналы.
+"""
+
+from django.db import transaction
+
+from . import totals
+from .models import Employee, Team
+from .signals import memberships_changed
+
+Membership = Team.members.through
+
+
+def _needs_save(employee, data):
+    # Новая или удалённая фотография требует пересчёта хэша и миниатюр
+    if "photo" not in data:
+        return False
+    return bool(data["photo"]) or bool(employee is not None and employee.photo)
+
+
+@transaction.atomic
+def write_members(team, items):
+    """
+    Приводит состав группы team к items — списку пар (id или None,
+    проверенные данные сотрудника) в порядке запроса: создаёт и изменяет
+    сотрудников, добавляет в группу недостающих и исключает остальных.
+    Сотрудники, исключённые из группы, не удаляются.
+    """
+    current = set(
+        Membership.objects.filter(team_id=team.pk).values_list(
+            "employee_id", flat=True
+        )
+    )
+    found = Employee.objects.in_bulk([pk for pk, _ in items if pk is not None])
+
+    created, changed, fields, member_ids = [], {}, set(), {}
+    for pk, data in items:
+        employee = found.get(pk)
+        if _needs_save(employee, data):
+            # Отдельное сохранение со своими сигналами, до снимка сумм
+            if employee is None:
+                employee = Employee(**data)
+            else:
+                for name, value in data.items():
+                    setattr(employee, name, value)
+            employee.save()
+            found[employee.pk] = employee
+            member_ids[employee.pk] = None
+            continue
+        if employee is None:
+            created.append(Employee(**data))
+            continue
+        for name, value in data.items():
+            if getattr(employee, name) != value:
+                setattr(employee, name, value)
+                changed[employee.pk] = employee
+                fields.add(name)
+        member_ids[employee.pk] = None
+
+    removed = current - member_ids.keys()
+    before = totals.snapshot(changed.keys() | member_ids.keys() | removed)
+    # Изменение сотрудника затрагивает все его группы, а не только эту
+    team_ids = {team.pk} | set(
+        Membership.objects.filter(employee_id__in=changed).values_list(
+            "team_id", flat=True
+        )
+    )
+
+    if changed:
+        Employee.objects.bulk_update(changed.values(), sorted(fields))
+    for employee in Employee.objects.bulk_create(created):
+        member_ids[employee.pk] = None
+    Membership.objects.bulk_create(
+        Membership(team_id=team.pk, employee_id=employee_id)
+        for employee_id in member_ids
+        if employee_id not in current
+    )
+    if removed:
+        Membership.objects.filter(team_id=team.pk, employee_id__in=removed).delete()
+
+    affected = (member_ids.keys() - current) | removed | changed.keys()
+    if affected:
+        memberships_changed(team_ids, affected, before)
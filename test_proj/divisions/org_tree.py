@@ -0,0 +1,120 @@
+"""
+Полное дерево оргструктуры для /api/org-tree/.
+
+Службы, управления, отделы и группы читаются плоскими запросами values()
+(по одному на уровень), состав групп — одним запросом к таблице членства
+вместе с данными сотрудников. Дерево собирается в Python по словарям
+«id родителя → дети» за один проход по строкам каждого уровня, поэтому
+число запросов не зависит от размера дерева, а время растёт линейно.
+
+Формат узлов совпадает с вложенными сериализаторами (ServiceSerializer
+и ниже), сотрудники — с EmployeeSerializer (см. divisions/rows.py).
+"""
+
+from collections import defaultdict
+
+from .models import Department, Division, Service, Team
+from .rows import EmployeeRowBuilder
+
+# Уровни сверху вниз: (имя, модель, поле родителя, связь с детьми)
+LEVELS = [
+    ("services", Service, None, "departments"),
+    ("departments", Department, "service", "divisions"),
+    ("divisions", Division, "department", "teams"),
+    ("teams", Team, "division", "members"),
+]
+MODELS = {name: model for name, model, *_ in LEVELS}
+# Пути от модели уровня к предку: группы — через индекс предков
+ANCESTOR_LOOKUPS = {
+    Department: {Service: "service"},
+    Division: {Service: "department__service", Department: "department"},
+    Team: {
+        Service: "ancestry__service",
+        Department: "ancestry__department",
+        Division: "division",
+    },
+}
+
+Membership = Team.members.through
+
+
+def _level_filter(model, root):
+    """
+    Условие на строки уровня model внутри поддерева root ((модель, id)).
+    """
+    if root is None:
+        return {}
+    root_model, pk = root
+    if model is root_model:
+        return {"pk": pk}
+    return {ANCESTOR_LOOKUPS[model][root_model]: pk}
+
+
+def _members(root, request):
+    """
+    Возвращает составы групп поддерева: {id группы: [сотрудник, ...]}.
+    Сотрудник из нескольких групп строится один раз.
+    """
+    builder = EmployeeRowBuilder(request)
+    memberships = Membership.objects.all()
+    if root is not None:
+        root_model, pk = root
+        memberships = memberships.filter(**{f"team__{root_model.team_lookup}": pk})
+    columns = [f"employee__{column}" for column in builder.columns]
+    members, employees = defaultdict(list), {}
+    for team_id, *row in memberships.order_by("employee_id").values_list(
+        "team_id", *columns
+    ):
+        employee = employees.get(row[0])
+        if employee is None:
+            employee = employees[row[0]] = builder.build(row)
+        members[team_id].append(employee)
+    return members
+
+
+def build_org_tree(root=None, max_depth=None, request=None):
+    """
+    Возвращает список корневых узлов со вложенными потомками.
+    root — (модель, id) узла, с которого начинается дерево (по умолчанию
+    все службы); max_depth — число вложенных уровней под корнями
+    (сотрудники групп — последний уровень), None — без ограничения.
+    Если узла root нет, возвращает пустой список.
+    """
+    start = 0
+    if root is not None:
+        start = next(i for i, level in enumerate(LEVELS) if level[1] is root[0])
+    levels = LEVELS[start:]
+    if max_depth is not None:
+        levels = levels[: max_depth + 1]
+
+    nodes = []
+    for name, model, parent_field, _ in levels:
+        fields = ["id", "name"] + ([f"{parent_field}_id"] if parent_field else [])
+        nodes.append(
+            list(
+                model.objects.filter(**_level_filter(model, root))
+                .order_by("pk")
+                .values(*fields)
+            )
+        )
+    with_members = levels[-1][0] == "teams" and (
+        max_depth is None or max_depth >= len(levels)
+    )
+    children = _members(root, request) if with_members else None
+
+    # Снизу вверх: каждый узел получает список детей из индекса по родителю
+    for index in range(len(levels) - 1, -1, -1):
+        _, _, parent_field, child_field = levels[index]
+        if index + 1 < len(levels) or children is not None:
+            for node in nodes[index]:
+                node[child_field] = children.get(node["id"], [])
+        if parent_field is None:
+            continue
+        if index > 0:
+            children = defaultdict(list)
+        for node in nodes[index]:
+            parent_id = node.pop(f"{parent_field}_id")
+            node[parent_field] = parent_id
+            if index > 0:
+                children[parent_id].append(node)
+    return nodes[0]
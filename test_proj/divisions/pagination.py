@@ -0,0 +1,124 @@
+import base64
+import binascii
+import json
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class EmployeeKeysetPagination(BasePagination):
+    """
+    Курсорная (keyset) пагинация сотрудников по составному ключу
+    (date_of_birth, start_date, id), который покрыт индексом employee_keyset_idx.
+    Страница выбирается условием «ключ больше последнего выданного», поэтому
+    стоимость запроса не зависит от глубины листания.
+
+    Пагинация включается только по запросу клиента — параметром cursor или
+    page_size; без них список возвращается целиком, как и раньше.
+    """
+
+    ordering = ("date_of_birth", "start_date", "id")
+    cursor_query_param = "cursor"
+    page_size_query_param = "page_size"
+    page_size = 100
+    max_page_size = 1000
+    invalid_cursor_message = "Некорректный курсор."
+
+    def paginate_queryset(self, queryset, request, view=None):
+        params = request.query_params
+        if self.cursor_query_param not in params and (
+            self.page_size_query_param not in params
+        ):
+            return None
+
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        reverse, key = self.decode_cursor(request)
+
+        fields = self.ordering
+        if key is not None:
+            queryset = queryset.filter(self._beyond(key, reverse))
+        queryset = queryset.order_by(
+            *(f"-{field}" if reverse else field for field in fields)
+        )
+
+        rows = list(queryset[: self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[: self.page_size]
+        if reverse:
+            rows.reverse()
+            self.has_previous, self.has_next = has_more, key is not None
+        else:
+            self.has_previous, self.has_next = key is not None, has_more
+
+        self.page = rows
+        return rows
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(page_size, 1), self.max_page_size)
+
+    def _beyond(self, key, reverse):
+        """
+        Условие «строка после ключа» (или «до ключа» при reverse)
+        для лексикографического сравнения составного ключа.
+        """
+        lookup = "lt" if reverse else "gt"
+        condition = Q()
+        for i, field in enumerate(self.ordering):
+            equal = {prev: key[j] for j, prev in enumerate(self.ordering[:i])}
+            condition |= Q(**equal, **{f"{field}__{lookup}": key[i]})
+        return condition
+
+    def _key(self, obj):
+        return [str(getattr(obj, field)) for field in self.ordering]
+
+    def encode_cursor(self, reverse, key):
+        payload = json.dumps({"r": int(reverse), "k": key}, separators=(",", ":"))
+        cursor = base64.urlsafe_b64encode(payload.encode()).decode()
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def decode_cursor(self, request):
+        """
+        Возвращает (reverse, key) из параметра cursor либо (False, None).
+        """
+        cursor = request.query_params.get(self.cursor_query_param)
+        if not cursor:
+            return False, None
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            key = payload["k"]
+            if len(key) != len(self.ordering):
+                raise ValueError
+            return bool(payload["r"]), key
+        except (binascii.Error, ValueError, KeyError, TypeError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(False, self._key(self.page[-1]))
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            url = self.request.build_absolute_uri()
+            return remove_query_param(url, self.cursor_query_param)
+        return self.encode_cursor(True, self._key(self.page[0]))
+
+    def get_paginated_response(self, data):
+        return Response(
+            {
+                "next": self.get_next_link(),
+                "previous": self.get_previous_link(),
+                "results": data,
+            }
+        )
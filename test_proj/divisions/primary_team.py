@@ -0,0 +1,146 @@
+"""
+Поддержка денормализованной основной группы сотрудника.
+
+Основной считается группа с наименьшим id. Её id, название и предки
+(отдел, управление, служба) хранятся в полях Employee, поэтому
+сериализация сотрудника не обращается к таблице членства.
+"""
+
+from collections import defaultdict
+
+from django.db.models import Min
+
+from .models import Division, Employee, Team
+
+ATTNAMES = [
+    "primary_team_id",
+    "team_name",
+    "primary_division_id",
+    "primary_department_id",
+    "primary_service_id",
+]
+EMPTY = (None,) * len(ATTNAMES)
+
+
+def _expected_rows(employee_ids=None):
+    """
+    Возвращает актуальные значения денормализованных полей
+    для сотрудников, состоящих хотя бы в одной группе:
+    {employee_id: (team_id, team_name, division_id, department_id, service_id)}.
+    """
+    memberships = Team.members.through.objects.all()
+    if employee_ids is not None:
+        memberships = memberships.filter(employee_id__in=employee_ids)
+    primary = dict(
+        memberships.values("employee_id")
+        .annotate(team_id=Min("team_id"))
+        .values_list("employee_id", "team_id")
+    )
+    teams = {
+        team_id: (team_id, *rest)
+        for team_id, *rest in Team.objects.filter(
+            pk__in=set(primary.values())
+        ).values_list(
+            "id",
+            "name",
+            "division_id",
+            "division__department_id",
+            "division__department__service_id",
+        )
+    }
+    return {employee_id: teams[team_id] for employee_id, team_id in primary.items()}
+
+
+def _actual_rows(employees):
+    return {
+        employee_id: tuple(values)
+        for employee_id, *values in employees.values_list("id", *ATTNAMES)
+    }
+
+
+def _apply(employees, expected, batch_size=1000):
+    """
+    Записывает ожидаемые значения сотрудникам из QuerySet employees,
+    у которых они расходятся с сохранёнными. Возвращает число исправленных.
+    Сотрудники с одинаковыми значениями обновляются одним UPDATE на порцию
+    (bulk_update с CASE по каждому полю заметно медленнее).
+    """
+    changed = defaultdict(list)
+    for employee_id, values in _actual_rows(employees).items():
+        values_expected = expected.get(employee_id, EMPTY)
+        if values != values_expected:
+            changed[values_expected].append(employee_id)
+    for values, employee_ids in changed.items():
+        for start in range(0, len(employee_ids), batch_size):
+            Employee.objects.filter(
+                pk__in=employee_ids[start : start + batch_size]
+            ).update(**dict(zip(ATTNAMES, values)))
+    return sum(len(employee_ids) for employee_ids in changed.values())
+
+
+def sync_employees(employee_ids):
+    """
+    Пересчитывает основную группу у переданных сотрудников.
+    """
+    employee_ids = set(employee_ids)
+    if employee_ids:
+        _apply(
+            Employee.objects.filter(pk__in=employee_ids), _expected_rows(employee_ids)
+        )
+
+
+def sync_team(team):
+    """
+    Переносит название и предков группы сотрудникам, для которых
+    она основная (после переименования или переноса группы).
+    """
+    department_id, service_id = Division.objects.filter(
+        pk=team.division_id
+    ).values_list("department_id", "department__service_id").get()
+    values = {
+        "team_name": team.name,
+        "primary_division_id": team.division_id,
+        "primary_department_id": department_id,
+        "primary_service_id": service_id,
+    }
+    Employee.objects.filter(primary_team=team).exclude(**values).update(**values)
+
+
+def sync_division(division):
+    """
+    Переносит предков сотрудникам после смены управления отдела.
+    """
+    Employee.objects.filter(primary_division=division).exclude(
+        primary_department_id=division.department_id
+    ).update(
+        primary_department_id=division.department_id,
+        primary_service_id=division.department.service_id,
+    )
+
+
+def sync_department(department):
+    """
+    Переносит службу сотрудникам после смены службы управления.
+    """
+    Employee.objects.filter(primary_department=department).exclude(
+        primary_service_id=department.service_id
+    ).update(primary_service_id=department.service_id)
+
+
+def repair(batch_size=1000):
+    """
+    Пересчитывает поля у всех сотрудников. Возвращает число исправленных.
+    """
+    return _apply(Employee.objects.all(), _expected_rows(), batch_size=batch_size)
+
+
+def check():
+    """
+    Возвращает отсортированный список id сотрудников с устаревшими полями.
+    """
+    expected = _expected_rows()
+    return sorted(
+        employee_id
+        for employee_id, values in _actual_rows(Employee.objects.all()).items()
+        if values != expected.get(employee_id, EMPTY)
+    )
@@ -0,0 +1,54 @@
+"""
+Чтение из реплики (снимка) SQLite для безопасных запросов.
+
+ReplicaReadsMiddleware помечает GET/HEAD/OPTIONS-запросы, и на время такого
+запроса ReadReplicaRouter направляет чтения моделей в базу replica.
+Запросы, изменяющие данные, и код вне запросов (команды, сигналы внутри
+транзакций) читают из основной базы, поэтому запись никогда не опирается
+на устаревший снимок. Модели очередей (PRIMARY_MODELS) всегда читаются
+из основной базы: их состояние меняется между обновлениями реплики,
+и опрос задачи по снимку видел бы устаревший статус или 404.
+"""
+
+from contextvars import ContextVar
+
+from django.db import DEFAULT_DB_ALIAS, connections
+
+REPLICA_DB_ALIAS = "replica"
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+PRIMARY_MODELS = {"divisions.job"}
+
+replica_reads = ContextVar("replica_reads", default=False)
+
+
+class ReplicaReadsMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = replica_reads.set(request.method in SAFE_METHODS)
+        try:
+            return self.get_response(request)
+        finally:
+            replica_reads.reset(token)
+
+
+class ReadReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if (
+            model._meta.label_lower not in PRIMARY_MODELS
+            and replica_reads.get()
+            and REPLICA_DB_ALIAS in connections.databases
+            and not connections[DEFAULT_DB_ALIAS].in_atomic_block
+        ):
+            return REPLICA_DB_ALIAS
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
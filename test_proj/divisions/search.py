@@ -0,0 +1,168 @@
+"""
+Поиск сотрудников по ФИО через индекс базы данных.
+
+- SQLite: виртуальная таблица FTS5 (EmployeeSearchIndex) с префиксным поиском
+  и ранжированием по bm25.
+- PostgreSQL: GIN-индекс pg_trgm по full_name, ранжирование по сходству триграмм.
+- Прочие базы: стандартный SearchFilter (icontains).
+
+Индекс FTS5 поддерживают триггеры на divisions_employee (TRIGGERS, их
+создаёт миграция 0008). Если SQLite пересоздаёт таблицу сотрудников
+(например, при изменении столбца в миграции), триггеры молча пропадают:
+после migrate check_triggers останавливает команду с ошибкой, check()
+находит пропавшие триггеры и расхождения индекса, rebuild() создаёт
+триггеры заново и перестраивает индекс (команда rebuild_org_index).
+"""
+
+from django.core.management.base import CommandError
+from django.db import connections, transaction
+from rest_framework import filters
+
+FTS_TABLE = "divisions_employee_fts"
+# ФИО индексируется с заменой «ё» на «е»: tokenizer unicode61 приводит
+# кириллицу к нижнему регистру, но не считает «ё» буквой с диакритикой
+NORMALIZED_NAME = "replace(replace({}full_name, 'ё', 'е'), 'Ё', 'Е')"
+TRIGGERS = {
+    "divisions_employee_fts_insert": f"""
+        CREATE TRIGGER divisions_employee_fts_insert AFTER INSERT ON divisions_employee
+        BEGIN
+            INSERT INTO {FTS_TABLE} (rowid, full_name)
+            VALUES (new.id, {NORMALIZED_NAME.format("new.")});
+        END
+    """,
+    "divisions_employee_fts_delete": f"""
+        CREATE TRIGGER divisions_employee_fts_delete AFTER DELETE ON divisions_employee
+        BEGIN
+            DELETE FROM {FTS_TABLE} WHERE rowid = old.id;
+        END
+    """,
+    "divisions_employee_fts_update": f"""
+        CREATE TRIGGER divisions_employee_fts_update
+        AFTER UPDATE OF full_name ON divisions_employee
+        BEGIN
+            UPDATE {FTS_TABLE} SET full_name = {NORMALIZED_NAME.format("new.")}
+            WHERE rowid = new.id;
+        END
+    """,
+}
+
+
+def normalize(term):
+    # Та же нормализация, что и при индексации (см. миграцию 0008)
+    return term.replace("ё", "е").replace("Ё", "Е")
+
+
+def fts_query(terms):
+    """
+    Строит запрос FTS5: каждое слово — префикс, все слова обязательны.
+    Кавычки экранируются, поэтому пользовательский ввод не может
+    изменить синтаксис запроса.
+    """
+    return " ".join('"{}"*'.format(normalize(term).replace('"', '""')) for term in terms)
+
+
+class EmployeeSearchFilter(filters.SearchFilter):
+    """
+    SearchFilter по ФИО с индексным поиском. Если клиент не задал ordering,
+    результаты упорядочиваются по релевантности, поэтому фильтр должен
+    стоять в filter_backends после OrderingFilter.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        terms = self.get_search_terms(request)
+        if not terms:
+            return queryset
+
+        vendor = connections[queryset.db].vendor
+        ranked = not request.query_params.get(filters.OrderingFilter.ordering_param)
+
+        if vendor == "sqlite":
+            queryset = queryset.filter(search_index__full_name__match=fts_query(terms))
+            return queryset.order_by("search_index__rank", "pk") if ranked else queryset
+
+        if vendor == "postgresql":
+            from django.contrib.postgres.search import TrigramSimilarity
+
+            for term in terms:
+                queryset = queryset.filter(full_name__icontains=term)
+            if ranked:
+                queryset = queryset.annotate(
+                    search_rank=TrigramSimilarity("full_name", " ".join(terms))
+                ).order_by("-search_rank", "pk")
+            return queryset
+
+        return super().filter_queryset(request, queryset, view)
+
+
+def _missing_triggers(cursor):
+    cursor.execute(
+        "SELECT name FROM sqlite_master "
+        "WHERE type = 'trigger' AND tbl_name = 'divisions_employee'"
+    )
+    return sorted(TRIGGERS.keys() - {name for (name,) in cursor.fetchall()})
+
+
+def check_triggers(sender, using, **kwargs):
+    """
+    Обработчик post_migrate: останавливает migrate с ошибкой, если
+    у существующего индекса поиска SQLite нет триггеров.
+    """
+    connection = connections[using]
+    if connection.vendor != "sqlite":
+        return
+    with connection.cursor() as cursor:
+        if FTS_TABLE not in connection.introspection.table_names(cursor):
+            # Миграции откачены до создания индекса
+            return
+        missing = _missing_triggers(cursor)
+    if missing:
+        raise CommandError(
+            f"Нет триггеров индекса поиска: {', '.join(missing)}. "
+            "Выполните manage.py rebuild_org_index."
+        )
+
+
+def check(using="default"):
+    """
+    Сверяет индекс поиска SQLite с таблицей сотрудников. Возвращает
+    {"missing_triggers": [имена], "stale": число строк индекса, которых
+    нет, которые лишние или устарели}. Для прочих баз проверять нечего.
+    """
+    connection = connections[using]
+    if connection.vendor != "sqlite":
+        return {"missing_triggers": [], "stale": 0}
+    with connection.cursor() as cursor:
+        missing = _missing_triggers(cursor)
+        cursor.execute(
+            f"""
+            SELECT
+                (SELECT count(*) FROM divisions_employee e
+                 LEFT JOIN {FTS_TABLE} f ON f.rowid = e.id
+                 WHERE f.rowid IS NULL
+                    OR f.full_name != {NORMALIZED_NAME.format("e.")})
+                + (SELECT count(*) FROM {FTS_TABLE}
+                   WHERE rowid NOT IN (SELECT id FROM divisions_employee))
+            """
+        )
+        (stale,) = cursor.fetchone()
+    return {"missing_triggers": missing, "stale": stale}
+
+
+def rebuild(using="default"):
+    """
+    Создаёт триггеры индекса поиска заново и перестраивает индекс
+    по таблице сотрудников. Возвращает число проиндексированных строк.
+    """
+    connection = connections[using]
+    if connection.vendor != "sqlite":
+        return 0
+    with transaction.atomic(using=using), connection.cursor() as cursor:
+        for name, sql in TRIGGERS.items():
+            cursor.execute(f"DROP TRIGGER IF EXISTS {name}")
+            cursor.execute(sql)
+        cursor.execute(f"DELETE FROM {FTS_TABLE}")
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE} (rowid, full_name) "
+            f"SELECT id, {NORMALIZED_NAME.format('')} FROM divisions_employee"
+        )
+        return cursor.rowcount
@@ -1,10 +1,15 @@
+from django.db import transaction
 from drf_writable_nested import WritableNestedModelSerializer
 from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
 
-from .models import Department, Division, Employee, Service, Team
+from . import nested_writes, thumbnails
+from .models import Department, Division, Employee, Job, Service, Team
 
 
 class EmployeeSerializer(serializers.ModelSerializer):
+    thumbnails = serializers.SerializerMethodField()
+
     class Meta:
         model = Employee
         fields = [
@@ -13,6 +18,7 @@ class EmployeeSerializer(serializers.ModelSerializer):
             "position",
             "date_of_birth",
             "photo",
+            "thumbnails",
             "start_date",
             "team",
         ]
@@ -20,9 +26,175 @@ class EmployeeSerializer(serializers.ModelSerializer):
     def get_team_name(self, obj):
         return obj.team
 
+    def get_thumbnails(self, obj):
+        return thumbnails.thumbnail_urls(obj.photo_hash, self.context.get("request"))
+
+
+def with_teams_requested(request):
+    """
+    Запрошены ли списки групп сотрудников узла (?with_teams=1).
+    """
+    params = getattr(request, "query_params", request.GET)
+    return params.get("with_teams") in ("1", "true")
+
+
+class EmployeeTeamsSerializer(EmployeeSerializer):
+    """
+    Сотрудник узла со списком id его групп в этом узле
+    (аннотация node_team_ids, см. get_employees_queryset).
+    """
+
+    teams = serializers.SerializerMethodField()
+
+    class Meta(EmployeeSerializer.Meta):
+        fields = EmployeeSerializer.Meta.fields + ["teams"]
+
+    def get_teams(self, obj):
+        if not obj.node_team_ids:
+            return []
+        return sorted(int(pk) for pk in obj.node_team_ids.split(","))
+
+
+class MemberIdsSerializer(serializers.Serializer):
+    member_ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), allow_empty=False
+    )
+
+
+class MoveMembersSerializer(MemberIdsSerializer):
+    to_team = serializers.PrimaryKeyRelatedField(queryset=Team.objects.all())
+
+
+class MoveNodeSerializer(serializers.Serializer):
+    """
+    Новый родитель узла; модель родителя задаётся parent_model.
+    """
+
+    parent = serializers.PrimaryKeyRelatedField(queryset=Service.objects.none())
+
+    def __init__(self, *args, parent_model, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields["parent"].queryset = parent_model.objects.all()
+
+
+def get_tree_options(request):
+    """
+    Разбирает параметры чтения вложенной оргструктуры: ?fields=id,name,...
+    (поля, выводимые на каждом уровне дерева) и ?depth=N (число вложенных
+    уровней под корнем ответа). Возвращает (fields, depth), где None —
+    без ограничения. Для запросов на запись параметры не учитываются.
+    """
+    if request is None or request.method not in ("GET", "HEAD"):
+        return None, None
+    params = getattr(request, "query_params", request.GET)
+
+    fields = params.get("fields")
+    if fields:
+        fields = {name.strip() for name in fields.split(",") if name.strip()}
+    else:
+        fields = None
 
-class TeamSerializer(WritableNestedModelSerializer):
+    depth = params.get("depth")
+    if depth is not None:
+        try:
+            depth = int(depth)
+        except ValueError:
+            depth = -1
+        if depth < 0:
+            raise ValidationError({"depth": "Ожидается неотрицательное целое число."})
+    return fields, depth
+
+
+def get_tree_relations(relations, request):
+    """
+    Возвращает начало цепочки связей relations (сверху вниз, например
+    ["departments", "divisions", "teams", "members"]), которое выводится
+    с учётом ?fields= и ?depth=: только эти уровни нужно загружать.
+    """
+    fields, depth = get_tree_options(request)
+    kept = []
+    for level, relation in enumerate(relations):
+        if depth is not None and level >= depth:
+            break
+        if fields is not None and relation not in fields:
+            break
+        kept.append(relation)
+    return kept
+
+
+class TreeFieldsMixin:
+    """
+    Миксин сериализаторов узлов оргструктуры: учитывает ?fields= и ?depth=
+    (см. get_tree_options). Поле дочернего уровня child_field отбрасывается
+    до обращения к связи, поэтому неиспользуемые уровни не загружаются
+    и не сериализуются.
+    """
+
+    child_field = None
+
+    def get_fields(self):
+        fields = super().get_fields()
+        if "tree_options" not in self.context:
+            self.context["tree_options"] = get_tree_options(
+                self.context.get("request")
+            )
+        names, depth = self.context["tree_options"]
+        if names is not None:
+            fields = {name: field for name, field in fields.items() if name in names}
+        if depth is not None and self.context.get("tree_level", 0) >= depth:
+            fields.pop(self.child_field, None)
+        return fields
+
+    def get_child_context(self):
+        return {**self.context, "tree_level": self.context.get("tree_level", 0) + 1}
+
+
+class BulkMembersMixin:
+    """
+    Миксин TeamSerializer: вложенный список members записывается пакетно
+    (см. divisions/nested_writes.py), а не вложенным сериализатором
+    на каждого сотрудника. Формат запроса и ответа тот же.
+    """
+
+    def pop_members(self, validated_data):
+        """
+        Извлекает members из validated_data. Возвращает пары (id, данные)
+        или None, если состав не передан. id берётся из исходных данных:
+        в EmployeeSerializer поле id только для чтения. Сотрудник без
+        корректного id создаётся заново, как и в drf-writable-nested.
+        """
+        if "members" not in validated_data:
+            return None
+        members = []
+        for item, data in zip(
+            self.initial_data["members"], validated_data.pop("members")
+        ):
+            pk = str(item.get("pk") or item.get("id") or "")
+            members.append((int(pk) if pk.isdigit() else None, data))
+        return members
+
+    @transaction.atomic
+    def create(self, validated_data):
+        members = self.pop_members(validated_data)
+        instance = super().create(validated_data)
+        if members is not None:
+            nested_writes.write_members(instance, members)
+        return instance
+
+    @transaction.atomic
+    def update(self, instance, validated_data):
+        members = self.pop_members(validated_data)
+        instance = super().update(instance, validated_data)
+        if members is not None:
+            nested_writes.write_members(instance, members)
+        return instance
+
+
+class TeamSerializer(
+    TreeFieldsMixin, BulkMembersMixin, WritableNestedModelSerializer
+):
     members = EmployeeSerializer(many=True, required=False)
+    child_field = "members"
 
     class Meta:
         model = Team
@@ -32,34 +204,62 @@ class TeamSerializer(WritableNestedModelSerializer):
         return EmployeeSerializer(obj.get_all_employees(), many=True).data
 
 
-class DivisionSerializer(WritableNestedModelSerializer):
+class DivisionSerializer(TreeFieldsMixin, WritableNestedModelSerializer):
     teams = serializers.SerializerMethodField()
+    child_field = "teams"
 
     class Meta:
         model = Division
         fields = ["id", "name", "teams", "department"]
 
     def get_teams(self, obj):
-        return TeamSerializer(obj.teams.all(), many=True).data
+        return TeamSerializer(
+            obj.teams.all(), many=True, context=self.get_child_context()
+        ).data
 
 
-class DepartmentSerializer(WritableNestedModelSerializer):
+class DepartmentSerializer(TreeFieldsMixin, WritableNestedModelSerializer):
     divisions = serializers.SerializerMethodField()
+    child_field = "divisions"
 
     class Meta:
         model = Department
         fields = ["id", "name", "divisions", "service"]
 
     def get_divisions(self, obj):
-        return DivisionSerializer(obj.divisions.all(), many=True).data
+        return DivisionSerializer(
+            obj.divisions.all(), many=True, context=self.get_child_context()
+        ).data
 
 
-class ServiceSerializer(WritableNestedModelSerializer):
+class ServiceSerializer(TreeFieldsMixin, WritableNestedModelSerializer):
     departments = serializers.SerializerMethodField()
+    child_field = "departments"
 
     class Meta:
         model = Service
         fields = ["id", "name", "departments"]
 
     def get_departments(self, obj):
-        return DepartmentSerializer(obj.departments.all(), many=True).data
+        return DepartmentSerializer(
+            obj.departments.all(), many=True, context=self.get_child_context()
+        ).data
+
+
+class JobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Job
+        fields = [
+            "id",
+            "name",
+            "params",
+            "status",
+            "attempts",
+            "max_attempts",
+            "progress",
+            "result",
+            "error",
+            "created_at",
+            "started_at",
+            "finished_at",
+        ]
@@ -0,0 +1,226 @@
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_delete,
+    pre_save,
+)
+from django.db import transaction
+from django.dispatch import receiver
+
+from . import ancestry, cache, primary_team, thumbnails, totals
+from .models import Department, Division, Employee, Service, Team
+
+ORG_MODELS = (Service, Department, Division, Team, Employee)
+
+
+@receiver(post_save, sender=Team)
+def sync_team_ancestry(sender, instance, **kwargs):
+    ancestry.sync_teams(Team.objects.filter(pk=instance.pk))
+
+
+@receiver(post_save, sender=Division)
+def sync_division_ancestry(sender, instance, created, **kwargs):
+    if not created:
+        ancestry.sync_division(instance)
+
+
+@receiver(post_save, sender=Department)
+def sync_department_ancestry(sender, instance, created, **kwargs):
+    if not created:
+        ancestry.sync_department(instance)
+
+
+@receiver(post_save, sender=Team)
+def sync_team_primary(sender, instance, created, raw=False, **kwargs):
+    if not created and not raw:
+        primary_team.sync_team(instance)
+
+
+@receiver(post_save, sender=Division)
+def sync_division_primary(sender, instance, created, raw=False, **kwargs):
+    if not created and not raw:
+        primary_team.sync_division(instance)
+
+
+@receiver(post_save, sender=Department)
+def sync_department_primary(sender, instance, created, raw=False, **kwargs):
+    if not created and not raw:
+        primary_team.sync_department(instance)
+
+
+@receiver(pre_delete, sender=Team)
+def remember_team_members(sender, instance, **kwargs):
+    # Строки членства удаляются каскадом без m2m_changed
+    instance._member_ids = set(instance.members.values_list("pk", flat=True))
+
+
+@receiver(post_delete, sender=Team)
+def sync_deleted_team_primary(sender, instance, **kwargs):
+    primary_team.sync_employees(getattr(instance, "_member_ids", ()))
+
+
+DATE_FIELDS = {"date_of_birth", "start_date"}
+
+
+@receiver(pre_save, sender=Employee)
+def remember_employee_totals(
+    sender, instance, raw=False, update_fields=None, **kwargs
+):
+    # Даты сотрудника входят в нарастающие суммы узлов, где он состоит
+    instance._totals_before = None
+    if raw or instance._state.adding:
+        return
+    if update_fields is not None and not DATE_FIELDS & set(update_fields):
+        return
+    instance._totals_before = totals.snapshot({instance.pk})
+
+
+@receiver(post_save, sender=Employee)
+def sync_employee_totals(sender, instance, **kwargs):
+    before = instance.__dict__.pop("_totals_before", None)
+    state = before and before.get(instance.pk)
+    if state and state[1:] != (instance.date_of_birth, instance.start_date):
+        totals.apply(before)
+
+
+@receiver(pre_save, sender=Employee)
+def update_photo_hash(sender, instance, raw=False, **kwargs):
+    if not raw:
+        instance._photo_hash = instance.photo_hash
+        thumbnails.update_photo_hash(instance)
+
+
+@receiver(post_save, sender=Employee)
+def schedule_thumbnails(sender, instance, raw=False, **kwargs):
+    # Новая фотография: миниатюры строятся заранее, вне запроса
+    if not raw and instance.photo_hash != getattr(instance, "_photo_hash", None):
+        transaction.on_commit(lambda: thumbnails.schedule_all(instance))
+
+
+def remember_old_nodes(sender, instance, raw=False, **kwargs):
+    """
+    Запоминает узлы, затронутые объектом до изменения: при переносе
+    в другое подразделение нужно инвалидировать и старых предков.
+    """
+    old = None
+    if not raw and not instance._state.adding:
+        old = sender.objects.filter(pk=instance.pk).first()
+    instance._old_nodes = ancestry.affected_nodes(old) if old else set()
+
+
+def nodes_changed(nodes, employees=None):
+    """
+    Отмечает изменение узлов: инвалидирует их кэш и обновляет метки updated_at
+    (а также метки сотрудников, чьё представление могло измениться).
+    """
+    cache.invalidate(nodes)
+    ancestry.touch(nodes, employees)
+
+
+def _team_members(instance):
+    # Переименование или удаление группы меняет поле team у её сотрудников
+    if isinstance(instance, Team):
+        return Employee.objects.filter(team_members=instance)
+    return None
+
+
+def invalidate_saved(sender, instance, **kwargs):
+    nodes = ancestry.affected_nodes(instance) | getattr(instance, "_old_nodes", set())
+    nodes_changed(nodes, _team_members(instance))
+
+
+PARENT_FIELDS = {
+    Department: "service_id",
+    Division: "department_id",
+    Team: "division_id",
+}
+
+
+def remember_moved_totals(sender, instance, raw=False, **kwargs):
+    # Перенос узла в другое подразделение меняет узлы, где учтены
+    # сотрудники его поддерева
+    instance._totals_before = None
+    parent = PARENT_FIELDS.get(sender)
+    if raw or parent is None or instance._state.adding:
+        return
+    old_parent = (
+        sender.objects.filter(pk=instance.pk).values_list(parent, flat=True).first()
+    )
+    if old_parent is not None and old_parent != getattr(instance, parent):
+        instance._totals_before = totals.snapshot(totals.node_employees(instance))
+
+
+def move_saved_totals(sender, instance, **kwargs):
+    before = instance.__dict__.pop("_totals_before", None)
+    if before:
+        totals.apply(before)
+
+
+def remember_deleted_totals(sender, instance, origin=None, **kwargs):
+    # Удаление отдела или службы каскадно удаляет группы и членства:
+    # снимок сотрудников берётся один раз на всё удаление (origin)
+    origin = instance if origin is None else origin
+    if "_deleted_totals_before" not in origin.__dict__:
+        origin._deleted_totals_before = totals.snapshot(totals.node_employees(origin))
+
+
+def apply_deleted_totals(sender, instance, origin=None, **kwargs):
+    # Первый post_delete приходит, когда строки членства уже удалены
+    origin = instance if origin is None else origin
+    before = origin.__dict__.pop("_deleted_totals_before", None)
+    if before:
+        totals.apply(before)
+
+
+def invalidate_deleted(sender, instance, **kwargs):
+    # Вызывается до удаления, пока связи объекта ещё есть в базе
+    nodes_changed(ancestry.affected_nodes(instance), _team_members(instance))
+
+
+for model in ORG_MODELS:
+    if model is not Employee:
+        pre_save.connect(remember_old_nodes, sender=model)
+        pre_save.connect(remember_moved_totals, sender=model)
+        post_save.connect(move_saved_totals, sender=model)
+    post_save.connect(invalidate_saved, sender=model)
+    pre_delete.connect(invalidate_deleted, sender=model)
+    pre_delete.connect(remember_deleted_totals, sender=model)
+    post_delete.connect(apply_deleted_totals, sender=model)
+
+
+def memberships_changed(team_ids, employee_ids, totals_before=None):
+    """
+    Обрабатывает изменение состава групп. Вызывается из m2m_changed, а также
+    bulk-операциями, которые пишут в таблицу членства напрямую.
+    totals_before — снимок сотрудников до изменения (totals.snapshot);
+    без него считается, что сотрудники раньше не состояли в группах.
+    """
+    primary_team.sync_employees(employee_ids)
+    totals.apply(totals_before or {}, employee_ids)
+    nodes_changed(
+        ancestry.team_nodes(Team.objects.filter(pk__in=team_ids)),
+        Employee.objects.filter(pk__in=employee_ids),
+    )
+
+
+@receiver(m2m_changed, sender=Team.members.through)
+def members_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == "pre_clear":
+        # Очищаются все группы сотрудника либо весь состав группы:
+        # запоминаем связи, пока они есть, и обрабатываем после очистки
+        related = instance.team_members if reverse else instance.members
+        pk_set = instance._cleared_pks = set(related.values_list("pk", flat=True))
+    if action in ("pre_add", "pre_remove", "pre_clear"):
+        employee_ids = {instance.pk} if reverse else pk_set
+        instance._members_totals_before = totals.snapshot(employee_ids)
+        return
+    if action == "post_clear":
+        pk_set = instance.__dict__.pop("_cleared_pks", set())
+    elif action not in ("post_add", "post_remove"):
+        return
+    before = instance.__dict__.pop("_members_totals_before", None)
+    if reverse:
+        memberships_changed(pk_set, {instance.pk}, before)
+    else:
+        memberships_changed({instance.pk}, pk_set, before)
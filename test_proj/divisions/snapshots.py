@@ -0,0 +1,403 @@
+"""
+Снимки оргструктуры на момент времени.
+
+Снимок хранит дерево служба → управление → отдел → группа → состав групп
+и данные сотрудников в каталоге DIVISIONS_SNAPSHOT_ROOT, не затрагивая
+таблицы базы при чтении:
+
+- objects/ — неизменяемые блоки, адресуемые хэшем содержимого (SHA-256
+  канонического JSON), сжатые zlib. Дерево каждой службы — отдельный блок,
+  сотрудники разбиты на блоки по EMPLOYEE_CHUNK идентификаторов. Блок,
+  не изменившийся с прошлого снимка, не записывается повторно;
+- manifests/<id>.json — опись снимка: время, хэши блоков и итоговые числа.
+
+Идентификатор снимка — время съёмки в UTC (20261018T101500Z), поэтому
+снимки упорядочены по имени. Сравнение двух снимков загружает только
+блоки с разными хэшами.
+"""
+
+import functools
+import hashlib
+import json
+import os
+import tempfile
+import zlib
+from collections import defaultdict
+from datetime import date, datetime, timezone
+
+from django.conf import settings
+from django.db import transaction
+
+from .models import Department, Division, Employee, Service, Team
+from .statistics import totals_statistics
+from .totals import month_day
+
+FORMAT_VERSION = 1
+EMPLOYEE_CHUNK = 1000
+EMPLOYEE_FIELDS = ["id", "full_name", "position", "date_of_birth", "start_date"]
+ID_FORMAT = "%Y%m%dT%H%M%SZ"
+LEVELS = [
+    ("services", "departments"),
+    ("departments", "divisions"),
+    ("divisions", "teams"),
+    ("teams", None),
+]
+
+
+class SnapshotNotFound(LookupError):
+    pass
+
+
+def get_root():
+    return settings.DIVISIONS_SNAPSHOT_ROOT
+
+
+def _encode(data):
+    return json.dumps(
+        data, ensure_ascii=False, sort_keys=True, separators=(",", ":")
+    ).encode()
+
+
+def _object_path(digest):
+    return os.path.join(get_root(), "objects", digest[:2], digest[2:])
+
+
+def _manifest_path(snapshot_id):
+    return os.path.join(get_root(), "manifests", f"{snapshot_id}.json")
+
+
+def _write_atomic(path, content):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    with os.fdopen(fd, "wb") as tmp:
+        tmp.write(content)
+    os.replace(tmp_path, path)
+
+
+def _store(data, stats):
+    """
+    Сохраняет блок data, если такого ещё нет. Возвращает его хэш.
+    """
+    content = _encode(data)
+    digest = hashlib.sha256(content).hexdigest()
+    path = _object_path(digest)
+    if os.path.exists(path):
+        stats["reused"] += 1
+    else:
+        compressed = zlib.compress(content, 9)
+        _write_atomic(path, compressed)
+        stats["written"] += 1
+        stats["bytes"] += len(compressed)
+    return digest
+
+
+@functools.lru_cache(maxsize=512)
+def _load(digest):
+    # Блоки неизменяемы, поэтому их можно кэшировать без инвалидации
+    try:
+        with open(_object_path(digest), "rb") as file:
+            return json.loads(zlib.decompress(file.read()))
+    except FileNotFoundError:
+        raise SnapshotNotFound(digest) from None
+
+
+def _read_tree():
+    """
+    Читает дерево и сотрудников несколькими запросами values():
+    ([дерево службы, ...], [строка сотрудника, ...]).
+    """
+    members = defaultdict(list)
+    for team_id, employee_id in Team.members.through.objects.order_by(
+        "team_id", "employee_id"
+    ).values_list("team_id", "employee_id"):
+        members[team_id].append(employee_id)
+
+    def nodes(model, parent_field, children):
+        grouped = defaultdict(list)
+        for pk, name, parent_id in model.objects.order_by("pk").values_list(
+            "pk", "name", parent_field
+        ):
+            grouped[parent_id].append({"id": pk, "name": name, **children(pk)})
+        return grouped
+
+    teams = nodes(Team, "division_id", lambda pk: {"members": members[pk]})
+    divisions = nodes(Division, "department_id", lambda pk: {"teams": teams[pk]})
+    departments = nodes(
+        Department, "service_id", lambda pk: {"divisions": divisions[pk]}
+    )
+    services = [
+        {"id": pk, "name": name, "departments": departments[pk]}
+        for pk, name in Service.objects.order_by("pk").values_list("pk", "name")
+    ]
+    employees = [
+        [pk, full_name, position, born.isoformat(), started.isoformat()]
+        for pk, full_name, position, born, started in Employee.objects.order_by(
+            "pk"
+        ).values_list(*EMPLOYEE_FIELDS)
+    ]
+    return services, employees
+
+
+def take_snapshot(now=None):
+    """
+    Снимает текущую оргструктуру. Возвращает опись снимка с его id
+    и числом записанных и повторно использованных блоков.
+    """
+    now = now or datetime.now(timezone.utc)
+    with transaction.atomic():
+        services, employees = _read_tree()
+
+    stats = {"written": 0, "reused": 0, "bytes": 0}
+    chunks = defaultdict(list)
+    for row in employees:
+        chunks[row[0] // EMPLOYEE_CHUNK].append(row)
+    manifest = {
+        "version": FORMAT_VERSION,
+        "taken_at": now.isoformat(timespec="seconds"),
+        "services": [
+            [service["id"], _store(service, stats)] for service in services
+        ],
+        "employees": [_store(chunks[key], stats) for key in sorted(chunks)],
+        "counts": {
+            "services": len(services),
+            "teams": sum(
+                len(division["teams"])
+                for service in services
+                for department in service["departments"]
+                for division in department["divisions"]
+            ),
+            "employees": len(employees),
+        },
+    }
+
+    snapshot_id = now.strftime(ID_FORMAT)
+    path = _manifest_path(snapshot_id)
+    suffix = 0
+    while os.path.exists(path):
+        suffix += 1
+        path = _manifest_path(f"{snapshot_id}-{suffix}")
+    if suffix:
+        snapshot_id = f"{snapshot_id}-{suffix}"
+    _write_atomic(path, _encode(manifest))
+    return {"id": snapshot_id, **manifest, "objects": stats}
+
+
+def list_snapshots():
+    """
+    Возвращает id снимков по возрастанию времени.
+    """
+    try:
+        names = os.listdir(os.path.join(get_root(), "manifests"))
+    except FileNotFoundError:
+        return []
+    return sorted(name[:-5] for name in names if name.endswith(".json"))
+
+
+def resolve(snapshot_id):
+    """
+    Возвращает id снимка по id или по дате (YYYY-MM-DD — последний
+    снимок, снятый не позже конца этого дня по UTC).
+    """
+    ids = list_snapshots()
+    if snapshot_id in ids:
+        return snapshot_id
+    try:
+        day = date.fromisoformat(snapshot_id)
+    except ValueError:
+        raise SnapshotNotFound(snapshot_id) from None
+    earlier = [pk for pk in ids if pk[:8] <= day.strftime("%Y%m%d")]
+    if not earlier:
+        raise SnapshotNotFound(snapshot_id)
+    return earlier[-1]
+
+
+def get_manifest(snapshot_id):
+    try:
+        with open(_manifest_path(snapshot_id), "rb") as file:
+            return {"id": snapshot_id, **json.loads(file.read())}
+    except FileNotFoundError:
+        raise SnapshotNotFound(snapshot_id) from None
+
+
+def get_employees(manifest):
+    """
+    Возвращает сотрудников снимка: {id: {поле: значение}}.
+    """
+    return {
+        row[0]: dict(zip(EMPLOYEE_FIELDS, row))
+        for digest in manifest["employees"]
+        for row in _load(digest)
+    }
+
+
+def get_tree(manifest, service_ids=None):
+    """
+    Возвращает дерево снимка в виде ответа /api/services/: составы групп
+    раскрываются в данные сотрудников. service_ids ограничивает службы.
+    """
+    employees = get_employees(manifest)
+    services = [
+        _load(digest)
+        for service_id, digest in manifest["services"]
+        if service_ids is None or service_id in service_ids
+    ]
+    return [_expand_members(service, employees) for service in services]
+
+
+def _expand_members(node, employees, level=0):
+    name, child = LEVELS[level]
+    if child is None:
+        return {**node, "members": [employees[pk] for pk in node["members"]]}
+    return {
+        **node,
+        child: [
+            _expand_members(item, employees, level + 1) for item in node[child]
+        ],
+    }
+
+
+def _walk(node, level=0, parent=None):
+    """
+    Обходит поддерево блока службы: (уровень, узел, id родителя).
+    """
+    name, child = LEVELS[level]
+    yield name, node, parent
+    if child is not None:
+        for item in node[child]:
+            yield from _walk(item, level + 1, node["id"])
+
+
+def get_statistics(manifest, today=None):
+    """
+    Статистика по всем узлам снимка в формате /api/statistics/ на дату
+    снимка (или today): сотрудник из нескольких групп узла учитывается
+    в нём один раз.
+    """
+    today = today or datetime.fromisoformat(manifest["taken_at"]).date()
+    today_day = month_day(today)
+    dates = {}
+    for pk, employee in get_employees(manifest).items():
+        born = date.fromisoformat(employee["date_of_birth"])
+        started = date.fromisoformat(employee["start_date"])
+        # Годы дат и признаки ещё не наступивших в году today годовщин
+        dates[pk] = (
+            born.year,
+            started.year,
+            month_day(born) > today_day,
+            month_day(started) > today_day,
+        )
+    children = dict(LEVELS)
+    result = {name: [] for name, _ in LEVELS}
+    for _, digest in manifest["services"]:
+        nodes = list(_walk(_load(digest)))
+        members = {}
+        # Составы собираются снизу вверх: от групп к службе
+        for name, node, _ in reversed(nodes):
+            child = children[name]
+            if child is None:
+                members[name, node["id"]] = set(node["members"])
+            else:
+                members[name, node["id"]] = set().union(
+                    *(members[child, item["id"]] for item in node[child])
+                )
+        for name, node, _ in nodes:
+            ids = members[name, node["id"]]
+            born, started, born_later, start_later = (
+                sum(dates[pk][index] for pk in ids) for index in range(4)
+            )
+            stats = totals_statistics(
+                len(ids), born, started, (born_later, start_later), today
+            )
+            result[name].append({"id": node["id"], **stats})
+    for rows in result.values():
+        rows.sort(key=lambda row: row["id"])
+    return result
+
+
+def _flatten(manifest, service_ids):
+    nodes, memberships = {}, set()
+    for service_id, digest in manifest["services"]:
+        if service_id not in service_ids:
+            continue
+        for name, node, parent in _walk(_load(digest)):
+            nodes[name, node["id"]] = {"name": node["name"], "parent": parent}
+            if name == "teams":
+                memberships.update((node["id"], pk) for pk in node["members"])
+    return nodes, memberships
+
+
+def diff(old, new):
+    """
+    Сравнивает два снимка: изменения узлов, состава групп и сотрудников.
+    Загружаются только блоки, хэши которых в снимках различаются.
+    """
+    old_services, new_services = dict(old["services"]), dict(new["services"])
+    changed = {
+        service_id
+        for service_id in old_services.keys() | new_services.keys()
+        if old_services.get(service_id) != new_services.get(service_id)
+    }
+    old_nodes, old_members = _flatten(old, changed)
+    new_nodes, new_members = _flatten(new, changed)
+
+    def node_rows(keys, nodes):
+        return [
+            {"kind": name, "id": pk, **nodes[name, pk]} for name, pk in sorted(keys)
+        ]
+
+    old_employees, new_employees = {}, {}
+    for digest in set(old["employees"]) ^ set(new["employees"]):
+        target = old_employees if digest in old["employees"] else new_employees
+        target.update({row[0]: row for row in _load(digest)})
+
+    return {
+        "from": old["id"],
+        "to": new["id"],
+        "nodes": {
+            "added": node_rows(new_nodes.keys() - old_nodes.keys(), new_nodes),
+            "removed": node_rows(old_nodes.keys() - new_nodes.keys(), old_nodes),
+            "changed": [
+                {"kind": name, "id": pk, "before": old_nodes[name, pk], "after": after}
+                for (name, pk), after in sorted(new_nodes.items())
+                if (name, pk) in old_nodes and old_nodes[name, pk] != after
+            ],
+        },
+        "memberships": {
+            "added": sorted(new_members - old_members),
+            "removed": sorted(old_members - new_members),
+        },
+        "employees": {
+            "added": sorted(new_employees.keys() - old_employees.keys()),
+            "removed": sorted(old_employees.keys() - new_employees.keys()),
+            "changed": sorted(
+                pk
+                for pk in old_employees.keys() & new_employees.keys()
+                if old_employees[pk] != new_employees[pk]
+            ),
+        },
+    }
+
+
+def prune(keep):
+    """
+    Удаляет все снимки, кроме keep последних, и блоки, на которые
+    оставшиеся снимки не ссылаются. Возвращает (снимков, блоков) удалено.
+    """
+    ids = list_snapshots()
+    removed = ids[: max(len(ids) - keep, 0)]
+    for snapshot_id in removed:
+        os.remove(_manifest_path(snapshot_id))
+
+    used = set()
+    for snapshot_id in ids[len(removed) :]:
+        manifest = get_manifest(snapshot_id)
+        used.update(digest for _, digest in manifest["services"])
+        used.update(manifest["employees"])
+    objects = 0
+    objects_root = os.path.join(get_root(), "objects")
+    for prefix in os.listdir(objects_root) if removed else []:
+        for name in os.listdir(os.path.join(objects_root, prefix)):
+            if prefix + name not in used:
+                os.remove(os.path.join(objects_root, prefix, name))
+                objects += 1
+    return len(removed), objects
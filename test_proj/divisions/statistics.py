@@ -0,0 +1,225 @@
+"""
+Статистика по сотрудникам: агрегирующим запросом для произвольной выборки
+(get_statistics) и по нарастающим суммам узлов оргструктуры без обращения
+к сотрудникам (get_node_statistics, get_bulk_statistics, get_org_statistics).
+"""
+
+import asyncio
+from collections import defaultdict
+from datetime import date
+
+from django.db.models import Avg, Case, Count, Q, Sum, Value, When
+from django.db.models.functions import ExtractYear
+
+from .models import (
+    TOTALS_FIELDS,
+    AnniversaryCount,
+    Department,
+    Division,
+    Service,
+    Team,
+)
+from .totals import month_day
+
+
+def full_years(field, today):
+    """
+    Выражение «полных лет» от даты в поле field до today.
+    Год не засчитывается, если годовщина в текущем году ещё не наступила.
+    """
+    not_yet = Q(**{f"{field}__month__gt": today.month}) | Q(
+        **{f"{field}__month": today.month, f"{field}__day__gt": today.day}
+    )
+    return (
+        Value(today.year)
+        - ExtractYear(field)
+        - Case(When(not_yet, then=Value(1)), default=Value(0))
+    )
+
+
+def _statistics_aggregates(today):
+    return {
+        "employee_count": Count("pk"),
+        "average_age": Avg(full_years("date_of_birth", today)),
+        "average_tenure": Avg(full_years("start_date", today)),
+    }
+
+
+def _round_statistics(stats):
+    if stats["employee_count"] == 0:
+        # Если нет сотрудников, возвращаем нулевые значения
+        return _summarize(0, 0, 0)
+
+    return {
+        "employee_count": stats["employee_count"],
+        "average_age": round(stats["average_age"]),
+        "average_tenure": round(stats["average_tenure"]),
+    }
+
+
+def get_statistics(employees, today=None):
+    """
+    Возвращает статистику для переданного QuerySet сотрудников:
+    - Количество сотрудников.
+    - Средний возраст сотрудников.
+    - Средний стаж работы.
+    Всё вычисляется одним агрегирующим запросом.
+    """
+    today = today or date.today()
+    return _round_statistics(employees.aggregate(**_statistics_aggregates(today)))
+
+
+def _summarize(employee_count, age_total, tenure_total):
+    """
+    Формирует ответ статистики из количества и сумм возрастов и стажей.
+    """
+    if employee_count == 0:
+        return {
+            "employee_count": 0,
+            "average_age": 0,
+            "average_tenure": 0,
+        }
+    return {
+        "employee_count": employee_count,
+        "average_age": round(age_total / employee_count),
+        "average_tenure": round(tenure_total / employee_count),
+    }
+
+
+def totals_statistics(
+    member_count, birth_year_sum, start_year_sum, later=(0, 0), today=None
+):
+    """
+    Формирует статистику узла по его нарастающим суммам (см. divisions/totals.py)
+    без обращения к сотрудникам. later — сколько сотрудников узла ещё не
+    отметили в году today годовщину рождения и начала работы (см.
+    later_anniversaries): им год не засчитывается, как и в full_years.
+    """
+    if member_count == 0:
+        return _summarize(0, 0, 0)
+    year = (today or date.today()).year
+    return _summarize(
+        member_count,
+        year * member_count - birth_year_sum - later[0],
+        year * member_count - start_year_sum - later[1],
+    )
+
+
+def later_anniversaries(today, **filters):
+    """
+    Возвращает запрос числа сотрудников узлов, чьи годовщины в году today
+    ещё не наступили: строки (имя модели узла, id узла, поле, число).
+    filters сужают выборку строк AnniversaryCount.
+    """
+    return (
+        AnniversaryCount.objects.filter(month_day__gt=month_day(today), **filters)
+        .values("node_type", "node_id", "field")
+        .annotate(total=Sum("count"))
+        .values_list("node_type", "node_id", "field", "total")
+        .order_by()
+    )
+
+
+def later_counts(rows):
+    """
+    Раскладывает строки later_anniversaries по узлам:
+    {(имя модели, id): [дни рождения, годовщины начала работы]}.
+    """
+    later = defaultdict(lambda: [0, 0])
+    for node_type, pk, field, total in rows:
+        later[node_type, pk][field == AnniversaryCount.START] += total
+    return later
+
+
+def get_node_statistics(node, today=None):
+    """
+    Возвращает статистику узла (службы, управления, отдела или группы)
+    по уже загруженным нарастающим суммам и одному запросу
+    к счётчикам годовщин.
+    """
+    today = today or date.today()
+    later = later_counts(
+        later_anniversaries(today, node_type=node._meta.model_name, node_id=node.pk)
+    )
+    return totals_statistics(
+        *(getattr(node, field) for field in TOTALS_FIELDS),
+        later[node._meta.model_name, node.pk],
+        today,
+    )
+
+
+def get_bulk_statistics(nodes, today=None):
+    """
+    Возвращает статистику для каждого узла из QuerySet nodes
+    (службы, управления, отделы или группы) двумя запросами:
+    к нарастающим суммам и к счётчикам годовщин: {id узла: статистика}.
+    """
+    today = today or date.today()
+    node_type = nodes.model._meta.model_name
+    later = later_counts(
+        later_anniversaries(
+            today, node_type=node_type, node_id__in=nodes.order_by().values("pk")
+        )
+    )
+    return {
+        pk: totals_statistics(*totals, later[node_type, pk], today)
+        for pk, *totals in nodes.values_list("pk", *TOTALS_FIELDS)
+    }
+
+
+ORG_LEVELS = {
+    "services": Service,
+    "departments": Department,
+    "divisions": Division,
+    "teams": Team,
+}
+
+
+def _org_querysets():
+    return [
+        model.objects.order_by("pk").values_list("pk", *TOTALS_FIELDS)
+        for model in ORG_LEVELS.values()
+    ]
+
+
+def _org_statistics(levels, later, today):
+    later = later_counts(later)
+    return {
+        name: [
+            {
+                "id": pk,
+                **totals_statistics(
+                    *totals, later[model._meta.model_name, pk], today
+                ),
+            }
+            for pk, *totals in rows
+        ]
+        for (name, model), rows in zip(ORG_LEVELS.items(), levels)
+    }
+
+
+def get_org_statistics(today=None):
+    """
+    Возвращает статистику по всем узлам оргструктуры:
+    по одному запросу к нарастающим суммам на уровень
+    и один запрос к счётчикам годовщин.
+    """
+    today = today or date.today()
+    return _org_statistics(_org_querysets(), later_anniversaries(today), today)
+
+
+async def aget_org_statistics(today=None):
+    """
+    Асинхронный вариант get_org_statistics: запросы уровней
+    и счётчиков годовщин выполняются параллельно.
+    """
+    today = today or date.today()
+
+    async def fetch(queryset):
+        return [row async for row in queryset]
+
+    *levels, later = await asyncio.gather(
+        *(fetch(queryset) for queryset in _org_querysets()),
+        fetch(later_anniversaries(today)),
+    )
+    return _org_statistics(levels, later, today)
@@ -0,0 +1,55 @@
+import json
+
+from django.http import StreamingHttpResponse
+from rest_framework.exceptions import ValidationError
+from rest_framework.utils.encoders import JSONEncoder
+
+STREAM_FORMATS = {
+    "json": "application/json",
+    "ndjson": "application/x-ndjson",
+}
+
+
+def _dumps(data):
+    return json.dumps(data, cls=JSONEncoder, ensure_ascii=False, separators=(",", ":"))
+
+
+def stream_response(
+    queryset, serializer_class, fmt, context=None, chunk_size=500, builder=None
+):
+    """
+    Потоковый ответ: объекты читаются из базы порциями по chunk_size через
+    QuerySet.iterator() и сериализуются по одному, поэтому расход памяти
+    не зависит от размера выгрузки.
+    fmt — "ndjson" (объект на строку) или "json" (JSON-массив).
+    builder — строитель строк (см. divisions/rows.py) вместо serializer_class.
+    """
+    if fmt not in STREAM_FORMATS:
+        raise ValidationError(
+            {"stream": f"Допустимые значения: {', '.join(STREAM_FORMATS)}."}
+        )
+
+    context = context or {}
+    if builder is not None:
+        rows = (
+            _dumps(builder.build(row))
+            for row in builder.queryset(queryset).iterator(chunk_size=chunk_size)
+        )
+    else:
+        rows = (
+            _dumps(serializer_class(obj, context=context).data)
+            for obj in queryset.iterator(chunk_size=chunk_size)
+        )
+
+    def ndjson():
+        for row in rows:
+            yield (row + "\n").encode()
+
+    def json_array():
+        yield b"["
+        for i, row in enumerate(rows):
+            yield (("," if i else "") + row).encode()
+        yield b"]"
+
+    content = ndjson() if fmt == "ndjson" else json_array()
+    return StreamingHttpResponse(content, content_type=STREAM_FORMATS[fmt])
@@ -0,0 +1,148 @@
+"""
+Удаление и перенос поддеревьев оргструктуры.
+
+Каскадное удаление службы или управления (on_delete=CASCADE) удаляет
+все отделы, группы и членства одной транзакцией, и на SQLite база
+заблокирована для записи всё это время. delete_subtree удаляет поддерево
+снизу вверх — членства, группы, отделы, управления, затем сам узел —
+порциями ограниченного размера, каждая в своей короткой транзакции,
+и сообщает о ходе удаления через progress. Производные данные
+(основные группы сотрудников, нарастающие суммы, кэш) обновляются
+после каждой порции, поэтому прерванное удаление оставляет
+согласованное, просто меньшее дерево.
+
+move_node переносит узел к другому родителю одним UPDATE внешнего ключа:
+индекс предков, основные группы и суммы переносятся сигналами массовыми
+UPDATE, без пересоздания поддерева.
+"""
+
+from django.db import transaction
+
+from . import totals
+from .models import Department, Division, Service, Team
+from .signals import memberships_changed
+
+BATCH_SIZE = 500
+# Узлы удаляются через ORM с сигналами на каждую строку (около десятка
+# запросов на группу), поэтому их порции меньше
+NODE_BATCH_SIZE = 50
+
+# Поле родителя у каждого уровня
+PARENT_FIELDS = {
+    Department: "service",
+    Division: "department",
+    Team: "division",
+}
+# Пути от модели уровня к предку по внешним ключам
+ANCESTOR_LOOKUPS = {
+    Department: {Service: "service"},
+    Division: {Service: "department__service", Department: "department"},
+    Team: {
+        Service: "division__department__service",
+        Department: "division__department",
+        Division: "division",
+    },
+}
+
+Membership = Team.members.through
+
+
+def _descendants(node):
+    """
+    Возвращает QuerySet потомков node по уровням снизу вверх.
+    """
+    return [
+        model.objects.filter(**{ANCESTOR_LOOKUPS[model][type(node)]: node.pk})
+        for model in (Team, Division, Department)
+        if type(node) in ANCESTOR_LOOKUPS[model]
+    ]
+
+
+def _memberships(node):
+    if isinstance(node, Team):
+        return Membership.objects.filter(team_id=node.pk)
+    lookup = ANCESTOR_LOOKUPS[Team][type(node)]
+    return Membership.objects.filter(**{f"team__{lookup}": node.pk})
+
+
+def _delete_memberships(memberships, batch_size):
+    """
+    Удаляет одну порцию членств. Возвращает число удалённых строк.
+    """
+    with transaction.atomic():
+        rows = list(
+            memberships.order_by("pk").values_list("pk", "team_id", "employee_id")[
+                :batch_size
+            ]
+        )
+        if not rows:
+            return 0
+        employee_ids = {employee_id for _, _, employee_id in rows}
+        before = totals.snapshot(employee_ids)
+        Membership.objects.filter(pk__in=[pk for pk, _, _ in rows]).delete()
+        memberships_changed({team_id for _, team_id, _ in rows}, employee_ids, before)
+    return len(rows)
+
+
+def _delete_nodes(queryset, batch_size):
+    """
+    Удаляет одну порцию узлов. Возвращает (число строк, {модель: число}).
+    """
+    with transaction.atomic():
+        pks = list(queryset.order_by("pk").values_list("pk", flat=True)[:batch_size])
+        if not pks:
+            return 0, {}
+        return queryset.model.objects.filter(pk__in=pks).delete()
+
+
+def delete_subtree(
+    node, batch_size=BATCH_SIZE, node_batch_size=NODE_BATCH_SIZE, progress=None
+):
+    """
+    Удаляет узел (службу, управление, отдел или группу) со всем
+    поддеревом: членства — порциями по batch_size строк, узлы —
+    по node_batch_size. progress(stage=..., done=..., total=...)
+    вызывается после каждой порции. Возвращает результат в формате
+    QuerySet.delete(): (всего строк, {модель: число}).
+    """
+    levels = _descendants(node)
+    memberships = _memberships(node)
+    total = memberships.count() + sum(queryset.count() for queryset in levels) + 1
+    done, deleted = 0, {}
+
+    def report(stage, count, per_model):
+        nonlocal done
+        done += count
+        for label, value in per_model.items():
+            deleted[label] = deleted.get(label, 0) + value
+        if progress is not None:
+            progress(stage=stage, done=min(done, total), total=total)
+
+    label = Membership._meta.label
+    while count := _delete_memberships(memberships, batch_size):
+        report("members", count, {label: count})
+    for queryset in levels:
+        stage = queryset.model._meta.model_name
+        while True:
+            count, per_model = _delete_nodes(queryset, node_batch_size)
+            if not count:
+                break
+            report(stage, per_model.get(queryset.model._meta.label, 0), per_model)
+
+    # Сам узел; каскад удалит то, что появилось в поддереве за время работы
+    with transaction.atomic():
+        count, per_model = type(node).objects.filter(pk=node.pk).delete()
+    report(type(node)._meta.model_name, 1 if count else 0, per_model)
+    return sum(deleted.values()), deleted
+
+
+@transaction.atomic
+def move_node(node, parent):
+    """
+    Переносит управление, отдел или группу node вместе с поддеревом
+    к родителю parent.
+    """
+    field = PARENT_FIELDS[type(node)]
+    setattr(node, field, parent)
+    node.save(update_fields=[field, "updated_at"])
+    return node
@@ -0,0 +1,158 @@
+"""
+Генератор синтетической оргструктуры для нагрузочных замеров.
+
+Дерево строится уровнями через bulk_create (сигналы не вызываются):
+основная группа сотрудника проставляется при вставке, индекс предков
+и нарастающие суммы узлов перестраиваются целиком в конце. Генерация
+детерминирована при одинаковом seed.
+"""
+
+import random
+from datetime import date, timedelta
+
+from django.db import transaction
+
+from . import ancestry, cache, primary_team, totals
+from .models import Department, Division, Employee, Service, Team
+
+SURNAMES = [
+    "Иванов", "Петров", "Сидоров", "Смирнов", "Кузнецов", "Попов", "Васильев",
+    "Соколов", "Михайлов", "Новиков", "Фёдоров", "Морозов", "Волков", "Алексеев",
+    "Лебедев", "Семёнов", "Егоров", "Павлов", "Козлов", "Степанов", "Николаев",
+    "Орлов", "Андреев", "Макаров", "Никитин", "Захаров", "Зайцев", "Соловьёв",
+]
+FIRST_NAMES = [
+    "Иван", "Пётр", "Сергей", "Андрей", "Алексей", "Дмитрий", "Михаил", "Николай",
+    "Александр", "Владимир", "Евгений", "Олег", "Артём", "Максим", "Роман",
+]
+PATRONYMICS = [
+    "Иванович", "Петрович", "Сергеевич", "Андреевич", "Алексеевич", "Дмитриевич",
+    "Михайлович", "Николаевич", "Александрович", "Владимирович", "Олегович",
+]
+POSITIONS = ["Аналитик", "Инженер", "Разработчик", "Специалист", "Руководитель"]
+
+
+def random_full_name(rng):
+    return " ".join(
+        (rng.choice(SURNAMES), rng.choice(FIRST_NAMES), rng.choice(PATRONYMICS))
+    )
+
+
+def employee_rows(count, rng=None):
+    """
+    Генерирует кортежи (full_name, position, date_of_birth, start_date).
+    """
+    rng = rng or random.Random(0)
+    for _ in range(count):
+        born = date(1960, 1, 1) + timedelta(days=rng.randrange(40 * 365))
+        started = born + timedelta(days=rng.randrange(20 * 365, 40 * 365))
+        yield (
+            random_full_name(rng),
+            rng.choice(POSITIONS),
+            born,
+            min(started, date.today()),
+        )
+
+
+def _create_level(model, parents, width, parent_field, label, batch_size):
+    return model.objects.bulk_create(
+        (
+            model(**{parent_field: parent}, name=f"{label} {i + 1}")
+            for parent in parents
+            for i in range(width)
+        ),
+        batch_size=batch_size,
+    )
+
+
+@transaction.atomic
+def generate_org_tree(
+    services,
+    departments,
+    divisions,
+    teams,
+    members,
+    overlap=0.0,
+    seed=0,
+    batch_size=5000,
+):
+    """
+    Создаёт services служб, в каждой departments управлений, в каждом
+    divisions отделов и в каждом отделе teams групп по members сотрудников.
+    Доля overlap сотрудников дополнительно включается во вторую случайную
+    группу той же службы. Возвращает количество созданных объектов.
+    """
+    rng = random.Random(seed)
+    service_objects = Service.objects.bulk_create(
+        (Service(name=f"Служба {i + 1}") for i in range(services)),
+        batch_size=batch_size,
+    )
+    department_objects = _create_level(
+        Department, service_objects, departments, "service", "Управление", batch_size
+    )
+    division_objects = _create_level(
+        Division, department_objects, divisions, "department", "Отдел", batch_size
+    )
+    team_objects = _create_level(
+        Team, division_objects, teams, "division", "Группа", batch_size
+    )
+
+    rows = employee_rows(len(team_objects) * members, rng)
+    Membership = Team.members.through
+    teams_per_service = departments * divisions * teams
+    memberships = 0
+    # Сотрудники создаются порциями по службам, чтобы не держать в памяти
+    # всё дерево сотрудников сразу
+    for offset in range(0, len(team_objects), teams_per_service):
+        service_teams = team_objects[offset : offset + teams_per_service]
+        # Основная группа проставляется сразу; пересчитывать её
+        # придётся только сотрудникам из нескольких групп
+        employees = Employee.objects.bulk_create(
+            (
+                Employee(
+                    full_name=full_name,
+                    position=position,
+                    date_of_birth=born,
+                    start_date=started,
+                    primary_team=team,
+                    team_name=team.name,
+                    primary_division=team.division,
+                    primary_department=team.division.department,
+                    primary_service=team.division.department.service,
+                )
+                for team in service_teams
+                for full_name, position, born, started in (
+                    next(rows) for _ in range(members)
+                )
+            ),
+            batch_size=batch_size,
+        )
+        links = [
+            Membership(team_id=team.pk, employee_id=employee.pk)
+            for i, team in enumerate(service_teams)
+            for employee in employees[i * members : (i + 1) * members]
+        ]
+        overlapping = set()
+        if overlap and len(service_teams) > 1:
+            for link in rng.sample(links, int(len(links) * overlap)):
+                other = rng.choice(service_teams)
+                if other.pk != link.team_id:
+                    links.append(
+                        Membership(team_id=other.pk, employee_id=link.employee_id)
+                    )
+                    overlapping.add(link.employee_id)
+        Membership.objects.bulk_create(links, batch_size=batch_size)
+        primary_team.sync_employees(overlapping)
+        memberships += len(links)
+
+    ancestry.rebuild(batch_size=batch_size)
+    totals.repair()
+    cache.invalidate(set())
+    return {
+        "services": len(service_objects),
+        "departments": len(department_objects),
+        "divisions": len(division_objects),
+        "teams": len(team_objects),
+        "employees": len(team_objects) * members,
+        "memberships": memberships,
+    }
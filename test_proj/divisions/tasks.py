@@ -0,0 +1,43 @@
+"""
+Фоновые задачи оргструктуры (см. divisions/jobs.py).
+Модуль импортируется при запуске приложения, чтобы задачи были
+зарегистрированы и в процессе API, и в воркере run_jobs.
+"""
+
+from . import ancestry, primary_team, search, snapshots, subtree, totals
+from .jobs import register, set_progress
+from .statistics import ORG_LEVELS
+
+
+@register("delete_node")
+def delete_node(kind, pk):
+    """
+    Удаляет узел оргструктуры со всем поддеревом короткими транзакциями,
+    сохраняя ход удаления в задаче.
+    """
+    node = ORG_LEVELS[kind].objects.filter(pk=pk).first()
+    if node is None:
+        return {"deleted": 0, "per_model": {}}
+    deleted, per_model = subtree.delete_subtree(node, progress=set_progress)
+    return {"deleted": deleted, "per_model": per_model}
+
+
+@register("reconcile_totals")
+def reconcile_totals():
+    return {"repaired": totals.repair()}
+
+
+@register("rebuild_org_index")
+def rebuild_org_index():
+    return {"teams": ancestry.rebuild(), "search_rows": search.rebuild()}
+
+
+@register("repair_employee_teams")
+def repair_employee_teams():
+    return {"repaired": primary_team.repair()}
+
+
+@register("take_snapshot", max_attempts=1)
+def take_snapshot():
+    manifest = snapshots.take_snapshot()
+    return {"id": manifest["id"], "objects": manifest["objects"]}
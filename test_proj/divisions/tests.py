@@ -1,3 +1,1690 @@
-from django.test import TestCase
+import io
+import json
+import os
+import shutil
+import tempfile
+from datetime import date, datetime, timezone
+from unittest import mock
 
-# Create your tests here.
+from django.apps import apps
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError, connection, connections
+from django.db.models.signals import post_migrate
+from django.test import (
+    RequestFactory,
+    SimpleTestCase,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+from PIL import Image
+from rest_framework.renderers import JSONRenderer
+
+from . import (
+    ancestry,
+    bulk,
+    cache,
+    instrumentation,
+    jobs,
+    primary_team,
+    renderers,
+    search,
+    snapshots,
+    subtree,
+    thumbnails,
+    totals,
+)
+from .synthetic import generate_org_tree
+from .models import (
+    AnniversaryCount,
+    Department,
+    Division,
+    Employee,
+    Job,
+    Service,
+    Team,
+)
+from .renderers import FastJSONRenderer
+from .routers import ReadReplicaRouter, ReplicaReadsMiddleware, replica_reads
+from .statistics import (
+    get_bulk_statistics,
+    get_node_statistics,
+    get_org_statistics,
+    get_statistics,
+    totals_statistics,
+)
+
+
+def make_employee(full_name="Иванов Иван Иванович", **kwargs):
+    kwargs.setdefault("position", "Аналитик")
+    kwargs.setdefault("date_of_birth", date(1990, 1, 1))
+    kwargs.setdefault("start_date", date(2020, 1, 1))
+    return Employee.objects.create(full_name=full_name, **kwargs)
+
+
+def make_service(name="Служба", width=2):
+    """
+    Строит дерево: служба → width управлений → width отделов →
+    width групп по width сотрудников. Возвращает службу и список групп.
+    """
+    service = Service.objects.create(name=name)
+    teams = []
+    for d in range(width):
+        department = Department.objects.create(service=service, name=f"Управление {d}")
+        for v in range(width):
+            division = Division.objects.create(
+                department=department, name=f"Отдел {d}.{v}"
+            )
+            for t in range(width):
+                team = Team.objects.create(division=division, name=f"Группа {t}")
+                team.members.add(
+                    *(make_employee(f"Сотрудник {d}.{v}.{t}.{e}") for e in range(width))
+                )
+                teams.append(team)
+    return service, teams
+
+
+class OrgTreeMixin:
+    def setUp(self):
+        self.service, self.teams = make_service()
+
+
+class TeamAncestryTests(OrgTreeMixin, TestCase):
+    def test_employees_of_any_node_in_one_query(self):
+        department = self.service.departments.first()
+        with self.assertNumQueries(1):
+            self.assertEqual(len(self.service.get_all_employees()), 16)
+        with self.assertNumQueries(1):
+            self.assertEqual(len(department.get_all_employees()), 8)
+
+    def test_index_follows_moves(self):
+        source, target = self.service.departments.all()
+        division = source.divisions.first()
+        division.department = target
+        division.save()
+
+        other_service = Service.objects.create(name="Другая служба")
+        target.service = other_service
+        target.save()
+
+        self.assertEqual(len(source.get_all_employees()), 4)
+        self.assertEqual(len(target.get_all_employees()), 12)
+        self.assertEqual(len(other_service.get_all_employees()), 12)
+        self.assertEqual(len(self.service.get_all_employees()), 4)
+        self.assertEqual(ancestry.check(), {"missing": [], "stale": [], "orphaned": []})
+
+    def test_check_and_rebuild(self):
+        Team.objects.filter(pk=self.teams[0].pk).update(division=self.teams[-1].division)
+        self.assertEqual(ancestry.check()["stale"], [self.teams[0].pk])
+        self.assertEqual(ancestry.rebuild(), len(self.teams))
+        self.assertEqual(ancestry.check(), {"missing": [], "stale": [], "orphaned": []})
+
+
+class StatisticsTests(TestCase):
+    def test_birthday_adjustment(self):
+        today = date(2025, 6, 15)
+        make_employee(date_of_birth=date(1990, 6, 15), start_date=date(2020, 6, 16))
+        make_employee(date_of_birth=date(1991, 6, 16), start_date=date(2021, 6, 14))
+        make_employee(date_of_birth=date(2000, 12, 31), start_date=date(2024, 1, 1))
+
+        with self.assertNumQueries(1):
+            stats = get_statistics(Employee.objects.all(), today=today)
+
+        # Возраст: 35, 33, 24; стаж: 4, 4, 1
+        self.assertEqual(
+            stats, {"employee_count": 3, "average_age": 31, "average_tenure": 3}
+        )
+
+    def test_empty(self):
+        self.assertEqual(
+            get_statistics(Employee.objects.none()),
+            {"employee_count": 0, "average_age": 0, "average_tenure": 0},
+        )
+
+
+class RunningTotalsTests(OrgTreeMixin, TestCase):
+    def assertTotals(self, node, count):
+        node.refresh_from_db()
+        self.assertEqual(node.member_count, count)
+        self.assertEqual(totals.check(), [])
+
+    def test_totals_statistics(self):
+        today = date(2025, 6, 15)
+        stats = totals_statistics(2, 2 * 1990, 2 * 2020, today=today)
+        self.assertEqual(
+            stats, {"employee_count": 2, "average_age": 35, "average_tenure": 5}
+        )
+        # Ещё не наступившие годовщины не засчитываются
+        stats = totals_statistics(2, 2 * 1990, 2 * 2020, (2, 2), today=today)
+        self.assertEqual(
+            stats, {"employee_count": 2, "average_age": 34, "average_tenure": 4}
+        )
+
+    def test_completed_years_on_anniversary_eve(self):
+        team = self.teams[0]
+        team.members.set(
+            [
+                make_employee(
+                    date_of_birth=date(1990, 10, 19), start_date=date(2020, 10, 19)
+                ),
+                make_employee(
+                    date_of_birth=date(1990, 10, 18), start_date=date(2020, 10, 18)
+                ),
+            ]
+        )
+        team.refresh_from_db()
+        for today in (date(2026, 10, 18), date(2026, 10, 19), date(2027, 2, 28)):
+            with self.subTest(today=today):
+                self.assertEqual(
+                    get_node_statistics(team, today),
+                    get_statistics(team.members.all(), today),
+                )
+        self.assertEqual(
+            get_node_statistics(team, date(2026, 10, 18)),
+            {"employee_count": 2, "average_age": 36, "average_tenure": 6},
+        )
+        self.assertEqual(
+            get_node_statistics(team, date(2026, 10, 17))["average_age"], 35
+        )
+
+    def test_endpoints_match_employee_rows(self):
+        today = date.today()
+        # Годовщина в следующем месяце ещё не наступила (кроме декабря)
+        upcoming = date(today.year, today.month % 12 + 1, 1)
+        team = self.teams[0]
+        team.members.add(
+            make_employee(
+                date_of_birth=upcoming.replace(year=today.year - 36),
+                start_date=upcoming.replace(year=today.year - 6),
+            )
+        )
+        expected = get_statistics(team.get_employees_queryset(), today)
+        for url in (
+            f"/api/teams/{team.pk}/statistics/",
+            f"/api/async/teams/{team.pk}/statistics/",
+        ):
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).json(), expected)
+
+    def test_membership_and_employee_changes(self):
+        team = self.teams[0]
+        self.assertTotals(self.service, 16)
+        employee = make_employee()
+        team.members.add(employee)
+        self.assertTotals(self.service, 17)
+        # Сотрудник во второй группе той же службы учитывается один раз
+        self.teams[1].members.add(employee)
+        self.assertTotals(self.service, 17)
+        team.members.remove(employee, make_employee())
+        self.assertTotals(team, 2)
+        self.assertTotals(self.service, 17)
+
+        employee.date_of_birth = date(1970, 1, 1)
+        employee.save()
+        self.assertTotals(self.teams[1], 3)
+        employee.team_members.clear()
+        self.assertTotals(self.service, 16)
+
+        team.members.first().delete()
+        self.assertTotals(team, 1)
+        self.assertTotals(self.service, 15)
+
+    def test_moves_and_deletes(self):
+        other, other_teams = make_service("Другая", width=1)
+        team = self.teams[0]
+        team.division = other_teams[0].division
+        team.save()
+        self.assertTotals(other, 3)
+        self.assertTotals(self.service, 14)
+
+        department = self.service.departments.first()
+        department.service = other
+        department.save()
+        self.assertTotals(other, 9)
+
+        team.delete()
+        self.assertTotals(other, 7)
+        department.delete()
+        self.assertTotals(other, 1)
+        self.assertTotals(self.service, 8)
+
+    def test_node_save_keeps_totals(self):
+        service = Service.objects.get(pk=self.service.pk)
+        self.teams[0].members.add(make_employee())
+        service.name = "Переименованная"
+        service.save()
+        self.assertTotals(service, 17)
+
+    def test_endpoint_and_reconcile_command(self):
+        department = self.service.departments.first()
+        response = self.client.get(f"/api/departments/{department.pk}/statistics/")
+        self.assertEqual(response.json(), get_node_statistics(department))
+        self.assertEqual(response.json()["employee_count"], 8)
+
+        Service.objects.update(member_count=0)
+        AnniversaryCount.objects.filter(node_type="team").delete()
+        with self.assertRaises(CommandError):
+            call_command("reconcile_org_totals", "--check", stderr=io.StringIO())
+        call_command("reconcile_org_totals", stdout=io.StringIO())
+        self.assertTotals(self.service, 16)
+        self.assertTrue(AnniversaryCount.objects.filter(node_type="team").exists())
+
+
+class DistinctEmployeesTests(OrgTreeMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        cache.get_cache().clear()
+        # Сотрудник группы 0 состоит ещё в группе того же отдела, в группе
+        # соседнего отдела того же управления и в группе другого управления
+        self.employee = self.teams[0].members.order_by("pk").first()
+        for team in (self.teams[1], self.teams[2], self.teams[4]):
+            team.members.add(self.employee)
+        division = self.teams[0].division
+        self.nodes = [
+            ("services", self.service, 16, [0, 1, 2, 4]),
+            ("departments", division.department, 8, [0, 1, 2]),
+            ("divisions", division, 4, [0, 1]),
+            ("teams", self.teams[0], 2, [0]),
+        ]
+
+    def test_employees_are_distinct_at_every_level(self):
+        for kind, node, count, teams in self.nodes:
+            with self.subTest(kind=kind):
+                employees = self.client.get(
+                    f"/api/{kind}/{node.pk}/employees/", {"with_teams": 1}
+                ).json()
+                ids = [employee["id"] for employee in employees]
+                self.assertEqual(len(ids), count)
+                self.assertEqual(len(set(ids)), count)
+                self.assertEqual(len(node.get_all_employees()), count)
+                (mine,) = [e for e in employees if e["id"] == self.employee.pk]
+                self.assertEqual(mine["teams"], [self.teams[i].pk for i in teams])
+
+                async_employees = self.client.get(
+                    f"/api/async/{kind}/{node.pk}/employees/", {"with_teams": 1}
+                ).json()
+                self.assertEqual(async_employees, employees)
+
+    def test_statistics_count_each_employee_once(self):
+        self.assertEqual(totals.check(), [])
+        for kind, node, count, _ in self.nodes:
+            with self.subTest(kind=kind):
+                node.refresh_from_db()
+                stats = self.client.get(f"/api/{kind}/{node.pk}/statistics/").json()
+                self.assertEqual(stats["employee_count"], count)
+                self.assertEqual(
+                    get_statistics(node.get_employees_queryset())["employee_count"],
+                    count,
+                )
+
+        # Удаление одной из групп сотрудника не исключает его из предков
+        self.teams[4].delete()
+        self.assertEqual(totals.check(), [])
+        self.service.refresh_from_db()
+        self.assertEqual(self.service.member_count, 14)
+
+
+class BulkStatisticsTests(OrgTreeMixin, TestCase):
+    def test_bulk_matches_employee_rows(self):
+        # Годовщины сотрудников по обе стороны от today
+        today = date(2026, 10, 18)
+        for i, employee in enumerate(Employee.objects.order_by("pk")):
+            employee.date_of_birth = date(1970 + i, 10, 16 + i % 5)
+            employee.start_date = date(2010 + i % 7, 10, 17 + i % 3)
+            employee.save()
+        departments = Department.objects.order_by("pk")
+        with self.assertNumQueries(2):
+            stats = get_bulk_statistics(departments, today)
+        for department in departments:
+            expected = get_statistics(department.get_employees_queryset(), today)
+            self.assertEqual(stats[department.pk], expected)
+            self.assertEqual(get_node_statistics(department, today), expected)
+
+    def test_org_rollup(self):
+        empty = Service.objects.create(name="Пустая служба")
+        with self.assertNumQueries(5):
+            stats = get_org_statistics()
+        services = {row["id"]: row for row in stats["services"]}
+        self.assertEqual(services[self.service.pk]["employee_count"], 16)
+        self.assertEqual(services[empty.pk]["employee_count"], 0)
+        self.assertEqual(len(stats["teams"]), len(self.teams))
+
+    def test_endpoint(self):
+        department = self.service.departments.first()
+        response = self.client.get(
+            "/api/departments/statistics/", {"ids": f"{department.pk},0"}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row["id"] for row in response.json()], [department.pk])
+        self.assertEqual(response.json()[0]["employee_count"], 8)
+
+
+class TreeQueryCountTests(TestCase):
+    def assertConstantQueries(self, url, grow):
+        # Кэш ответов сбрасывается, чтобы каждый раз измерять запросы к базе
+        make_service(width=1)
+        cache.get_cache().clear()
+        with CaptureQueriesContext(connection) as small:
+            self.assertEqual(self.client.get(url).status_code, 200)
+        grow()
+        cache.get_cache().clear()
+        with self.assertNumQueries(len(small.captured_queries)):
+            self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_service_list(self):
+        self.assertConstantQueries(
+            "/api/services/", lambda: [make_service(width=3) for _ in range(2)]
+        )
+
+    def test_service_retrieve(self):
+        service, _ = make_service(width=1)
+
+        def grow():
+            bigger, _ = make_service(width=3)
+            Department.objects.filter(service=bigger).update(service=service)
+
+        self.assertConstantQueries(f"/api/services/{service.pk}/", grow)
+
+    def test_team_list(self):
+        self.assertConstantQueries("/api/teams/", lambda: make_service(width=3))
+
+    def test_employee_list(self):
+        self.assertConstantQueries("/api/employees/", lambda: make_service(width=3))
+
+    def test_employee_list_skips_memberships(self):
+        make_service(width=2)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get("/api/employees/")
+        self.assertFalse(
+            [q for q in queries.captured_queries if "divisions_team_members" in q["sql"]]
+        )
+
+    def test_employees_action(self):
+        service, _ = make_service(width=1)
+
+        def grow():
+            bigger, _ = make_service(width=3)
+            Department.objects.filter(service=bigger).update(service=service)
+            ancestry.rebuild()
+
+        self.assertConstantQueries(f"/api/services/{service.pk}/employees/", grow)
+
+
+class OrgTreeTests(OrgTreeMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        cache.get_cache().clear()
+        # Сотрудник в двух группах и отдел без групп
+        self.teams[-1].members.add(self.teams[0].members.first())
+        Division.objects.create(
+            department=self.teams[0].division.department, name="Пустой"
+        )
+        make_service("Другая служба", width=1)
+
+    def get(self, url):
+        return self.client.get(url, HTTP_ACCEPT="application/json")
+
+    def test_matches_nested_serializers(self):
+        division = self.teams[0].division
+        cases = [
+            ("/api/org-tree/", "/api/services/"),
+            ("/api/org-tree/?max_depth=2", "/api/services/?depth=2"),
+            ("/api/org-tree/?max_depth=0", "/api/services/?depth=0"),
+            (
+                f"/api/org-tree/?root=services:{self.service.pk}&max_depth=3",
+                f"/api/services/{self.service.pk}/?depth=3",
+            ),
+            (
+                f"/api/org-tree/?root=divisions:{division.pk}",
+                f"/api/divisions/{division.pk}/",
+            ),
+            (
+                f"/api/org-tree/?root=teams:{self.teams[0].pk}",
+                f"/api/teams/{self.teams[0].pk}/",
+            ),
+        ]
+        for url, expected_url in cases:
+            with self.subTest(url=url):
+                expected = self.get(expected_url).json()
+                if "root=" in url:
+                    expected = [expected]
+                self.assertEqual(self.get(url).json(), expected)
+
+    def test_constant_queries(self):
+        with CaptureQueriesContext(connection) as small:
+            self.assertEqual(self.get("/api/org-tree/").status_code, 200)
+        make_service("Большая служба", width=3)
+        with self.assertNumQueries(len(small.captured_queries)):
+            self.assertEqual(self.get("/api/org-tree/").status_code, 200)
+        # Отметка изменения дерева, четыре уровня и состав групп
+        self.assertEqual(len(small.captured_queries), 6)
+
+        with self.assertNumQueries(3):
+            self.get(f"/api/org-tree/?root=services:{self.service.pk}&max_depth=1")
+
+    def test_invalid_parameters(self):
+        self.assertEqual(self.get("/api/org-tree/?root=teams").status_code, 400)
+        self.assertEqual(self.get("/api/org-tree/?root=rooms:1").status_code, 400)
+        self.assertEqual(self.get("/api/org-tree/?max_depth=-1").status_code, 400)
+        self.assertEqual(self.get("/api/org-tree/?root=teams:999").status_code, 404)
+
+
+class TreeFieldsTests(OrgTreeMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        cache.get_cache().clear()
+
+    def get(self, url, prefix="/api/"):
+        response = self.client.get(prefix + url, HTTP_ACCEPT="application/json")
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_depth(self):
+        data = self.get(f"services/{self.service.pk}/?depth=1")
+        self.assertEqual(len(data["departments"]), 2)
+        self.assertNotIn("divisions", data["departments"][0])
+        self.assertNotIn("departments", self.get("services/?depth=0")[0])
+        self.assertNotIn("members", self.get(f"teams/{self.teams[0].pk}/?depth=0"))
+
+    def test_fields(self):
+        data = self.get("services/?fields=name,departments,divisions")
+        self.assertEqual(data[0]["departments"][0]["divisions"][0], {"name": "Отдел 0.0"})
+        team = self.get(f"teams/{self.teams[0].pk}/?fields=id,members")
+        self.assertEqual(set(team), {"id", "members"})
+        self.assertEqual(len(team["members"]), 2)
+
+    def test_shallow_views_do_not_load_subtree(self):
+        url = "services/?fields=id,name,departments&depth=1"
+        with CaptureQueriesContext(connection) as small:
+            self.get(url)
+        self.assertFalse(
+            [q for q in small.captured_queries if "divisions_team" in q["sql"]]
+        )
+        make_service("Ещё", width=3)
+        cache.get_cache().clear()
+        with self.assertNumQueries(len(small.captured_queries)):
+            self.get(url)
+
+    def test_async_api_matches(self):
+        for url in [
+            f"services/{self.service.pk}/?depth=2",
+            "departments/?fields=id,divisions,teams",
+            "teams/?depth=0",
+        ]:
+            with self.subTest(url=url):
+                self.assertEqual(self.get(url, "/api/async/"), self.get(url))
+
+    def test_invalid_depth(self):
+        for prefix in ("/api/", "/api/async/"):
+            response = self.client.get(f"{prefix}services/?depth=-1")
+            self.assertEqual(response.status_code, 400)
+
+
+class PrimaryTeamTests(OrgTreeMixin, TestCase):
+    def assertPrimary(self, employee, team):
+        employee.refresh_from_db()
+        self.assertEqual(employee.primary_team_id, team.pk if team else None)
+        self.assertEqual(employee.team, team.name if team else None)
+        if team:
+            self.assertEqual(employee.primary_division_id, team.division_id)
+            self.assertEqual(
+                employee.primary_service_id, team.division.department.service_id
+            )
+        self.assertEqual(primary_team.check(), [])
+
+    def test_membership_changes(self):
+        first, second = self.teams[:2]
+        employee = make_employee()
+        self.assertPrimary(employee, None)
+        second.members.add(employee)
+        self.assertPrimary(employee, second)
+        first.members.add(employee)
+        self.assertPrimary(employee, first)
+        employee.team_members.remove(first)
+        self.assertPrimary(employee, second)
+        employee.team_members.clear()
+        self.assertPrimary(employee, None)
+
+    def test_rename_move_and_delete(self):
+        team = self.teams[0]
+        employee = team.members.first()
+        team.name = "Переименованная"
+        team.save()
+        self.assertPrimary(employee, team)
+
+        other_service, _ = make_service("Другая", width=1)
+        department = team.division.department
+        department.service = other_service
+        department.save()
+        self.assertPrimary(employee, team)
+
+        team.members.clear()
+        self.teams[1].members.add(employee)
+        self.teams[1].delete()
+        self.assertPrimary(employee, None)
+
+    def test_repair(self):
+        Employee.objects.update(team_name="Устаревшее", primary_team=None)
+        self.assertTrue(primary_team.check())
+        self.assertEqual(primary_team.repair(), Employee.objects.count())
+        self.assertEqual(primary_team.check(), [])
+
+
+class SyntheticTreeTests(TestCase):
+    def test_generate_org_tree(self):
+        counts = generate_org_tree(2, 2, 2, 3, 4, overlap=0.5)
+        self.assertEqual(
+            counts,
+            {
+                "services": 2,
+                "departments": 4,
+                "divisions": 8,
+                "teams": 24,
+                "employees": 96,
+                "memberships": Team.members.through.objects.count(),
+            },
+        )
+        self.assertGreater(counts["memberships"], counts["employees"])
+        self.assertEqual(Employee.objects.count(), 96)
+        self.assertEqual(
+            ancestry.check(), {"missing": [], "stale": [], "orphaned": []}
+        )
+        self.assertEqual(primary_team.check(), [])
+
+    def test_deterministic(self):
+        generate_org_tree(1, 1, 1, 2, 3, seed=7)
+        first = list(Employee.objects.values_list("full_name", "date_of_birth"))
+        Employee.objects.all().delete()
+        Service.objects.all().delete()
+        generate_org_tree(1, 1, 1, 2, 3, seed=7)
+        second = list(Employee.objects.values_list("full_name", "date_of_birth"))
+        self.assertEqual(first, second)
+
+
+class SnapshotTests(OrgTreeMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root, ignore_errors=True)
+        settings = override_settings(DIVISIONS_SNAPSHOT_ROOT=root)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.other, _ = make_service("Другая служба", width=1)
+
+    def take(self, day):
+        return snapshots.take_snapshot(datetime(2026, 1, day, tzinfo=timezone.utc))
+
+    def test_unchanged_blocks_are_reused(self):
+        first = self.take(1)
+        self.assertEqual(first["id"], "20260101T000000Z")
+        self.assertEqual(first["objects"]["reused"], 0)
+        self.assertEqual(first["counts"]["employees"], Employee.objects.count())
+
+        self.teams[0].members.add(make_employee("Новый сотрудник"))
+        second = self.take(2)
+        # Переписаны только блок изменённой службы и блок сотрудников
+        self.assertEqual(second["objects"]["written"], 2)
+        self.assertEqual(
+            dict(second["services"])[self.other.pk],
+            dict(first["services"])[self.other.pk],
+        )
+
+        self.assertEqual(self.take(2)["id"], "20260102T000000Z-1")
+        self.assertEqual(snapshots.prune(keep=1), (2, 2))
+        self.assertEqual(snapshots.list_snapshots(), ["20260102T000000Z-1"])
+
+    def test_read_diff_and_statistics_without_database(self):
+        self.take(1)
+        moved = self.teams[0].members.first()
+        self.teams[0].members.remove(moved)
+        self.teams[1].members.add(moved)
+        Team.objects.filter(pk=self.teams[2].pk).update(name="Переименованная")
+        newcomer = make_employee("Новый сотрудник")
+        self.take(2)
+        live = get_org_statistics(today=date(2026, 1, 2))
+
+        with self.assertNumQueries(0):
+            listing = self.client.get("/api/snapshots/").json()
+            tree = self.client.get(
+                f"/api/snapshots/2026-01-01/?service={self.service.pk}"
+            ).json()
+            changes = self.client.get(
+                "/api/snapshots/diff/?from=2026-01-01&to=2026-01-02"
+            ).json()
+            statistics = self.client.get(
+                "/api/snapshots/20260102T000000Z/statistics/"
+            ).json()
+            missing = self.client.get("/api/snapshots/2025-12-31/")
+
+        self.assertEqual(
+            [row["id"] for row in listing], ["20260101T000000Z", "20260102T000000Z"]
+        )
+        self.assertEqual(tree["id"], "20260101T000000Z")
+        self.assertEqual([row["id"] for row in tree["services"]], [self.service.pk])
+        division = tree["services"][0]["departments"][0]["divisions"][0]
+        first_team = division["teams"][0]
+        self.assertIn(moved.pk, [member["id"] for member in first_team["members"]])
+
+        division_id = self.teams[2].division_id
+        self.assertEqual(changes["nodes"]["added"], [])
+        self.assertEqual(
+            changes["nodes"]["changed"],
+            [
+                {
+                    "kind": "teams",
+                    "id": self.teams[2].pk,
+                    "before": {"name": "Группа 0", "parent": division_id},
+                    "after": {"name": "Переименованная", "parent": division_id},
+                }
+            ],
+        )
+        self.assertEqual(
+            changes["memberships"],
+            {
+                "added": [[self.teams[1].pk, moved.pk]],
+                "removed": [[self.teams[0].pk, moved.pk]],
+            },
+        )
+        self.assertEqual(
+            changes["employees"],
+            {"added": [newcomer.pk], "removed": [], "changed": []},
+        )
+        self.assertEqual(statistics, live)
+        self.assertEqual(missing.status_code, 404)
+
+    def test_take_snapshot_command(self):
+        out = io.StringIO()
+        call_command("take_snapshot", "--keep", "1", stdout=out)
+        call_command("take_snapshot", "--keep", "1", stdout=out)
+        self.assertEqual(len(snapshots.list_snapshots()), 1)
+        self.assertIn("повторно использовано 3", out.getvalue())
+
+
+class SubtreeTests(OrgTreeMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.other, self.other_teams = make_service("Другая служба", width=1)
+        # Сотрудник обеих служб
+        self.shared = self.teams[0].members.first()
+        self.other_teams[0].members.add(self.shared)
+
+    def assertConsistent(self):
+        self.assertEqual(
+            ancestry.check(), {"missing": [], "stale": [], "orphaned": []}
+        )
+        self.assertEqual(primary_team.check(), [])
+        self.assertEqual(totals.check(), [])
+
+    def test_delete_in_batches(self):
+        calls = []
+        memberships = Team.members.through.objects.filter(
+            team__division__department__service=self.service
+        ).count()
+        deleted, per_model = subtree.delete_subtree(
+            self.service,
+            batch_size=3,
+            node_batch_size=2,
+            progress=lambda **kw: calls.append(kw),
+        )
+
+        self.assertFalse(Service.objects.filter(pk=self.service.pk).exists())
+        self.assertEqual(Team.objects.count(), len(self.other_teams))
+        self.assertEqual(per_model["divisions.Team_members"], memberships)
+        self.assertEqual(per_model["divisions.Team"], len(self.teams))
+        self.assertEqual(deleted, sum(per_model.values()))
+        # Снизу вверх, порциями не больше batch_size
+        stages = [call["stage"] for call in calls]
+        self.assertEqual(
+            list(dict.fromkeys(stages)),
+            ["members", "team", "division", "department", "service"],
+        )
+        self.assertEqual(stages.count("members"), -(-memberships // 3))
+        self.assertEqual(stages.count("team"), len(self.teams) // 2)
+        self.assertEqual(calls[-1]["done"], calls[-1]["total"])
+
+        self.assertEqual(
+            set(self.other.get_employees_queryset()),
+            set(Employee.objects.filter(team_members__in=self.other_teams)),
+        )
+        self.shared.refresh_from_db()
+        self.assertEqual(self.shared.primary_team_id, self.other_teams[0].pk)
+        self.assertConsistent()
+
+    def test_destroy_endpoint(self):
+        department = self.teams[0].division.department
+        response = self.client.delete(f"/api/departments/{department.pk}/")
+        self.assertEqual(response.status_code, 204)
+        self.assertFalse(Division.objects.filter(department=department).exists())
+        self.assertConsistent()
+
+    def test_delete_job_progress(self):
+        response = self.client.delete(f"/api/services/{self.service.pk}/?async=1")
+        jobs.run_pending()
+        job = Job.objects.get(pk=response.json()["id"])
+        self.assertEqual(job.status, Job.SUCCEEDED)
+        self.assertEqual(job.progress["stage"], "service")
+        self.assertEqual(job.progress["done"], job.progress["total"])
+        self.assertConsistent()
+
+    def test_move(self):
+        division = self.teams[0].division
+        target = self.other_teams[0].division.department
+        url = f"/api/divisions/{division.pk}/move/"
+
+        response = self.client.post(url, {"parent": target.pk}, "application/json")
+        self.assertEqual(response.json(), {"id": division.pk, "department": target.pk})
+        division.refresh_from_db()
+        self.assertEqual(division.department_id, target.pk)
+        self.assertEqual(
+            set(self.other.get_employees_queryset().values_list("pk", flat=True)),
+            set(
+                Employee.objects.filter(
+                    team_members__division__department=target
+                ).values_list("pk", flat=True)
+            ),
+        )
+        self.assertConsistent()
+
+        missing = self.client.post(url, {"parent": 999}, "application/json")
+        self.assertEqual(missing.status_code, 400)
+        self.assertEqual(
+            self.client.post(
+                f"/api/services/{self.service.pk}/move/", {}, "application/json"
+            ).status_code,
+            404,
+        )
+
+
+def register_test_job(test, name, func, max_attempts=3):
+    jobs.register(name, max_attempts=max_attempts)(func)
+    test.addCleanup(jobs._registry.pop, name)
+
+
+class JobTests(OrgTreeMixin, TestCase):
+    def test_async_delete(self):
+        url = f"/api/services/{self.service.pk}/?async=1"
+        response = self.client.delete(url)
+        self.assertEqual(response.status_code, 202)
+        job = response.json()
+        self.assertEqual(job["status"], Job.PENDING)
+        self.assertEqual(response["Location"], f"/api/jobs/{job['id']}/")
+        # Такая же ожидающая задача не дублируется
+        self.assertEqual(self.client.delete(url).json()["id"], job["id"])
+        self.assertTrue(Service.objects.filter(pk=self.service.pk).exists())
+
+        self.assertEqual(len(jobs.run_pending()), 1)
+        self.assertFalse(Service.objects.filter(pk=self.service.pk).exists())
+        self.assertEqual(totals.check(), [])
+        job = self.client.get(response["Location"]).json()
+        self.assertEqual(job["status"], Job.SUCCEEDED)
+        self.assertEqual(job["result"]["per_model"]["divisions.Team"], len(self.teams))
+
+    def test_retries(self):
+        calls = []
+
+        def flaky(fail_times):
+            calls.append(1)
+            if len(calls) <= fail_times:
+                raise RuntimeError("временная ошибка")
+            return {"calls": len(calls)}
+
+        register_test_job(self, "flaky", flaky, max_attempts=2)
+        job = jobs.enqueue("flaky", fail_times=1)
+        jobs.run_pending()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.PENDING, 1))
+        self.assertIn("временная ошибка", job.error)
+        # Повтор откладывается: сейчас выполнять нечего
+        self.assertEqual(jobs.run_pending(), [])
+
+        Job.objects.filter(pk=job.pk).update(run_after=job.created_at)
+        jobs.run_pending()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.result), (Job.SUCCEEDED, {"calls": 2}))
+
+        failing = jobs.enqueue("flaky", fail_times=10)
+        for _ in range(2):
+            Job.objects.filter(pk=failing.pk).update(run_after=failing.created_at)
+            jobs.run_pending()
+        failing.refresh_from_db()
+        self.assertEqual((failing.status, failing.attempts), (Job.FAILED, 2))
+
+    def test_progress_and_command(self):
+        def counted(total):
+            for done in range(1, total + 1):
+                jobs.set_progress(done=done, total=total)
+            return done
+
+        register_test_job(self, "counted", counted)
+        job = jobs.enqueue("counted", total=3)
+        self.assertNotEqual(jobs.enqueue("counted", total=4).pk, job.pk)
+        out = io.StringIO()
+        call_command("run_jobs", "--once", "--workers", "1", stdout=out)
+        self.assertIn(f"counted #{job.pk}: succeeded", out.getvalue())
+        job.refresh_from_db()
+        self.assertEqual(job.progress, {"done": 3, "total": 3})
+
+        with self.assertRaises(jobs.UnknownJob):
+            jobs.enqueue("missing")
+
+    def test_enqueue_race(self):
+        register_test_job(self, "counted", lambda total: total)
+        # Другой запрос поставил такую же задачу между проверкой и вставкой,
+        # и воркер успел её захватить
+        job = jobs.enqueue("counted", total=1)
+        Job.objects.filter(pk=job.pk).update(status=Job.RUNNING)
+        with mock.patch.object(Job.objects, "create", side_effect=IntegrityError):
+            self.assertEqual(jobs.enqueue("counted", total=1).pk, job.pk)
+
+
+class JobWorkerPoolTests(TransactionTestCase):
+    def test_thread_pool(self):
+        seen = []
+
+        def remember(value):
+            seen.append(value)
+            return value
+
+        register_test_job(self, "remember", remember)
+        for value in range(5):
+            jobs.enqueue("remember", value=value)
+        done = jobs.run_pending(workers=3)
+        self.assertEqual(sorted(job.result for job in done), list(range(5)))
+        self.assertEqual(sorted(seen), list(range(5)))
+        self.assertEqual(Job.objects.filter(status=Job.SUCCEEDED).count(), 5)
+
+
+class ResponseCacheTests(OrgTreeMixin, TestCase):
+    def setUp(self):
+        cache.get_cache().clear()
+        super().setUp()
+
+    def get(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_hit_after_miss(self):
+        url = f"/api/services/{self.service.pk}/"
+        self.assertEqual(self.get(url)["X-Cache"], "MISS")
+        # Единственный запрос — чтение метки updated_at для ETag
+        with self.assertNumQueries(1):
+            self.assertEqual(self.get(url)["X-Cache"], "HIT")
+        self.assertEqual(cache.get_stats(), {"hits": 1, "misses": 1})
+
+    def test_writes_invalidate_only_affected_subtrees(self):
+        other, _ = make_service("Другая служба")
+        urls = {
+            "service": f"/api/services/{self.service.pk}/employees/",
+            "other": f"/api/services/{other.pk}/employees/",
+            "list": "/api/services/",
+        }
+        for url in urls.values():
+            self.get(url)
+
+        self.teams[0].members.add(make_employee("Новый сотрудник"))
+
+        self.assertEqual(self.get(urls["service"])["X-Cache"], "MISS")
+        self.assertEqual(len(self.get(urls["service"]).json()), 17)
+        self.assertEqual(self.get(urls["other"])["X-Cache"], "HIT")
+        self.assertEqual(self.get(urls["list"])["X-Cache"], "MISS")
+
+    def test_replica_refresh_drops_stale_responses(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, "replica.sqlite3")
+        open(path, "w").close()
+
+        def refresh(command, path):
+            # Файл снимка подменяется целиком, как в Command.refresh
+            open(f"{path}.tmp", "w").close()
+            os.replace(f"{path}.tmp", path)
+
+        url = f"/api/services/{self.service.pk}/"
+        settings = override_settings(SQLITE_REPLICA_PATH=path)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.get(url)
+        # Запись на основной базе увеличила версию узла, а снимок для чтения
+        # ещё старый: ответ по снимку кэшируется под новой версией
+        cache.invalidate({("service", self.service.pk)})
+        self.assertEqual(self.get(url).json()["name"], "Служба")
+        # Снимок обновлён и видит запись (роль снимка играет тестовая база,
+        # копировать её не нужно). Команда работает в другом процессе
+        # со своим кэшем
+        Service.objects.filter(pk=self.service.pk).update(name="Новая служба")
+        other_cache = {
+            "default": {
+                "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+                "LOCATION": "refresh-read-replica",
+            }
+        }
+        with override_settings(CACHES=other_cache), mock.patch(
+            "divisions.management.commands.refresh_read_replica.Command.refresh",
+            refresh,
+        ):
+            call_command("refresh_read_replica", stdout=io.StringIO())
+        response = self.get(url)
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertEqual(response.json()["name"], "Новая служба")
+
+    def test_move_invalidates_old_and_new_parent(self):
+        other, _ = make_service("Другая служба")
+        old_url = f"/api/services/{self.service.pk}/statistics/"
+        new_url = f"/api/services/{other.pk}/statistics/"
+        self.get(old_url)
+        self.get(new_url)
+
+        department = self.service.departments.first()
+        department.service = other
+        department.save()
+
+        self.assertEqual(self.get(old_url).json()["employee_count"], 8)
+        self.assertEqual(self.get(new_url).json()["employee_count"], 24)
+
+    def test_employee_rename(self):
+        url = f"/api/teams/{self.teams[0].pk}/employees/"
+        self.get(url)
+        employee = self.teams[0].members.first()
+        employee.full_name = "Переименован"
+        employee.save()
+        names = [row["full_name"] for row in self.get(url).json()]
+        self.assertIn("Переименован", names)
+
+
+class ConditionalGetTests(OrgTreeMixin, TestCase):
+    def assertNotModified(self, url):
+        etag = self.client.get(url)["ETag"]
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b"")
+        return etag
+
+    def test_not_modified(self):
+        for url in [
+            "/api/services/",
+            f"/api/services/{self.service.pk}/",
+            f"/api/divisions/{self.teams[0].division_id}/employees/",
+            f"/api/teams/{self.teams[0].pk}/statistics/",
+            "/api/employees/",
+            "/api/statistics/",
+        ]:
+            with self.subTest(url=url):
+                self.assertNotModified(url)
+
+    def test_subtree_change_updates_etag(self):
+        url = f"/api/services/{self.service.pk}/employees/"
+        etag = self.assertNotModified(url)
+
+        employee = self.teams[-1].members.first()
+        employee.position = "Руководитель"
+        employee.save()
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_team_rename_updates_employee_etag(self):
+        employee = self.teams[0].members.first()
+        url = f"/api/employees/{employee.pk}/"
+        etag = self.assertNotModified(url)
+
+        self.teams[0].name = "Новое имя"
+        self.teams[0].save()
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["team"], "Новое имя")
+
+
+class EmployeePaginationTests(TestCase):
+    def setUp(self):
+        # Много совпадающих дат, чтобы страницы резались внутри групп ключа
+        for i in range(23):
+            make_employee(
+                f"Сотрудник {i}",
+                date_of_birth=date(1990, 1, 1 + i % 3),
+                start_date=date(2020, 1, 1 + i % 2),
+            )
+        self.expected = list(
+            Employee.objects.order_by("date_of_birth", "start_date", "id")
+            .values_list("id", flat=True)
+        )
+
+    def walk(self, url, direction):
+        ids = []
+        while url:
+            data = self.client.get(url).json()
+            page = [row["id"] for row in data["results"]]
+            ids = ids + page if direction == "next" else page + ids
+            url = data[direction]
+        return ids
+
+    def test_forward_and_backward(self):
+        self.assertEqual(self.walk("/api/employees/?page_size=5", "next"), self.expected)
+
+        last = "/api/employees/?page_size=5"
+        while True:
+            data = self.client.get(last).json()
+            if not data["next"]:
+                break
+            last = data["next"]
+        self.assertEqual(self.walk(last, "previous"), self.expected)
+
+    def test_unpaginated_by_default(self):
+        self.assertEqual(len(self.client.get("/api/employees/").json()), 23)
+
+    def test_invalid_cursor(self):
+        response = self.client.get("/api/employees/", {"cursor": "bad"})
+        self.assertEqual(response.status_code, 404)
+
+    def test_stream(self):
+        response = self.client.get("/api/employees/", {"stream": "ndjson"})
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 23)
+
+        response = self.client.get("/api/employees/", {"stream": "json"})
+        streamed = json.loads(b"".join(response.streaming_content))
+        self.assertEqual(streamed, self.client.get("/api/employees/").json())
+
+
+class EmployeeSearchTests(TestCase):
+    def setUp(self):
+        make_employee("Иванов Иван Иванович")
+        make_employee("Петрова Анна Сергеевна")
+        make_employee("Семёнов Пётр Алексеевич")
+        make_employee("Ivanova Maria")
+
+    def search(self, term, **params):
+        response = self.client.get("/api/employees/", {"search": term, **params})
+        return [row["full_name"] for row in response.json()]
+
+    def test_prefix_and_case_folding(self):
+        self.assertEqual(self.search("ИВАН"), ["Иванов Иван Иванович"])
+        self.assertEqual(self.search("петр анн"), ["Петрова Анна Сергеевна"])
+        self.assertEqual(self.search("ivan"), ["Ivanova Maria"])
+
+    def test_yo_folding(self):
+        self.assertEqual(self.search("семенов"), ["Семёнов Пётр Алексеевич"])
+        self.assertEqual(self.search("семёнов пётр"), ["Семёнов Пётр Алексеевич"])
+
+    def test_index_follows_updates(self):
+        employee = Employee.objects.get(full_name="Ivanova Maria")
+        employee.full_name = "Сидорова Мария"
+        employee.save()
+        self.assertEqual(self.search("сидор"), ["Сидорова Мария"])
+        Employee.objects.filter(pk=employee.pk).delete()
+        self.assertEqual(self.search("сидор"), [])
+
+    def test_ranked_by_relevance(self):
+        make_employee("Сидоров Иван Петрович", date_of_birth=date(1980, 1, 1))
+        self.assertEqual(
+            self.search("иван"), ["Иванов Иван Иванович", "Сидоров Иван Петрович"]
+        )
+        # Явная сортировка клиента важнее релевантности
+        self.assertEqual(
+            self.search("иван", ordering="date_of_birth"),
+            ["Сидоров Иван Петрович", "Иванов Иван Иванович"],
+        )
+
+    def test_quotes_are_escaped(self):
+        self.assertEqual(self.search('"иван'), ["Иванов Иван Иванович"])
+
+    def test_index_triggers_present(self):
+        # Падает, если миграция пересоздала таблицу сотрудников без триггеров
+        self.assertEqual(search.check(), {"missing_triggers": [], "stale": 0})
+
+    def test_check_and_rebuild_index(self):
+        with connection.cursor() as cursor:
+            cursor.execute("DROP TRIGGER divisions_employee_fts_update")
+        Employee.objects.filter(full_name="Ivanova Maria").update(
+            full_name="Сидорова Мария"
+        )
+        self.assertEqual(
+            search.check(),
+            {"missing_triggers": ["divisions_employee_fts_update"], "stale": 1},
+        )
+        with self.assertRaises(CommandError):
+            call_command("rebuild_org_index", "--check", stderr=io.StringIO())
+
+        call_command("rebuild_org_index", stdout=io.StringIO())
+        self.assertEqual(search.check(), {"missing_triggers": [], "stale": 0})
+        self.assertEqual(self.search("сидор"), ["Сидорова Мария"])
+
+    def test_migrate_fails_without_triggers(self):
+        app_config = apps.get_app_config("divisions")
+        signal = {"app_config": app_config, "using": "default", "verbosity": 0}
+        post_migrate.send(sender=app_config, **signal)
+        with connection.cursor() as cursor:
+            cursor.execute("DROP TRIGGER divisions_employee_fts_insert")
+        with self.assertRaisesMessage(CommandError, "divisions_employee_fts_insert"):
+            post_migrate.send(sender=app_config, **signal)
+
+
+class BulkImportExportTests(TestCase):
+    def setUp(self):
+        cache.get_cache().clear()
+        self.service, self.teams = make_service(width=1)
+
+    def post(self, body, content_type):
+        return self.client.post(
+            "/api/employees/import/", body.encode(), content_type=content_type
+        )
+
+    def test_csv_import_with_errors(self):
+        team = self.teams[0]
+        body = (
+            "full_name,position,date_of_birth,start_date,teams\n"
+            f"Новиков Олег,Инженер,1990-05-01,2020-01-01,{team.pk}\n"
+            "Без даты,Инженер,,2020-01-01,\n"
+            "Орлов Роман,Аналитик,1991-02-03,2021-01-01,999\n"
+        )
+        url = f"/api/teams/{team.pk}/employees/"
+        self.client.get(url)
+
+        report = self.post(body, "text/csv").json()
+
+        self.assertEqual(report["created"], 1)
+        self.assertEqual([error["row"] for error in report["errors"]], [3, 4])
+        self.assertIn("date_of_birth", report["errors"][0]["errors"])
+        self.assertIn("teams", report["errors"][1]["errors"])
+        names = [row["full_name"] for row in self.client.get(url).json()]
+        self.assertIn("Новиков Олег", names)
+
+    def test_ndjson_import(self):
+        rows = [
+            json.dumps(
+                {
+                    "full_name": f"Сотрудник {i}",
+                    "position": "Инженер",
+                    "date_of_birth": "1990-01-01",
+                    "start_date": "2020-01-01",
+                    "teams": [self.teams[0].pk],
+                }
+            )
+            for i in range(5)
+        ]
+        report = self.post("\n".join(rows + ["{bad"]), "application/x-ndjson").json()
+        self.assertEqual(report["created"], 5)
+        self.assertEqual(report["errors"][0]["row"], 6)
+        self.assertEqual(self.teams[0].members.count(), 6)
+
+    def test_export_round_trip(self):
+        for fmt in ("csv", "ndjson"):
+            response = self.client.get("/api/employees/export/", {"stream": fmt})
+            body = b"".join(response.streaming_content)
+            rows = bulk.PARSERS[fmt](body.splitlines(keepends=True))
+            exported = [data for _, data in rows]
+            self.assertEqual(len(exported), 1)
+            self.assertEqual(
+                [int(team) for team in exported[0]["teams"]], [self.teams[0].pk]
+            )
+
+
+class TeamMembershipTests(TestCase):
+    def setUp(self):
+        cache.get_cache().clear()
+        self.service, self.teams = make_service(width=2)
+        self.source, self.target = self.teams[:2]
+        self.newcomers = [make_employee(f"Новый {i}") for i in range(3)]
+
+    def post(self, team, action, data):
+        return self.client.post(
+            f"/api/teams/{team.pk}/{action}/", data, content_type="application/json"
+        )
+
+    def member_ids(self, team):
+        return set(team.members.values_list("pk", flat=True))
+
+    def test_add_and_remove_members(self):
+        ids = [employee.pk for employee in self.newcomers]
+        url = f"/api/teams/{self.target.pk}/employees/"
+        self.client.get(url)
+
+        response = self.post(self.target, "add-members", {"member_ids": ids})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(set(ids) <= self.member_ids(self.target))
+        self.assertEqual(len(self.client.get(url).json()), 5)
+
+        response = self.post(self.target, "remove-members", {"member_ids": ids})
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(set(ids) & self.member_ids(self.target))
+
+    def test_missing_members_rejected(self):
+        before = self.member_ids(self.target)
+        response = self.post(
+            self.target, "add-members", {"member_ids": [self.newcomers[0].pk, 999]}
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("999", str(response.json()["member_ids"]))
+        self.assertEqual(self.member_ids(self.target), before)
+
+    def test_move_members(self):
+        moved = sorted(self.member_ids(self.source))
+        response = self.post(
+            self.source,
+            "move-members",
+            {"member_ids": moved, "to_team": self.target.pk},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.member_ids(self.source), set())
+        self.assertTrue(set(moved) <= self.member_ids(self.target))
+
+    def test_move_is_atomic(self):
+        before = self.member_ids(self.source)
+        ids = sorted(before) + [self.newcomers[0].pk]
+        response = self.post(
+            self.source, "move-members", {"member_ids": ids, "to_team": self.target.pk}
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.member_ids(self.source), before)
+        self.assertNotIn(self.newcomers[0].pk, self.member_ids(self.target))
+
+    def test_add_member_errors(self):
+        url = f"/api/teams/{self.target.pk}/add-member/"
+        missing = self.client.patch(
+            url, {"member_id": 999}, content_type="application/json"
+        )
+        self.assertEqual(missing.status_code, 404)
+        invalid = self.client.patch(url, {}, content_type="application/json")
+        self.assertEqual(invalid.status_code, 400)
+
+
+class NestedMembersWriteTests(OrgTreeMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.team, self.other = self.teams[:2]
+
+    def put(self, members, team=None):
+        team = team or self.team
+        return self.client.put(
+            f"/api/teams/{team.pk}/",
+            {"name": team.name, "division": team.division_id, "members": members},
+            content_type="application/json",
+        )
+
+    def row(self, employee, **changes):
+        data = {
+            "id": employee.pk,
+            "full_name": employee.full_name,
+            "position": employee.position,
+            "date_of_birth": str(employee.date_of_birth),
+            "start_date": str(employee.start_date),
+        }
+        return {**data, **changes}
+
+    def new_rows(self, count):
+        return [
+            {
+                "full_name": f"Новый {i}",
+                "position": "Инженер",
+                "date_of_birth": "1995-05-05",
+                "start_date": "2022-02-02",
+            }
+            for i in range(count)
+        ]
+
+    def test_put_creates_updates_and_removes(self):
+        kept, dropped = self.team.members.order_by("pk")
+        moved = self.other.members.first()
+        response = self.put(
+            [
+                self.row(kept, full_name="Переименован", start_date="2010-01-01"),
+                self.row(moved),
+            ]
+            + self.new_rows(1)
+        )
+        self.assertEqual(response.status_code, 200)
+        members = response.json()["members"]
+        self.assertEqual(len(members), 3)
+        self.assertEqual(
+            {row["full_name"] for row in members},
+            {"Переименован", moved.full_name, "Новый 0"},
+        )
+        self.assertEqual(
+            set(self.team.members.values_list("pk", flat=True)),
+            {kept.pk, moved.pk, members[-1]["id"]},
+        )
+        # Исключённый из группы сотрудник не удаляется
+        self.assertTrue(Employee.objects.filter(pk=dropped.pk).exists())
+        self.assertEqual(moved.team_members.count(), 2)
+        self.assertEqual(totals.check(), [])
+        self.assertEqual(primary_team.check(), [])
+
+    def test_patch_without_members_keeps_them(self):
+        before = set(self.team.members.values_list("pk", flat=True))
+        response = self.client.patch(
+            f"/api/teams/{self.team.pk}/",
+            {"name": "Другое имя"},
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(self.team.members.values_list("pk", flat=True)), before)
+
+    def test_unknown_id_creates_employee(self):
+        response = self.put([{**self.new_rows(1)[0], "id": 999999}])
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.json()["members"][0]["id"], 999999)
+
+    def test_large_member_list_queries(self):
+        existing = Employee.objects.bulk_create(
+            Employee(
+                full_name=f"Сотрудник {i}",
+                position="Аналитик",
+                date_of_birth=date(1990, 1, 1),
+                start_date=date(2020, 1, 1),
+            )
+            for i in range(500)
+        )
+        self.team.members.add(*existing[:250])
+        members = [
+            self.row(employee, position="Инженер" if i % 2 else "Аналитик")
+            for i, employee in enumerate(existing[100:])
+        ] + self.new_rows(500)
+        # По сотруднику вложенным сериализатором было около 2500 запросов;
+        # пакетная запись растёт только с числом порций bulk_create/update
+        with CaptureQueriesContext(connection) as queries:
+            response = self.put(members)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()["members"]), 900)
+        self.assertLess(len(queries.captured_queries), 80)
+        self.assertEqual(self.team.members.count(), 900)
+        self.assertEqual(totals.check(), [])
+        self.assertEqual(primary_team.check(), [])
+
+
+def make_photo(name="photo.png", color="red", side=800):
+    buffer = io.BytesIO()
+    Image.new("RGB", (side, side), color).save(buffer, "PNG")
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type="image/png")
+
+
+class ThumbnailTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        self.root = os.path.join(media_root, "thumbnails")
+        settings = override_settings(
+            MEDIA_ROOT=media_root, DIVISIONS_THUMBNAIL_ROOT=self.root
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+        thumbnails._usage = None
+
+    def upload(self, **kwargs):
+        data = {
+            "full_name": "Иванов Иван",
+            "position": "Аналитик",
+            "date_of_birth": "1990-01-01",
+            "start_date": "2020-01-01",
+            "photo": make_photo(**kwargs),
+        }
+        return self.client.post("/api/employees/", data).json()
+
+    def test_thumbnail_urls_and_headers(self):
+        employee = self.upload()
+        self.assertEqual(set(employee["thumbnails"]), set(thumbnails.get_sizes()))
+
+        response = self.client.get(employee["thumbnails"]["small"])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Cache-Control"], thumbnails.CACHE_CONTROL)
+        body = b"".join(response.streaming_content)
+        with Image.open(io.BytesIO(body)) as image:
+            self.assertEqual(image.size, (64, 64))
+
+        self.assertEqual(
+            self.client.get(employee["thumbnails"]["small"].replace("small", "huge"))
+            .status_code,
+            404,
+        )
+
+    def test_hash_follows_photo_content(self):
+        first = self.upload(color="red")
+        same = self.upload(color="red")
+        other = self.upload(color="blue")
+        self.assertEqual(first["thumbnails"], same["thumbnails"])
+        self.assertNotEqual(first["thumbnails"], other["thumbnails"])
+
+        employee = Employee.objects.get(pk=first["id"])
+        employee.photo = None
+        employee.save()
+        self.assertIsNone(employee.photo_hash)
+        response = self.client.get(f"/api/employees/{employee.pk}/")
+        self.assertIsNone(response.json()["thumbnails"])
+
+    def test_eviction(self):
+        employee = self.upload()
+        for url in employee["thumbnails"].values():
+            self.client.get(url)
+        files = thumbnails._scan()
+        self.assertEqual(len(files), len(thumbnails.get_sizes()))
+
+        largest = max(size for _, size, _ in files)
+        self.assertGreater(thumbnails.evict(max_bytes=largest), 0)
+        self.assertLessEqual(sum(size for _, size, _ in thumbnails._scan()), largest)
+
+    def test_failed_generation(self):
+        employee = Employee.objects.get(pk=self.upload()["id"])
+        # Дожидаемся заранее запущенной генерации и удаляем её результат
+        for size in thumbnails.get_sizes():
+            thumbnails.get_thumbnail(employee, size)
+        shutil.rmtree(self.root)
+
+        def save(image, path, *args, **kwargs):
+            with open(path, "wb") as file:
+                file.write(b"RIFF")
+            raise OSError("нет места на диске")
+
+        # Ошибка посреди записи не оставляет временный файл
+        with mock.patch.object(Image.Image, "save", save):
+            with self.assertLogs("divisions.thumbnails", "ERROR"):
+                self.assertIsNone(thumbnails.get_thumbnail(employee, "small"))
+        self.assertEqual(
+            [name for _, _, names in os.walk(self.root) for name in names], []
+        )
+
+        # Некорректный оригинал даёт перенаправление на него, а не ошибку 500
+        with employee.photo.open("wb") as photo:
+            photo.write(b"not an image")
+        with self.assertLogs("divisions.thumbnails", "ERROR"):
+            response = self.client.get(
+                thumbnails.thumbnail_urls(employee.photo_hash)["small"]
+            )
+        self.assertEqual(response.status_code, 302)
+
+
+@override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"}}
+)
+class FastRowsTests(OrgTreeMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.teams[-1].members.add(self.teams[0].members.first())
+        Employee.objects.filter(pk=self.teams[0].members.first().pk).update(
+            photo="employee_photos/фото 1.png", photo_hash="ab" * 16
+        )
+        make_employee("Без группы")
+
+    def get_both(self, path, **kwargs):
+        # Кэш ответов сбрасывается, чтобы оба ответа строились заново
+        responses = []
+        for fast_rows in (False, True):
+            cache.get_cache().clear()
+            with override_settings(DIVISIONS_FAST_ROWS=fast_rows):
+                response = self.client.get(path, **kwargs)
+            self.assertNotEqual(response.get("X-Cache"), "HIT")
+            responses.append(response)
+        return responses
+
+    def test_byte_identical_to_serializer(self):
+        for path in [
+            "/api/employees/",
+            "/api/employees/?ordering=-start_date",
+            "/api/employees/?page_size=3",
+            "/api/employees/?stream=ndjson",
+            "/api/employees/?stream=json&search=сотрудник",
+            f"/api/services/{self.service.pk}/employees/",
+            f"/api/services/{self.service.pk}/employees/?with_teams=1",
+            f"/api/teams/{self.teams[0].pk}/employees/?page_size=2",
+            f"/api/async/services/{self.service.pk}/employees/?with_teams=1",
+        ]:
+            with self.subTest(path=path):
+                expected, actual = self.get_both(path)
+                self.assertEqual(actual.status_code, 200)
+                self.assertEqual(actual.getvalue(), expected.getvalue())
+
+        first = self.get_both("/api/employees/?page_size=3")[1].json()
+        expected, actual = self.get_both(first["next"])
+        self.assertEqual(actual.content, expected.content)
+
+    def test_renderer_matches_json_renderer(self):
+        data = {
+            "text": "строка\u2028с разделителем",
+            "updated_at": datetime(2026, 1, 2, 3, 4, 5, 678901, tzinfo=timezone.utc),
+            "born": date(1990, 1, 1),
+            "values": (1, 2.5, None, True),
+            "big": 2**70,
+        }
+        expected = JSONRenderer().render(data)
+        self.assertEqual(FastJSONRenderer().render(data), expected)
+        with mock.patch.object(renderers, "orjson", None):
+            self.assertEqual(FastJSONRenderer().render(data), expected)
+
+
+class AsyncReadTests(OrgTreeMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        cache.get_cache().clear()
+        # Сотрудник в двух группах и группа без сотрудников
+        self.teams[-1].members.add(self.teams[0].members.first())
+        Team.objects.create(division=self.teams[0].division, name="Пустая")
+
+    def assertSameAsSync(self, path):
+        expected = self.client.get(f"/api/{path}", HTTP_ACCEPT="application/json")
+        actual = self.client.get(f"/api/async/{path}")
+        self.assertEqual(actual.status_code, expected.status_code)
+        # Тот же рендерер, что и у синхронного API: совпадают и байты
+        self.assertEqual(actual.content, expected.content)
+
+    def test_matches_sync_api(self):
+        division = self.teams[0].division
+        paths = ["statistics/"]
+        for kind, pk in [
+            ("services", self.service.pk),
+            ("departments", division.department_id),
+            ("divisions", division.pk),
+            ("teams", self.teams[0].pk),
+        ]:
+            paths += [
+                f"{kind}/",
+                f"{kind}/{pk}/",
+                f"{kind}/{pk}/employees/",
+                f"{kind}/{pk}/statistics/",
+            ]
+        for path in paths:
+            with self.subTest(path=path):
+                self.assertSameAsSync(path)
+
+    def test_fast_rows_and_renderer(self):
+        path = f"services/{self.service.pk}/employees/?with_teams=1"
+        with override_settings(DIVISIONS_FAST_ROWS=True):
+            with mock.patch.object(
+                FastJSONRenderer, "render", autospec=True, wraps=FastJSONRenderer.render
+            ) as render:
+                self.assertSameAsSync(path)
+        self.assertEqual(render.call_count, 2)
+
+    def test_not_found(self):
+        self.assertEqual(self.client.get("/api/async/teams/999/").status_code, 404)
+        self.assertEqual(self.client.get("/api/async/unknown/").status_code, 404)
+
+    async def test_async_client(self):
+        response = await self.async_client.get(f"/api/async/services/{self.service.pk}/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()["departments"]), 2)
+
+
+class ReadReplicaRouterTests(SimpleTestCase):
+    def setUp(self):
+        patcher = mock.patch.dict(connections.databases, {"replica": {}})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.router = ReadReplicaRouter()
+
+    def test_only_safe_requests_read_replica(self):
+        self.assertEqual(self.router.db_for_read(Team), "default")
+        token = replica_reads.set(True)
+        self.addCleanup(replica_reads.reset, token)
+        self.assertEqual(self.router.db_for_read(Team), "replica")
+        self.assertEqual(self.router.db_for_write(Team), "default")
+        self.assertFalse(self.router.allow_migrate("replica", "divisions"))
+
+    def test_jobs_read_primary(self):
+        token = replica_reads.set(True)
+        self.addCleanup(replica_reads.reset, token)
+        self.assertEqual(self.router.db_for_read(Job), "default")
+
+    def test_middleware_marks_safe_methods(self):
+        seen = []
+        middleware = ReplicaReadsMiddleware(
+            lambda request: seen.append(replica_reads.get())
+        )
+        for method in ("GET", "POST"):
+            middleware(RequestFactory().generic(method, "/"))
+        self.assertEqual(seen, [True, False])
+        self.assertFalse(replica_reads.get())
+
+
+class InstrumentationTests(OrgTreeMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        cache.get_cache().clear()
+        instrumentation.store.clear()
+
+    def test_server_timing_and_metrics(self):
+        response = self.client.get(f"/api/services/{self.service.pk}/statistics/")
+        timing = response["Server-Timing"]
+        self.assertIn("db;dur=", timing)
+        self.assertIn("serialize;dur=", timing)
+        self.assertIn("total;dur=", timing)
+
+        self.client.get("/api/async/statistics/")
+        metrics = self.client.get("/api/metrics/").json()
+        stats = metrics["ServiceViewSet.statistics"]
+        self.assertEqual(stats["count"], 1)
+        self.assertGreater(stats["queries"]["max"], 0)
+        self.assertEqual(sum(stats["histogram"].values()), 1)
+        self.assertIn("async-org-statistics", metrics)
+
+    def test_duplicate_queries_logged(self):
+        with override_settings(DIVISIONS_QUERY_LOG_THRESHOLD=0), self.assertLogs(
+            "divisions.instrumentation", "WARNING"
+        ) as logs:
+            self.client.get("/api/teams/", HTTP_ACCEPT="application/json")
+        self.assertIn("TeamViewSet.list", logs.output[0])
+
+    def test_no_fingerprints_without_threshold(self):
+        with mock.patch.object(instrumentation, "fingerprint") as fingerprint:
+            self.client.get("/api/teams/", HTTP_ACCEPT="application/json")
+        fingerprint.assert_not_called()
+
+    def test_fingerprint(self):
+        self.assertEqual(
+            instrumentation.fingerprint('SELECT 1 FROM "t" WHERE "id" IN (%s, %s, %s)'),
+            'SELECT N FROM "t" WHERE "id" IN (...)',
+        )
+
+    def test_p95_nearest_rank(self):
+        from benchmarks.common import summarize
+
+        for count in (1, 2, 5, 20, 21):
+            with self.subTest(count=count):
+                durations = list(range(1, count + 1))
+                p95 = instrumentation._percentile(durations, 0.95)
+                # Ранг — округлённые вверх 95 % от числа замеров
+                self.assertEqual(p95, -(-count * 19 // 20))
+                self.assertEqual(summarize(durations)["p95_ms"], p95)
+                self.assertGreaterEqual(p95, summarize(durations)["p50_ms"])
@@ -0,0 +1,275 @@
+"""
+Миниатюры фотографий сотрудников.
+
+Миниатюры нескольких фиксированных размеров (DIVISIONS_THUMBNAIL_SIZES)
+строятся в пуле потоков: заранее — после сохранения новой фотографии,
+и лениво — при первом запросе отсутствующей миниатюры. Имя файла содержит
+хэш содержимого оригинала (Employee.photo_hash), поэтому миниатюры отдаются
+с долгоживущими заголовками кэширования: у новой фотографии новый адрес.
+
+Общий размер каталога миниатюр ограничен DIVISIONS_THUMBNAIL_MAX_BYTES;
+при превышении удаляются файлы, которые дольше всего не запрашивались
+(время изменения файла обновляется при каждой выдаче).
+"""
+
+import hashlib
+import logging
+import os
+import threading
+from concurrent import futures
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.urls import reverse
+from PIL import Image, ImageOps
+
+FORMAT = "WEBP"
+EXTENSION = "webp"
+CONTENT_TYPE = "image/webp"
+CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+# После вытеснения каталог занимает не больше этой доли предела,
+# чтобы не запускать очистку после каждой новой миниатюры
+EVICT_TO = 0.9
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_pending = {}
+_lock = threading.Lock()
+_usage = None
+
+
+def get_sizes():
+    return settings.DIVISIONS_THUMBNAIL_SIZES
+
+
+def get_root():
+    return settings.DIVISIONS_THUMBNAIL_ROOT
+
+
+def _get_executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, "DIVISIONS_THUMBNAIL_WORKERS", 2),
+                thread_name_prefix="thumbnails",
+            )
+        return _executor
+
+
+def content_hash(file, chunk_size=64 * 1024):
+    """
+    Возвращает хэш содержимого файла, читая его порциями.
+    """
+    digest = hashlib.sha256()
+    file.seek(0)
+    for chunk in file.chunks(chunk_size):
+        digest.update(chunk)
+    file.seek(0)
+    return digest.hexdigest()[:32]
+
+
+def update_photo_hash(employee):
+    """
+    Пересчитывает employee.photo_hash перед сохранением, если фотография
+    загружена заново, заменена другим файлом или удалена.
+    """
+    photo = employee.photo
+    if not photo:
+        employee.photo_hash = None
+        return
+    if photo._committed and employee.photo_hash:
+        stored = (
+            type(employee)
+            .objects.filter(pk=employee.pk)
+            .values_list("photo", flat=True)
+            .first()
+        )
+        if stored == photo.name:
+            return
+    try:
+        employee.photo_hash = content_hash(photo)
+    except OSError:
+        employee.photo_hash = None
+    finally:
+        if photo._committed:
+            photo.close()
+
+
+def thumbnail_name(photo_hash, size):
+    return f"{photo_hash[:2]}/{photo_hash}-{size}.{EXTENSION}"
+
+
+def thumbnail_path(photo_hash, size):
+    return os.path.join(get_root(), thumbnail_name(photo_hash, size))
+
+
+def thumbnail_urls(photo_hash, request=None):
+    """
+    Возвращает адреса миниатюр {размер: URL} либо None, если фотографии нет.
+    """
+    if not photo_hash:
+        return None
+    urls = {}
+    for size in get_sizes():
+        url = reverse("employee-thumbnail", args=[photo_hash, size])
+        urls[size] = request.build_absolute_uri(url) if request else url
+    return urls
+
+
+def _generate(storage, name, photo_hash, size):
+    path = thumbnail_path(photo_hash, size)
+    if os.path.exists(path):
+        return path
+
+    side = get_sizes()[size]
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{threading.get_ident()}.tmp"
+    # Запись через временный файл: параллельный запрос не увидит
+    # недописанную миниатюру. _scan не учитывает временные файлы,
+    # поэтому при ошибке файл удаляется сразу
+    try:
+        with storage.open(name) as source, Image.open(source) as image:
+            image = ImageOps.exif_transpose(image)
+            image.thumbnail((side, side))
+            if image.mode not in ("RGB", "RGBA"):
+                image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+            image.save(tmp_path, FORMAT)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
+    _account(os.path.getsize(path))
+    return path
+
+
+def schedule(storage, name, photo_hash, size):
+    """
+    Ставит генерацию миниатюры в пул потоков. Повторный запрос той же
+    миниатюры до окончания генерации получает ту же задачу (Future).
+    """
+    executor = _get_executor()
+    key = (photo_hash, size)
+    with _lock:
+        future = _pending.get(key)
+        created = future is None
+        if created:
+            future = _pending[key] = executor.submit(
+                _generate, storage, name, photo_hash, size
+            )
+    if created:
+        future.add_done_callback(lambda done: _forget(key, done))
+    return future
+
+
+def _forget(key, future):
+    with _lock:
+        if _pending.get(key) is future:
+            del _pending[key]
+
+
+def schedule_all(employee):
+    """
+    Заранее строит все размеры миниатюр фотографии сотрудника.
+    """
+    if employee.photo and employee.photo_hash:
+        for size in get_sizes():
+            schedule(
+                employee.photo.storage, employee.photo.name, employee.photo_hash, size
+            )
+
+
+def get_thumbnail(employee, size, timeout=None):
+    """
+    Возвращает путь к готовой миниатюре, при необходимости дожидаясь
+    генерации не дольше timeout секунд. Если миниатюра не успела
+    построиться или оригинал не читается (ошибка пишется в лог),
+    возвращает None.
+    """
+    path = thumbnail_path(employee.photo_hash, size)
+    if os.path.exists(path):
+        return path
+    if timeout is None:
+        timeout = getattr(settings, "DIVISIONS_THUMBNAIL_WAIT", 5)
+    future = schedule(
+        employee.photo.storage, employee.photo.name, employee.photo_hash, size
+    )
+    try:
+        return future.result(timeout)
+    except futures.TimeoutError:
+        # До Python 3.11 это не встроенный TimeoutError
+        return None
+    except Exception:
+        logger.exception(
+            "Не удалось построить миниатюру %s размера %s", employee.photo.name, size
+        )
+        return None
+
+
+def touch(path):
+    """
+    Отмечает выдачу миниатюры для вытеснения давно не запрашиваемых.
+    """
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+
+
+def _scan():
+    files = []
+    for directory, _, names in os.walk(get_root()):
+        for name in names:
+            if name.endswith(".tmp"):
+                continue
+            path = os.path.join(directory, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+    return files
+
+
+def _account(nbytes):
+    global _usage
+    with _lock:
+        if _usage is None:
+            _usage = sum(size for _, size, _ in _scan())
+        else:
+            _usage += nbytes
+        over = _usage > settings.DIVISIONS_THUMBNAIL_MAX_BYTES
+    if over:
+        evict()
+
+
+def evict(max_bytes=None):
+    """
+    Удаляет давно не запрашивавшиеся миниатюры, пока каталог превышает
+    предел. Возвращает количество удалённых файлов.
+    """
+    global _usage
+    if max_bytes is None:
+        max_bytes = settings.DIVISIONS_THUMBNAIL_MAX_BYTES
+    files = sorted(_scan())
+    total = sum(size for _, size, _ in files)
+    removed = 0
+    if total > max_bytes:
+        target = max_bytes * EVICT_TO
+        for _, size, path in files:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+    with _lock:
+        _usage = total
+    return removed
@@ -0,0 +1,287 @@
+"""
+Поддержка нарастающих сумм по узлам оргструктуры (RunningTotalsModel).
+
+У каждой группы, отдела, управления и службы хранятся число различных
+сотрудников поддерева и суммы их годов рождения и начала работы,
+а в AnniversaryCount — сколько из них отмечают годовщину каждой из дат
+в каждый день года. Сотрудник из нескольких групп узла учитывается в нём
+один раз. Средний возраст и стаж в полных годах на любую дату вычисляются
+из сумм и числа ещё не наступивших годовщин (см. statistics.totals_statistics).
+
+Изменение переносится в суммы по «снимкам» затронутых сотрудников:
+до изменения запоминаются узлы, в которых учтён каждый из них, и его даты
+(snapshot), после — снимок берётся снова, и разница прибавляется к узлам
+через UPDATE ... SET поле = поле + разница (apply), счётчики годовщин —
+чтением затронутых строк и пакетной записью. Стоимость обновления
+зависит от числа членств затронутых сотрудников, а не от размера службы.
+"""
+
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import F, QuerySet
+
+from .models import (
+    TOTALS_FIELDS,
+    AnniversaryCount,
+    Department,
+    Division,
+    Employee,
+    Service,
+    Team,
+)
+
+ZERO = (0,) * len(TOTALS_FIELDS)
+LEVELS = [Team, Division, Department, Service]
+LEVEL_MODELS = {model._meta.model_name: model for model in LEVELS}
+# Предки группы по внешним ключам (индекс предков при сохранении может
+# быть ещё не синхронизирован)
+CHAIN_FIELDS = [
+    "team__division_id",
+    "team__division__department_id",
+    "team__division__department__service_id",
+]
+CHUNK_SIZE = 500
+
+Membership = Team.members.through
+
+
+def _snapshot_rows(memberships, nodes, dates):
+    for employee_id, *chain, born, started in memberships.values_list(
+        "employee_id",
+        "team_id",
+        *CHAIN_FIELDS,
+        "employee__date_of_birth",
+        "employee__start_date",
+    ).iterator(chunk_size=10000):
+        nodes[employee_id].update(zip(LEVELS, chain))
+        dates[employee_id] = (born, started)
+
+
+def snapshot(employee_ids=None):
+    """
+    Возвращает узлы, в которых учтён каждый из сотрудников employee_ids
+    (по умолчанию — все сотрудники), и его даты:
+    {employee_id: (frozenset((модель, id)), date_of_birth, start_date)}.
+    Сотрудники без групп не включаются.
+    """
+    nodes, dates = defaultdict(set), {}
+    if employee_ids is None:
+        _snapshot_rows(Membership.objects.all(), nodes, dates)
+    else:
+        employee_ids = list(employee_ids)
+        for start in range(0, len(employee_ids), CHUNK_SIZE):
+            chunk = employee_ids[start : start + CHUNK_SIZE]
+            _snapshot_rows(
+                Membership.objects.filter(employee_id__in=chunk), nodes, dates
+            )
+    return {
+        employee_id: (frozenset(employee_nodes), *dates[employee_id])
+        for employee_id, employee_nodes in nodes.items()
+    }
+
+
+def month_day(value):
+    """
+    День годовщины даты value: месяц * 100 + день.
+    """
+    return value.month * 100 + value.day
+
+
+def _add(deltas, key, delta):
+    deltas[key] = tuple(a + b for a, b in zip(deltas.get(key, ZERO), delta))
+
+
+def _contributions(states, sign=1):
+    """
+    Складывает вклады сотрудников из снимка states в суммы узлов
+    {(модель, id): суммы} и в счётчики годовщин
+    {(модель, id, поле, день годовщины): число}, умноженные на sign.
+    """
+    deltas, anniversaries = {}, defaultdict(int)
+    for employee_nodes, born, started in states:
+        contribution = (sign, sign * born.year, sign * started.year)
+        days = [
+            (AnniversaryCount.BIRTH, month_day(born)),
+            (AnniversaryCount.START, month_day(started)),
+        ]
+        for node in employee_nodes:
+            _add(deltas, node, contribution)
+            for field, day in days:
+                anniversaries[(*node, field, day)] += sign
+    return deltas, anniversaries
+
+
+def _apply_deltas(deltas):
+    """
+    Прибавляет разницы {(модель, id): delta} к сохранённым суммам.
+    Узлы одной модели с одинаковой разницей обновляются одним запросом.
+    """
+    grouped = defaultdict(list)
+    for (model, pk), delta in deltas.items():
+        if pk is not None and any(delta):
+            grouped[model, delta].append(pk)
+    for (model, delta), pks in grouped.items():
+        model.objects.filter(pk__in=pks).update(
+            **{field: F(field) + value for field, value in zip(TOTALS_FIELDS, delta)}
+        )
+
+
+def _apply_anniversaries(changes):
+    """
+    Прибавляет разницы {(модель, id, поле, день): delta} к счётчикам
+    годовщин: затронутые строки читаются одним запросом на модель узла,
+    недостающие вставляются, обнулённые удаляются.
+    """
+    grouped = defaultdict(dict)
+    for (model, pk, field, day), delta in changes.items():
+        if pk is not None and delta:
+            grouped[model._meta.model_name][pk, field, day] = delta
+    for node_type, deltas in grouped.items():
+        rows = AnniversaryCount.objects.filter(
+            node_type=node_type,
+            node_id__in={pk for pk, _, _ in deltas},
+            month_day__in={day for _, _, day in deltas},
+        )
+        existing = {(row.node_id, row.field, row.month_day): row for row in rows}
+        created, updated, deleted = [], [], []
+        for (pk, field, day), delta in deltas.items():
+            row = existing.get((pk, field, day))
+            if row is None:
+                if delta > 0:
+                    created.append(
+                        AnniversaryCount(
+                            node_type=node_type,
+                            node_id=pk,
+                            field=field,
+                            month_day=day,
+                            count=delta,
+                        )
+                    )
+                continue
+            row.count += delta
+            if row.count > 0:
+                updated.append(row)
+            else:
+                deleted.append(row.pk)
+        AnniversaryCount.objects.bulk_create(created)
+        AnniversaryCount.objects.bulk_update(updated, ["count"])
+        AnniversaryCount.objects.filter(pk__in=deleted).delete()
+
+
+@transaction.atomic
+def apply(before, employee_ids=()):
+    """
+    Переносит в суммы узлов изменение, случившееся с сотрудниками
+    после снимка before (см. snapshot). employee_ids — сотрудники,
+    которых не было в снимке (например, ещё не состоявшие в группах).
+    """
+    employee_ids = set(before) | set(employee_ids)
+    if not employee_ids:
+        return
+    after = snapshot(employee_ids)
+    deltas, anniversaries = _contributions(before.values(), sign=-1)
+    after_deltas, after_anniversaries = _contributions(after.values())
+    for node, delta in after_deltas.items():
+        _add(deltas, node, delta)
+    for key, delta in after_anniversaries.items():
+        anniversaries[key] += delta
+    _apply_deltas(deltas)
+    _apply_anniversaries(anniversaries)
+
+
+def node_employees(origin):
+    """
+    Возвращает id сотрудников, которых затрагивает удаление или перенос
+    origin: сотрудника, узла оргструктуры или QuerySet одних из них.
+    """
+    if isinstance(origin, QuerySet):
+        model, pks = origin.model, origin.values("pk")
+    else:
+        model, pks = type(origin), [origin.pk]
+    if model is Employee:
+        return set(Employee.objects.filter(pk__in=pks).values_list("pk", flat=True))
+    if model not in LEVELS:
+        return set()
+    return set(
+        Membership.objects.filter(
+            **{f"team__{model.team_lookup}__in": pks}
+        ).values_list("employee_id", flat=True)
+    )
+
+
+def _expected_rows():
+    """
+    Возвращает актуальные суммы узлов {(модель, id): суммы} и счётчики
+    годовщин {(модель, id, поле, день): число} по составу групп.
+    Узлы без сотрудников не включаются.
+    """
+    return _contributions(snapshot().values())
+
+
+def _actual_rows():
+    return {
+        (model, pk): tuple(totals)
+        for model in LEVELS
+        for pk, *totals in model.objects.values_list("pk", *TOTALS_FIELDS)
+    }
+
+
+def _actual_anniversaries():
+    return {
+        (LEVEL_MODELS[node_type], pk, field, day): count
+        for node_type, pk, field, day, count in AnniversaryCount.objects.values_list(
+            "node_type", "node_id", "field", "month_day", "count"
+        )
+    }
+
+
+def _anniversary_drift(expected):
+    """
+    Возвращает разницы {(модель, id, поле, день): delta}, которые приводят
+    сохранённые счётчики годовщин к ожидаемым expected.
+    """
+    actual = _actual_anniversaries()
+    drift = {}
+    for key in expected.keys() | actual.keys():
+        delta = expected.get(key, 0) - actual.get(key, 0)
+        if delta and key[1] is not None:
+            drift[key] = delta
+    return drift
+
+
+def check():
+    """
+    Сверяет сохранённые суммы и счётчики годовщин с составом групп.
+    Возвращает список расхождений (имя модели, id) по возрастанию.
+    """
+    expected, anniversaries = _expected_rows()
+    drift = {
+        (model._meta.model_name, pk)
+        for (model, pk), totals in _actual_rows().items()
+        if expected.get((model, pk), ZERO) != totals
+    }
+    drift.update(
+        (model._meta.model_name, pk)
+        for model, pk, _, _ in _anniversary_drift(anniversaries)
+    )
+    return sorted(drift)
+
+
+@transaction.atomic
+def repair():
+    """
+    Записывает актуальные суммы и счётчики годовщин узлам с расхождениями.
+    Возвращает количество исправленных узлов.
+    """
+    expected, anniversaries = _expected_rows()
+    changed = set()
+    for (model, pk), totals in _actual_rows().items():
+        values = expected.get((model, pk), ZERO)
+        if values != totals:
+            model.objects.filter(pk=pk).update(**dict(zip(TOTALS_FIELDS, values)))
+            changed.add((model, pk))
+    drift = _anniversary_drift(anniversaries)
+    _apply_anniversaries(drift)
+    changed.update((model, pk) for model, pk, _, _ in drift)
+    return len(changed)
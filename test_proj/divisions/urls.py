@@ -1,12 +1,22 @@
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
+from . import async_views
 from .views import (
     DepartmentViewSet,
     DivisionViewSet,
     EmployeeViewSet,
+    JobViewSet,
+    MetricsView,
+    OrgStatisticsView,
+    OrgTreeView,
     ServiceViewSet,
+    SnapshotDetailView,
+    SnapshotDiffView,
+    SnapshotListView,
+    SnapshotStatisticsView,
     TeamViewSet,
+    employee_thumbnail,
 )
 
 router = DefaultRouter()
@@ -15,7 +25,45 @@ router.register(r"departments", DepartmentViewSet, basename="department")
 router.register(r"divisions", DivisionViewSet, basename="division")
 router.register(r"teams", TeamViewSet, basename="team")
 router.register(r"employees", EmployeeViewSet, basename="employee")
+router.register(r"jobs", JobViewSet, basename="job")
+
+async_urlpatterns = [
+    path("statistics/", async_views.org_statistics, name="async-org-statistics"),
+    path("<str:kind>/", async_views.node_list, name="async-node-list"),
+    path("<str:kind>/<int:pk>/", async_views.node_detail, name="async-node-detail"),
+    path(
+        "<str:kind>/<int:pk>/employees/",
+        async_views.node_employees,
+        name="async-node-employees",
+    ),
+    path(
+        "<str:kind>/<int:pk>/statistics/",
+        async_views.node_statistics,
+        name="async-node-statistics",
+    ),
+]
 
 urlpatterns = [
+    path("api/async/", include(async_urlpatterns)),
     path("api/", include(router.urls)),
+    path("api/statistics/", OrgStatisticsView.as_view(), name="org-statistics"),
+    path("api/org-tree/", OrgTreeView.as_view(), name="org-tree"),
+    path("api/metrics/", MetricsView.as_view(), name="metrics"),
+    path("api/snapshots/", SnapshotListView.as_view(), name="snapshot-list"),
+    path("api/snapshots/diff/", SnapshotDiffView.as_view(), name="snapshot-diff"),
+    path(
+        "api/snapshots/<str:snapshot_id>/",
+        SnapshotDetailView.as_view(),
+        name="snapshot-detail",
+    ),
+    path(
+        "api/snapshots/<str:snapshot_id>/statistics/",
+        SnapshotStatisticsView.as_view(),
+        name="snapshot-statistics",
+    ),
+    path(
+        "api/thumbnails/<slug:photo_hash>/<slug:size>.webp",
+        employee_thumbnail,
+        name="employee-thumbnail",
+    ),
 ]
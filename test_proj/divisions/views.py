@@ -1,20 +1,89 @@
-from datetime import date
-
+import os
+
+from django.db import transaction
+from django.http import (
+    FileResponse,
+    Http404,
+    HttpResponseRedirect,
+    StreamingHttpResponse,
+)
+from django.urls import reverse
+from django.utils.cache import add_never_cache_headers
+from django.views.decorators.http import require_GET
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import filters, viewsets
 from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
 
-from .models import Department, Division, Employee, Service, Team
+from . import bulk, jobs, org_tree, snapshots, subtree, thumbnails
+from .cache import cached_response
+from .conditional import conditional_response
+from .instrumentation import InstrumentedViewMixin, store
+from .models import Department, Division, Employee, Job, Service, Team
+from .pagination import EmployeeKeysetPagination
+from .rows import get_row_builder
+from .search import EmployeeSearchFilter
 from .serializers import (
     DepartmentSerializer,
     DivisionSerializer,
     EmployeeSerializer,
+    EmployeeTeamsSerializer,
+    JobSerializer,
+    MemberIdsSerializer,
+    MoveMembersSerializer,
+    MoveNodeSerializer,
     ServiceSerializer,
     TeamSerializer,
+    get_tree_relations,
+    with_teams_requested,
+)
+from .statistics import (
+    ORG_LEVELS,
+    get_bulk_statistics,
+    get_node_statistics,
+    get_org_statistics,
 )
+from .streaming import stream_response
+
+
+def employees_response(
+    view, queryset, context=None, serializer_class=EmployeeSerializer
+):
+    """
+    Возвращает список сотрудников в одном из режимов:
+    - потоково (?stream=ndjson или ?stream=json);
+    - постранично по курсору (?cursor=... или ?page_size=...);
+    - целиком.
+    При DIVISIONS_FAST_ROWS строки строятся из values_list() без полей DRF
+    (см. divisions/rows.py), ответ при этом не меняется.
+    """
+    request = view.request
+    context = context or {}
+    builder = get_row_builder(serializer_class, context)
+    stream = request.query_params.get("stream")
+    if stream:
+        return stream_response(
+            queryset, serializer_class, stream, context, builder=builder
+        )
+
+    if builder is not None:
+        queryset = builder.queryset(queryset)
+    paginator = EmployeeKeysetPagination()
+    page = paginator.paginate_queryset(queryset, request, view)
+    if page is not None:
+        return paginator.get_paginated_response(
+            serialize_rows(page, serializer_class, context, builder)
+        )
+    return Response(serialize_rows(queryset, serializer_class, context, builder))
+
+
+def serialize_rows(rows, serializer_class, context, builder=None):
+    if builder is not None:
+        return builder.build_many(rows)
+    return serializer_class(rows, many=True, context=context).data
 
 
 class EmployeesMixin:
@@ -23,74 +92,217 @@ class EmployeesMixin:
     """
 
     @action(detail=True, methods=["get"], url_path="employees")
+    @conditional_response
+    @cached_response
     def employees(self, request, pk=None):
         """
-        Возвращает всех сотрудников, включая дочерние подразделения.
+        Возвращает всех сотрудников, включая дочерние подразделения,
+        каждого по одному разу. С ?with_teams=1 у сотрудника выводится
+        список его групп в узле.
         """
         obj = self.get_object()
-        employees = obj.get_all_employees()
-        serializer = EmployeeSerializer(employees, many=True)
-        return Response(serializer.data)
+        if with_teams_requested(request):
+            return employees_response(
+                self,
+                obj.get_employees_queryset(with_teams=True),
+                serializer_class=EmployeeTeamsSerializer,
+            )
+        return employees_response(self, obj.get_employees_queryset())
 
 
-class ServiceViewSet(viewsets.ModelViewSet, EmployeesMixin):
-    queryset = Service.objects.all()
-    serializer_class = ServiceSerializer
+class StatisticsMixin:
+    """
+    Миксин для ViewSet, который предоставляет универсальный метод statistics.
+    """
 
     @action(detail=True, methods=["get"], url_path="statistics")
+    @conditional_response(daily=True)
+    @cached_response(daily=True)
     def statistics(self, request, pk=None):
-        service = self.get_object()
-        # Получаем всех сотрудников службы
-        employees = service.get_all_employees()
-        # Используем универсальную функцию для получения статистики
-        stats = get_statistics(employees)
-        # Возвращаем результат
-        return Response(stats)
+        """
+        Возвращает статистику по сотрудникам узла, включая дочерние подразделения.
+        """
+        obj = self.get_object()
+        # Статистика считается по нарастающим суммам узла без обращения
+        # к сотрудникам
+        return Response(get_node_statistics(obj))
+
+    @action(
+        detail=False,
+        methods=["get"],
+        url_path="statistics",
+        url_name="bulk-statistics",
+    )
+    @conditional_response(daily=True)
+    @cached_response(daily=True)
+    def bulk_statistics(self, request):
+        """
+        Возвращает статистику для нескольких узлов одним запросом к базе.
+        Принимает необязательный параметр ids со списком id через запятую.
+        """
+        queryset = self.filter_queryset(self.get_queryset())
+        ids = request.query_params.get("ids")
+        if ids:
+            try:
+                queryset = queryset.filter(pk__in=[int(pk) for pk in ids.split(",")])
+            except ValueError:
+                raise ValidationError({"ids": "Ожидается список id через запятую."})
 
+        stats = get_bulk_statistics(queryset.order_by("pk"))
+        return Response([{"id": pk, **node_stats} for pk, node_stats in stats.items()])
 
-class DepartmentViewSet(viewsets.ModelViewSet, EmployeesMixin):
-    queryset = Department.objects.all()
-    serializer_class = DepartmentSerializer
 
-    @action(detail=True, methods=["get"], url_path="statistics")
-    def statistics(self, request, pk=None):
-        department = self.get_object()
-        # Получаем всех сотрудников подразделения
-        employees = department.get_all_employees()
-        # Используем универсальную функцию для получения статистики
-        stats = get_statistics(employees)
-        # Возвращаем результат
-        return Response(stats)
+class AsyncDestroyMixin:
+    """
+    Миксин для ViewSet узлов: DELETE удаляет поддерево узла порциями
+    в коротких транзакциях (см. divisions/subtree.py). С ?async=1 удаление
+    ставится в очередь фоновых задач (см. divisions/jobs.py), и ответ 202
+    с задачей приходит сразу; её ход и результат — по заголовку Location.
+    """
 
+    def perform_destroy(self, instance):
+        subtree.delete_subtree(instance)
 
-class DivisionViewSet(viewsets.ModelViewSet, EmployeesMixin):
-    queryset = Division.objects.all()
-    serializer_class = DivisionSerializer
+    def destroy(self, request, *args, **kwargs):
+        if request.query_params.get("async") not in ("1", "true"):
+            return super().destroy(request, *args, **kwargs)
+        node = self.get_object()
+        kind = next(name for name, model in ORG_LEVELS.items() if model is type(node))
+        job = jobs.enqueue("delete_node", kind=kind, pk=node.pk)
+        return Response(
+            JobSerializer(job).data,
+            status=202,
+            headers={"Location": reverse("job-detail", args=[job.pk])},
+        )
+
+
+class MoveNodeMixin:
+    """
+    Миксин для ViewSet узлов с родителем: POST .../move/ {"parent": id}
+    переносит узел вместе с поддеревом (см. subtree.move_node).
+    """
+
+    @action(detail=True, methods=["post"], url_path="move")
+    def move(self, request, pk=None):
+        node = self.get_object()
+        field = subtree.PARENT_FIELDS[type(node)]
+        serializer = MoveNodeSerializer(
+            data=request.data,
+            parent_model=type(node)._meta.get_field(field).related_model,
+        )
+        serializer.is_valid(raise_exception=True)
+        subtree.move_node(node, serializer.validated_data["parent"])
+        return Response({"id": node.pk, field: getattr(node, f"{field}_id")})
+
+
+class ConditionalReadMixin:
+    """
+    Миксин для ViewSet: ETag и Last-Modified для list и retrieve.
+    """
+
+    @conditional_response
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @conditional_response
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
+
+class CachedReadMixin:
+    """
+    Миксин для ViewSet: кэширование ответов list и retrieve.
+    """
+
+    @cached_response
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @cached_response
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
 
-    @action(detail=True, methods=["get"], url_path="statistics")
-    def statistics(self, request, pk=None):
-        division = self.get_object()
-        # Получаем всех сотрудников службы
-        employees = division.get_all_employees()
-        # Используем универсальную функцию для получения статистики
-        stats = get_statistics(employees)
-        # Возвращаем результат
-        return Response(stats)
 
+class MembersPrefetchMixin:
+    """
+    Миксин для ViewSet вложенной оргструктуры: при выводе дерева (list/retrieve)
+    загружает все уровни и сотрудников через prefetch_related, чтобы вложенные
+    сериализаторы читали данные из кэша, а не делали запросы. Уровни,
+    отсечённые параметрами ?fields= и ?depth=, не загружаются.
+    """
 
-class TeamViewSet(viewsets.ModelViewSet, EmployeesMixin):
+    members_lookup = None
+    prefetch_actions = ("list", "retrieve")
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action in self.prefetch_actions:
+            relations = get_tree_relations(
+                self.members_lookup.split("__"), self.request
+            )
+            if relations:
+                queryset = queryset.prefetch_related("__".join(relations))
+        return queryset
+
+
+class ServiceViewSet(
+    InstrumentedViewMixin,
+    AsyncDestroyMixin,
+    ConditionalReadMixin,
+    CachedReadMixin,
+    MembersPrefetchMixin,
+    viewsets.ModelViewSet,
+    EmployeesMixin,
+    StatisticsMixin,
+):
+    queryset = Service.objects.all()
+    serializer_class = ServiceSerializer
+    members_lookup = "departments__divisions__teams__members"
+
+
+class DepartmentViewSet(
+    InstrumentedViewMixin,
+    AsyncDestroyMixin,
+    MoveNodeMixin,
+    ConditionalReadMixin,
+    MembersPrefetchMixin,
+    viewsets.ModelViewSet,
+    EmployeesMixin,
+    StatisticsMixin,
+):
+    queryset = Department.objects.all()
+    serializer_class = DepartmentSerializer
+    members_lookup = "divisions__teams__members"
+
+
+class DivisionViewSet(
+    InstrumentedViewMixin,
+    AsyncDestroyMixin,
+    MoveNodeMixin,
+    ConditionalReadMixin,
+    MembersPrefetchMixin,
+    viewsets.ModelViewSet,
+    EmployeesMixin,
+    StatisticsMixin,
+):
+    queryset = Division.objects.all()
+    serializer_class = DivisionSerializer
+    members_lookup = "teams__members"
+
+
+class TeamViewSet(
+    InstrumentedViewMixin,
+    AsyncDestroyMixin,
+    MoveNodeMixin,
+    ConditionalReadMixin,
+    MembersPrefetchMixin,
+    viewsets.ModelViewSet,
+    EmployeesMixin,
+    StatisticsMixin,
+):
     queryset = Team.objects.all()
     serializer_class = TeamSerializer
-
-    @action(detail=True, methods=["get"], url_path="statistics")
-    def statistics(self, request, pk=None):
-        team = self.get_object()
-        # Получаем всех сотрудников службы
-        employees = team.get_all_employees()
-        # Используем универсальную функцию для получения статистики
-        stats = get_statistics(employees)
-        # Возвращаем результат
-        return Response(stats)
+    members_lookup = "members"
 
     @action(detail=True, methods=["patch"], url_path="add-member")
     def add_member(self, request, pk=None):
@@ -102,10 +314,17 @@ class TeamViewSet(viewsets.ModelViewSet, EmployeesMixin):
         team = self.get_object()
 
         # Получаем ID сотрудника из запроса
-        member_id = request.data.get("member_id")
+        serializer = MemberIdsSerializer(
+            data={"member_ids": [request.data.get("member_id")]}
+        )
+        if not serializer.is_valid():
+            raise ValidationError({"member_id": ["Укажите корректный ID сотрудника."]})
 
         # Получаем объект сотрудника
-        member = Employee.objects.get(id=member_id)
+        member_id = serializer.validated_data["member_ids"][0]
+        member = Employee.objects.filter(pk=member_id).first()
+        if member is None:
+            raise NotFound(f"Сотрудник {member_id} не найден.")
 
         # Добавляем сотрудника в группу
         team.members.add(member)
@@ -114,64 +333,308 @@ class TeamViewSet(viewsets.ModelViewSet, EmployeesMixin):
             {"message": f"Сотрудник {member.full_name} успешно добавлен в группу."}
         )
 
+    def _get_member_ids(self, serializer_class=MemberIdsSerializer):
+        """
+        Проверяет тело запроса и существование всех сотрудников одним запросом.
+        Возвращает (проверенные данные, список ID без повторов).
+        """
+        serializer = serializer_class(data=self.request.data)
+        serializer.is_valid(raise_exception=True)
+        member_ids = list(dict.fromkeys(serializer.validated_data["member_ids"]))
+        found = Employee.objects.in_bulk(member_ids)
+        missing = [member_id for member_id in member_ids if member_id not in found]
+        if missing:
+            raise ValidationError({"member_ids": [f"Сотрудники не найдены: {missing}"]})
+        return serializer.validated_data, member_ids
+
+    @action(detail=True, methods=["post"], url_path="add-members")
+    def add_members(self, request, pk=None):
+        """
+        Добавляет в группу список сотрудников.
+        Принимает JSON с ключом 'member_ids'.
+        """
+        team = self.get_object()
+        _, member_ids = self._get_member_ids()
+        team.members.add(*member_ids)
+        return Response({"team": team.pk, "member_ids": member_ids})
+
+    @action(detail=True, methods=["post"], url_path="remove-members")
+    def remove_members(self, request, pk=None):
+        """
+        Исключает из группы список сотрудников.
+        Принимает JSON с ключом 'member_ids'.
+        """
+        team = self.get_object()
+        _, member_ids = self._get_member_ids()
+        team.members.remove(*member_ids)
+        return Response({"team": team.pk, "member_ids": member_ids})
+
+    @action(detail=True, methods=["post"], url_path="move-members")
+    def move_members(self, request, pk=None):
+        """
+        Переводит сотрудников из группы в другую группу в одной транзакции.
+        Принимает JSON с ключами 'member_ids' и 'to_team'.
+        Все сотрудники должны состоять в исходной группе.
+        """
+        team = self.get_object()
+        data, member_ids = self._get_member_ids(MoveMembersSerializer)
+        target = data["to_team"]
+        if target.pk == team.pk:
+            raise ValidationError({"to_team": ["Группа назначения совпадает с исходной."]})
+
+        with transaction.atomic():
+            current = set(
+                team.members.filter(pk__in=member_ids).values_list("pk", flat=True)
+            )
+            outside = [member_id for member_id in member_ids if member_id not in current]
+            if outside:
+                raise ValidationError(
+                    {"member_ids": [f"Сотрудники не состоят в группе: {outside}"]}
+                )
+            team.members.remove(*member_ids)
+            target.members.add(*member_ids)
+
+        return Response(
+            {"team": team.pk, "to_team": target.pk, "member_ids": member_ids}
+        )
+
 
-class EmployeeViewSet(viewsets.ModelViewSet):
+class EmployeeViewSet(
+    InstrumentedViewMixin, ConditionalReadMixin, viewsets.ModelViewSet
+):
     queryset = Employee.objects.all()
     serializer_class = EmployeeSerializer
-    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [filters.OrderingFilter, EmployeeSearchFilter]
     search_fields = ["full_name"]
     ordering_fields = ['date_of_birth', 'start_date']
     ordering = ['date_of_birth', 'start_date']
 
+    @conditional_response
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        return employees_response(self, queryset, self.get_serializer_context())
+
+    @action(detail=False, methods=["post"], url_path="import")
+    def bulk_import(self, request):
+        """
+        Пакетно создаёт сотрудников из тела запроса (text/csv или
+        application/x-ndjson) либо из файла file в multipart-форме.
+        Тело читается потоково. Возвращает отчёт с ошибками по строкам.
+        """
+        if request.content_type.startswith("multipart/"):
+            upload = request.FILES.get("file")
+            if upload is None:
+                raise ValidationError({"file": "Файл не передан."})
+            fmt = "csv" if upload.name.lower().endswith(".csv") else "ndjson"
+            lines = upload
+        else:
+            fmt = bulk.format_for_content_type(request.content_type)
+            # HttpRequest — файлоподобный объект: строки читаются из потока
+            lines = request._request
+
+        if fmt is None:
+            raise ValidationError(
+                {"content_type": f"Ожидается {' или '.join(bulk.FORMATS.values())}."}
+            )
+        report = bulk.import_employees(bulk.PARSERS[fmt](lines))
+        return Response(report)
+
+    @action(detail=False, methods=["get"], url_path="export")
+    def bulk_export(self, request):
+        """
+        Потоково выгружает сотрудников (с учётом фильтров) в CSV или NDJSON:
+        ?stream=csv или ?stream=ndjson (по умолчанию).
+        """
+        fmt = request.query_params.get("stream", "ndjson")
+        if fmt not in bulk.FORMATS:
+            raise ValidationError(
+                {"stream": f"Допустимые значения: {', '.join(bulk.FORMATS)}."}
+            )
+        queryset = self.filter_queryset(self.get_queryset())
+        response = StreamingHttpResponse(
+            bulk.export_employees(queryset, fmt), content_type=bulk.FORMATS[fmt]
+        )
+        response["Content-Disposition"] = f'attachment; filename="employees.{fmt}"'
+        return response
+
+
+
+class JobViewSet(InstrumentedViewMixin, viewsets.ReadOnlyModelViewSet):
+    """
+    Фоновые задачи: статус, ход выполнения, результат или ошибка.
+    """
+
+    queryset = Job.objects.order_by("-pk")
+    serializer_class = JobSerializer
+    filterset_fields = ["name", "status"]
+
+
+class OrgStatisticsView(InstrumentedViewMixin, APIView):
+    """
+    Статистика по всем узлам оргструктуры: службам, управлениям, отделам и группам.
+    """
+
+    # Метки updated_at служб покрывают изменения во всём дереве
+    queryset = Service.objects.all()
+
+    @conditional_response(daily=True)
+    def get(self, request):
+        return Response(get_org_statistics())
+
+
+class OrgTreeView(InstrumentedViewMixin, APIView):
+    """
+    Полное дерево оргструктуры со составами групп за пять запросов
+    (см. divisions/org_tree.py). ?root=<уровень>:<id> (например,
+    divisions:3) начинает дерево с узла, ?max_depth=N ограничивает
+    число вложенных уровней под ним.
+    """
+
+    queryset = Service.objects.all()
+
+    @conditional_response
+    def get(self, request):
+        root = request.query_params.get("root")
+        if root:
+            kind, _, pk = root.partition(":")
+            if kind not in org_tree.MODELS or not pk.isdigit():
+                raise ValidationError(
+                    {"root": "Ожидается <уровень>:<id>, например divisions:3."}
+                )
+            root = (org_tree.MODELS[kind], int(pk))
+
+        max_depth = request.query_params.get("max_depth")
+        if max_depth is not None:
+            if not max_depth.isdigit():
+                raise ValidationError(
+                    {"max_depth": "Ожидается неотрицательное целое число."}
+                )
+            max_depth = int(max_depth)
+
+        tree = org_tree.build_org_tree(root or None, max_depth, request)
+        if root and not tree:
+            raise NotFound(f"Узел {request.query_params['root']} не найден.")
+        return Response(tree)
+
+
+def get_snapshot_manifest(snapshot_id):
+    try:
+        return snapshots.get_manifest(snapshots.resolve(snapshot_id))
+    except snapshots.SnapshotNotFound:
+        raise NotFound(f"Снимок {snapshot_id} не найден.")
+
+
+class SnapshotListView(InstrumentedViewMixin, APIView):
+    """
+    Список снимков оргструктуры (см. divisions/snapshots.py).
+    Снимки читаются из хранилища снимков, без обращения к базе.
+    """
+
+    def get(self, request):
+        manifests = map(snapshots.get_manifest, snapshots.list_snapshots())
+        return Response(
+            [
+                {key: manifest[key] for key in ("id", "taken_at", "counts")}
+                for manifest in manifests
+            ]
+        )
+
+
+class SnapshotDetailView(InstrumentedViewMixin, APIView):
+    """
+    Оргструктура на момент снимка. Снимок задаётся id или датой
+    (YYYY-MM-DD — последний снимок на эту дату); ?service=1,2
+    ограничивает службы.
+    """
+
+    def get(self, request, snapshot_id):
+        manifest = get_snapshot_manifest(snapshot_id)
+        service_ids = request.query_params.get("service")
+        if service_ids:
+            try:
+                service_ids = {int(pk) for pk in service_ids.split(",")}
+            except ValueError:
+                raise ValidationError({"service": "Ожидается список id служб."})
+        return Response(
+            {
+                "id": manifest["id"],
+                "taken_at": manifest["taken_at"],
+                "services": snapshots.get_tree(manifest, service_ids or None),
+            }
+        )
 
-def get_statistics(employees):
+
+class SnapshotStatisticsView(InstrumentedViewMixin, APIView):
     """
-    Возвращает статистику для переданного списка сотрудников:
-    - Количество сотрудников.
-    - Средний возраст сотрудников.
-    - Средний стаж работы.
+    Статистика по всем узлам оргструктуры на дату снимка.
     """
-    employee_count = len(employees)
 
-    if employee_count == 0:
-        # Если нет сотрудников, возвращаем нулевые значения
-        return {
-            "employee_count": 0,
-            "average_age": 0,
-            "average_tenure": 0,
+    def get(self, request, snapshot_id):
+        manifest = get_snapshot_manifest(snapshot_id)
+        return Response(snapshots.get_statistics(manifest))
+
+
+class SnapshotDiffView(InstrumentedViewMixin, APIView):
+    """
+    Изменения оргструктуры между снимками ?from= и ?to= (id или даты).
+    """
+
+    def get(self, request):
+        missing = {
+            param: "Обязательный параметр."
+            for param in ("from", "to")
+            if not request.query_params.get(param)
         }
+        if missing:
+            raise ValidationError(missing)
+        return Response(
+            snapshots.diff(
+                get_snapshot_manifest(request.query_params["from"]),
+                get_snapshot_manifest(request.query_params["to"]),
+            )
+        )
+
 
-    # Средний возраст сотрудников
-    today = date.today()
-    total_age = 0
-    total_tenure = 0
-
-    for employee in employees:
-        # Возраст сотрудника
-        age = today.year - employee.date_of_birth.year
-        if (today.month, today.day) < (
-            employee.date_of_birth.month,
-            employee.date_of_birth.day,
-        ):
-            age -= 1  # Корректировка возраста, если день рождения ещё не наступил
-        total_age += age
-
-        # Стаж работы
-        tenure = today.year - employee.start_date.year
-        if (today.month, today.day) < (
-            employee.start_date.month,
-            employee.start_date.day,
-        ):
-            tenure -= 1  # Корректировка стажа, если год ещё не завершился
-        total_tenure += tenure
-
-    # Вычисляем средние значения
-    average_age = total_age / employee_count
-    average_tenure = total_tenure / employee_count
-
-    # Возвращаем результат
-    return {
-        "employee_count": employee_count,
-        "average_age": round(average_age),
-        "average_tenure": round(average_tenure),
-    }
+class MetricsView(APIView):
+    """
+    Скользящая статистика запросов по представлениям: перцентили длительности,
+    времени и числа запросов к базе, размера ответа и гистограмма длительности.
+    DELETE очищает накопленные измерения.
+    """
+
+    def get(self, request):
+        return Response(store.snapshot())
+
+    def delete(self, request):
+        store.clear()
+        return Response(status=204)
+
+
+@require_GET
+def employee_thumbnail(request, photo_hash, size):
+    """
+    Отдаёт миниатюру фотографии сотрудника. Адрес содержит хэш содержимого,
+    поэтому ответ кэшируется клиентом без срока. Отсутствующая миниатюра
+    ставится в очередь генерации; если она не успевает построиться,
+    клиент временно перенаправляется на оригинал.
+    """
+    if size not in thumbnails.get_sizes():
+        raise Http404
+    path = thumbnails.thumbnail_path(photo_hash, size)
+    if not os.path.exists(path):
+        employee = Employee.objects.filter(photo_hash=photo_hash).first()
+        if employee is None or not employee.photo:
+            raise Http404
+        path = thumbnails.get_thumbnail(employee, size)
+        if path is None:
+            response = HttpResponseRedirect(employee.photo.url)
+            add_never_cache_headers(response)
+            return response
+    try:
+        response = FileResponse(open(path, "rb"), content_type=thumbnails.CONTENT_TYPE)
+    except FileNotFoundError:
+        # Миниатюра вытеснена между проверкой и открытием
+        raise Http404
+    thumbnails.touch(path)
+    response["Cache-Control"] = thumbnails.CACHE_CONTROL
+    return response
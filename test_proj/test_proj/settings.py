@@ -46,10 +46,16 @@ INSTALLED_APPS = [
 
 # добавлено
 REST_FRAMEWORK = {
-    "DEFAULT_FILTER_BACKENDS": ["django_filters.rest_framework.DjangoFilterBackend"]
+    "DEFAULT_FILTER_BACKENDS": ["django_filters.rest_framework.DjangoFilterBackend"],
+    # JSON на orjson, если он установлен (см. divisions/renderers.py)
+    "DEFAULT_RENDERER_CLASSES": [
+        "divisions.renderers.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
 }
 
 MIDDLEWARE = [
+    "divisions.instrumentation.InstrumentationMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -60,6 +66,9 @@ MIDDLEWARE = [
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
 
+if os.environ.get("SQLITE_REPLICA_PATH"):
+    MIDDLEWARE.append("divisions.routers.ReplicaReadsMiddleware")
+
 ROOT_URLCONF = "test_proj.urls"
 
 TEMPLATES = [
@@ -91,6 +100,86 @@ DATABASES = {
     }
 }
 
+# Профиль SQLite для конкурентной нагрузки: SQLITE_PROFILE=production.
+# WAL позволяет читать во время записи, BEGIN IMMEDIATE берёт блокировку
+# записи в начале транзакции (вместо повышения блокировки посреди неё,
+# которое при конкуренции сразу даёт «database is locked»), а busy_timeout
+# заставляет ждать освобождения блокировки, а не падать.
+SQLITE_PROFILE = os.environ.get("SQLITE_PROFILE", "default")
+SQLITE_BUSY_TIMEOUT = int(os.environ.get("SQLITE_BUSY_TIMEOUT", 20))  # секунд
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": os.environ.get("SQLITE_SYNCHRONOUS", "NORMAL"),
+    "cache_size": int(os.environ.get("SQLITE_CACHE_SIZE", -64 * 1024)),  # КиБ
+    "mmap_size": int(os.environ.get("SQLITE_MMAP_SIZE", 256 * 1024 * 1024)),
+    "busy_timeout": SQLITE_BUSY_TIMEOUT * 1000,
+    "temp_store": "MEMORY",
+}
+
+if SQLITE_PROFILE == "production":
+    DATABASES["default"].update(
+        {
+            "OPTIONS": {
+                "init_command": ";".join(
+                    f"PRAGMA {name}={value}" for name, value in SQLITE_PRAGMAS.items()
+                ),
+                "transaction_mode": "IMMEDIATE",
+                "timeout": SQLITE_BUSY_TIMEOUT,
+            },
+            "CONN_MAX_AGE": int(os.environ.get("SQLITE_CONN_MAX_AGE", 600)),
+            "CONN_HEALTH_CHECKS": True,
+        }
+    )
+
+# Необязательная реплика для чтения: снимок основной базы, который
+# обновляет команда refresh_read_replica. Безопасные запросы (GET, HEAD)
+# читают из снимка (см. divisions/routers.py), запись идёт в основную базу.
+SQLITE_REPLICA_PATH = os.environ.get("SQLITE_REPLICA_PATH")
+
+if SQLITE_REPLICA_PATH:
+    DATABASES["replica"] = {
+        "ENGINE": "django.db.backends.sqlite3",
+        # Снимок заменяется целиком и не изменяется на месте,
+        # поэтому открывается как неизменяемый, без блокировок
+        "NAME": f"file:{SQLITE_REPLICA_PATH}?mode=ro&immutable=1",
+        "OPTIONS": {
+            "uri": True,
+            "init_command": ";".join(
+                f"PRAGMA {name}={SQLITE_PRAGMAS[name]}"
+                for name in ("cache_size", "mmap_size")
+            ),
+        },
+        # Новое соединение на каждый запрос видит последний снимок
+        "CONN_MAX_AGE": 0,
+        "TEST": {"MIRROR": "default"},
+    }
+    DATABASE_ROUTERS = ["divisions.routers.ReadReplicaRouter"]
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+# В продакшене заменить на общий бэкенд (Redis/Memcached), чтобы версии
+# поддеревьев и закэшированные ответы разделялись между воркерами.
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    }
+}
+
+DIVISIONS_CACHE_ALIAS = "default"
+DIVISIONS_CACHE_TIMEOUT = 300  # секунд
+
+# Инструментирование запросов (см. divisions/instrumentation.py):
+# размер скользящего окна измерений на представление и порог числа
+# запросов к базе, после которого в лог пишутся повторяющиеся запросы
+DIVISIONS_METRICS_WINDOW = 1000
+DIVISIONS_QUERY_LOG_THRESHOLD = (
+    int(os.environ["DIVISIONS_QUERY_LOG_THRESHOLD"])
+    if os.environ.get("DIVISIONS_QUERY_LOG_THRESHOLD")
+    else None
+)
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -139,3 +228,22 @@ CORS_ALLOW_ALL_ORIGINS = True  # Разрешить все домены (для
 
 MEDIA_URL = "/media/"  # URL для доступа к медиафайлам
 MEDIA_ROOT = os.path.join(BASE_DIR, "media")  # Путь к папке для хранения медиафайлов
+
+# Загружаемые файлы пишутся во временный файл на диске, а не в память
+FILE_UPLOAD_HANDLERS = [
+    "django.core.files.uploadhandler.TemporaryFileUploadHandler",
+]
+
+# Миниатюры фотографий сотрудников (см. divisions/thumbnails.py)
+DIVISIONS_THUMBNAIL_ROOT = os.path.join(MEDIA_ROOT, "thumbnails")
+DIVISIONS_THUMBNAIL_SIZES = {"small": 64, "medium": 160, "large": 320}
+DIVISIONS_THUMBNAIL_MAX_BYTES = 256 * 1024 * 1024  # предел размера кэша миниатюр
+DIVISIONS_THUMBNAIL_WORKERS = 2
+DIVISIONS_THUMBNAIL_WAIT = 5  # секунд ожидания генерации при запросе
+
+# Списки сотрудников строятся из values_list() без полей DRF
+# (см. divisions/rows.py); выключено по умолчанию
+DIVISIONS_FAST_ROWS = False
+
+# Снимки оргструктуры на момент времени (см. divisions/snapshots.py)
+DIVISIONS_SNAPSHOT_ROOT = os.path.join(BASE_DIR, "snapshots")